@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agenda - výskyty všech kalendářů v jednom intervalovém indexu
+PrintMaster - https://github.com/Quertz/printmaster
+
+Každý kalendář vrací své výskyty seřazené podle začátku (ical_index).
+Agenda je slévá haldou (heapq.merge) do jednoho seřazeného pole a nad
+ním postaví implicitní intervalový strom: pole seřazené podle začátku
+je vyvážený binární strom (kořen uprostřed) a každý uzel si pamatuje
+nejpozdější konec ve svém podstromu. Dotaz na překryv s libovolným
+oknem <od, do) pak prochází jen podstromy, které do okna zasahují -
+O(log n + k) i pro vícedenní události, které začaly před oknem, a bez
+ohledu na to, jak dlouhá je nejdelší událost.
+
+Začátky a konce jsou časy s pásmem (ical_stream je převádí na místní
+čas), takže se správně porovnávají i události zadané v jiných pásmech.
+
+Účtenka z agendy bere dnešek (včetně událostí přes půlnoc) a blok
+dalších dnů:
+
+    [Calendars]
+    lookahead_days = 3
+"""
+
+import bisect
+import datetime
+import heapq
+
+# Okamžitá událost (konec == začátek) zasahuje do okna, pokud v něm začíná
+_OKAMZIK = datetime.timedelta(microseconds=1)
+
+
+def _zacatek(vyskyt):
+    return vyskyt['zacatek']
+
+
+def slij(seznamy):
+    """Slije seznamy výskytů seřazené podle začátku do jednoho seřazeného seznamu
+
+    Při shodném začátku zůstává pořadí seznamů (kalendářů).
+    """
+    return list(heapq.merge(*seznamy, key=_zacatek))
+
+
+class Agenda:
+    """Seřazené výskyty s intervalovým indexem pro dotazy na překryv
+
+    Výskyt je slovník alespoň s klíči zacatek a konec (datetime).
+    """
+
+    def __init__(self, vyskyty=()):
+        # Výsledek slij() už je seřazený - Timsort jej jen projde
+        self.vyskyty = sorted(vyskyty, key=_zacatek)
+        self.starty = [v['zacatek'] for v in self.vyskyty]
+        self.konce = [max(v['konec'], v['zacatek'] + _OKAMZIK) for v in self.vyskyty]
+        # Nejpozdější konec v podstromu uzlu (uzel = index středu rozsahu)
+        self.max_konec = list(self.konce)
+        self._postav(0, len(self.vyskyty))
+
+    @classmethod
+    def z_kalendaru(cls, seznamy):
+        """Agenda z výsledků jednotlivých kalendářů (None = kalendář selhal)"""
+        return cls(slij(seznam for seznam in seznamy if seznam))
+
+    def _postav(self, lo, hi):
+        if lo >= hi:
+            return None
+        stred = (lo + hi) // 2
+        nejpozdeji = self.konce[stred]
+        for konec in (self._postav(lo, stred), self._postav(stred + 1, hi)):
+            if konec is not None and konec > nejpozdeji:
+                nejpozdeji = konec
+        self.max_konec[stred] = nejpozdeji
+        return nejpozdeji
+
+    def __len__(self):
+        return len(self.vyskyty)
+
+    def __iter__(self):
+        return iter(self.vyskyty)
+
+    def v_okne(self, od, do):
+        """Výskyty, které zasahují do okna <od, do), seřazené podle začátku"""
+        vysledek = []
+        # Začátek v okně nebo dřív - pravá hranice prohledávaného pole
+        mez = bisect.bisect_left(self.starty, do)
+
+        def projdi(lo, hi):
+            if lo >= hi or lo >= mez:
+                return
+            stred = (lo + hi) // 2
+            if self.max_konec[stred] <= od:
+                # Celý podstrom skončil před oknem
+                return
+            projdi(lo, stred)
+            if stred < mez and self.konce[stred] > od:
+                vysledek.append(self.vyskyty[stred])
+            projdi(stred + 1, hi)
+
+        projdi(0, len(self.vyskyty))
+        return vysledek
+
+    def zacinajici_v(self, od, do):
+        """Výskyty, které začínají v okně <od, do)"""
+        return self.vyskyty[bisect.bisect_left(self.starty, od):bisect.bisect_left(self.starty, do)]
+
+    def dalsi_po(self, cas):
+        """První výskyt začínající v čase cas nebo později (nebo None)"""
+        i = bisect.bisect_left(self.starty, cas)
+        return self.vyskyty[i] if i < len(self.vyskyty) else None
+
+    def den(self, datum, mistni):
+        """Výskyty zasahující do dne (v místním čase), včetně těch přes půlnoc"""
+        od = datetime.datetime.combine(datum, datetime.time(), mistni)
+        return self.v_okne(od, od + datetime.timedelta(days=1))
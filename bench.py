@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline benchmark celého tisku proti místnímu serveru s testovacími daty
+PrintMaster - https://github.com/Quertz/printmaster
+
+Spustí místní HTTP server, který zastoupí OpenWeatherMap, kalendáře iCal,
+RSS feedy a horoskop, a síťovou "tiskárnu", která jen ukládá přijatá data.
+Pak v dočasném adresáři s vlastní config.ini projde celé vytiskni_prehled()
+a vypíše JSON s celkovým časem, časy sekcí, staženými a vytištěnými bajty
+a pamětí (max RSS, s --memory i špičku alokací přes tracemalloc). Stažené
+bajty počítá klient (co opravdu přečetl), server zvlášť hlásí, kolik
+odeslal - rozdíl ukazuje, co ušetří předčasně ukončené čtení.
+
+    python3 bench.py
+    python3 bench.py --events 5000 --feeds 8 --items 200 --runs 5
+    python3 bench.py --latency rss=0.3 --error rss2=500 --hang horoscope
+    python3 bench.py --warm --output bench.jsonl
+
+Výsledek s --output se připojí jako jeden řádek JSON, takže lze sledovat
+regrese mezi verzemi.
+"""
+
+import argparse
+import contextlib
+import datetime
+import http.server
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+# ====== TESTOVACÍ DATA ======
+
+def pocasi_json():
+    return json.dumps({
+        "weather": [{"main": "Clouds", "description": "oblačno"}],
+        "main": {"temp": 12.4, "feels_like": 10.9, "humidity": 71},
+        "wind": {"speed": 3.2},
+        "clouds": {"all": 75},
+    }).encode('utf-8')
+
+
+def horoskop_json():
+    return json.dumps({
+        "description": "Dnes se vám bude dařit v práci i doma.",
+        "lucky_number": "7",
+        "color": "Modrá",
+        "mood": "Klidná",
+    }).encode('utf-8')
+
+
+def kalendar_ics(udalosti):
+    """Kalendář s `udalosti` jednorázovými událostmi kolem dneška a jednou opakovanou"""
+    dnes = datetime.date.today()
+    radky = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//PrintMaster//bench//CS"]
+    radky += [
+        "BEGIN:VEVENT", "UID:standup@bench", "DTSTAMP:20250101T000000Z",
+        "DTSTART:20250101T090000", "DTEND:20250101T091500",
+        "RRULE:FREQ=DAILY", "SUMMARY:Ranní porada", "END:VEVENT",
+    ]
+    for i in range(udalosti):
+        den = dnes + datetime.timedelta(days=i % 60 - 30)
+        zacatek = datetime.datetime.combine(den, datetime.time(8 + i % 10, (i * 7) % 60))
+        radky += [
+            "BEGIN:VEVENT", f"UID:udalost-{i}@bench", "DTSTAMP:20250101T000000Z",
+            f"DTSTART:{zacatek:%Y%m%dT%H%M%S}",
+            f"DTEND:{zacatek + datetime.timedelta(hours=1):%Y%m%dT%H%M%S}",
+            f"SUMMARY:Schůzka číslo {i}",
+            f"DESCRIPTION:{'Podrobný popis schůzky. ' * 10}",
+            "END:VEVENT",
+        ]
+    radky.append("END:VCALENDAR")
+    return ("\r\n".join(radky) + "\r\n").encode('utf-8')
+
+
+def rss_xml(nazev, polozky, velikost_popisu):
+    obsah = ''.join(
+        f"<item><title>{nazev}: zpráva {i} o událostech dne {i * 37 % 101}</title>"
+        f"<link>http://example.invalid/{i}</link>"
+        f"<description>{'Text článku. ' * (velikost_popisu // 13)}</description></item>"
+        for i in range(polozky)
+    )
+    return (f"<?xml version='1.0' encoding='utf-8'?><rss version='2.0'><channel>"
+            f"<title>{nazev}</title>{obsah}</channel></rss>").encode('utf-8')
+
+
+# ====== MÍSTNÍ SERVER ======
+
+class Upstream(http.server.ThreadingHTTPServer):
+    """HTTP server s testovacími daty a nastavitelnými poruchami
+
+    Poruchy se zadávají podle předpony cesty (weather, horoscope,
+    calendar, rss, rss2 ...): zpoždění v sekundách, HTTP chyba nebo
+    zamrznutí (odpověď nepřijde dřív, než klient to vzdá).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, soubory, zpozdeni=None, chyby=None, zamrznuti=None):
+        super().__init__(('127.0.0.1', 0), _ObsluhaUpstream)
+        self.soubory = soubory
+        self.zpozdeni = zpozdeni or {}
+        self.chyby = chyby or {}
+        self.zamrznuti = set(zamrznuti or ())
+        self.odeslano = {}
+        self.zamek = threading.Lock()
+        self.konec = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def porucha(self, slovnik, cesta):
+        """Hodnota poruchy pro nejdelší odpovídající předponu cesty"""
+        klic = cesta.strip('/').split('?')[0].split('.')[0]
+        kandidati = [k for k in slovnik if klic == k or klic.startswith(k)]
+        return slovnik[max(kandidati, key=len)] if kandidati else None
+
+    def spust(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def zastav(self):
+        self.konec.set()
+        self.shutdown()
+        self.server_close()
+
+
+class _ObsluhaUpstream(http.server.BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def _odpovez(self):
+        server = self.server
+        cesta = self.path.split('?')[0]
+        zpozdeni = server.porucha(server.zpozdeni, cesta)
+        if zpozdeni:
+            time.sleep(zpozdeni)
+        if server.porucha({k: True for k in server.zamrznuti}, cesta):
+            server.konec.wait()
+            return
+        chyba = server.porucha(server.chyby, cesta)
+        if chyba:
+            self.send_error(int(chyba))
+            return
+        telo = server.soubory.get(cesta)
+        if telo is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(telo)))
+        self.end_headers()
+        try:
+            self.wfile.write(telo)
+            odeslano = len(telo)
+        except (BrokenPipeError, ConnectionResetError):
+            odeslano = 0
+        with server.zamek:
+            server.odeslano[cesta] = server.odeslano.get(cesta, 0) + odeslano
+
+    do_GET = _odpovez
+    do_POST = _odpovez
+
+
+class ZachytavaciTiskarna:
+    """Síťová "tiskárna" na místním portu, která počítá přijaté bajty a hlásí stav"""
+
+    def __init__(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(4)
+        self.port = self.server.getsockname()[1]
+        self.prijato = 0
+        threading.Thread(target=self._prijimej, daemon=True).start()
+
+    def _prijimej(self):
+        while True:
+            try:
+                spojeni, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._cti, args=(spojeni,), daemon=True).start()
+
+    def _cti(self, spojeni):
+        with spojeni:
+            while True:
+                data = spojeni.recv(65536)
+                if not data:
+                    return
+                # Dotazy na stav (DLE EOT n) - vždy připravena
+                dotazu = data.count(b'\x10\x04')
+                if dotazu:
+                    spojeni.sendall(b'\x12' * dotazu)
+                    data = data.replace(b'\x10\x04\x01', b'').replace(b'\x10\x04\x02', b'').replace(b'\x10\x04\x04', b'')
+                self.prijato += len(data)
+
+    def zavri(self):
+        self.server.close()
+
+
+# ====== MĚŘENÍ ======
+
+class Mereni:
+    """Součet časů jednotlivých sekcí a přečtené odpovědi během jednoho běhu"""
+
+    def __init__(self):
+        self.sekce = {}
+        self.odpovedi = []
+        self.zamek = threading.Lock()
+
+    def obal(self, modul, nazev, sekce):
+        """Nahradí funkci modulu verzí, která měří dobu běhu"""
+        puvodni = getattr(modul, nazev)
+
+        def merena(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return puvodni(*args, **kwargs)
+            finally:
+                with self.zamek:
+                    self.sekce[sekce] = self.sekce.get(sekce, 0) + time.perf_counter() - start
+
+        setattr(modul, nazev, merena)
+        return puvodni
+
+    def sleduj_odpovedi(self, modul, nazev):
+        """Nahradí funkci modulu verzí, která si pamatuje vrácené odpovědi requests"""
+        puvodni = getattr(modul, nazev)
+
+        def sledovana(*args, **kwargs):
+            odpoved = puvodni(*args, **kwargs)
+            with self.zamek:
+                self.odpovedi.append(odpoved)
+            return odpoved
+
+        setattr(modul, nazev, sledovana)
+        return puvodni
+
+    def stazeno(self):
+        """Bajty těl odpovědí, které klient opravdu přečetl ze spojení
+
+        Parser, který čtení ukončí dřív (RSS po potřebných položkách),
+        se tak projeví menším číslem - server by započítal celé tělo.
+        """
+        with self.zamek:
+            return sum(odpoved.raw.tell() for odpoved in self.odpovedi if odpoved.raw is not None)
+
+
+def _konfigurace(upstream, tiskarna, args):
+    kalendare = "\n".join(
+        f"calendar_{i + 1} = Kalendář {i + 1}|📅|{upstream.url}/calendar{i + 1}.ics"
+        for i in range(args.calendars)
+    )
+    feedy = "\n".join(
+        f"rss_{i + 1} = Zdroj {i + 1}|{upstream.url}/rss{i + 1}.xml"
+        for i in range(args.feeds)
+    )
+    return f"""[General]
+dry_run = false
+fetch_deadline = {args.deadline}
+cache_dir = cache
+
+[Weather]
+api_key = bench
+api_url = {upstream.url}/weather
+city = Prague
+country_code = CZ
+
+[Personal]
+zodiac_sign = leo
+horoscope_url = {upstream.url}/horoscope
+
+[Calendars]
+{kalendare}
+
+[RSS]
+{feedy}
+max_news = 5
+
+[Printer]
+type = network
+host = 127.0.0.1
+port = {tiskarna.port}
+retries = 0
+
+[Wardrobe]
+
+[Updates]
+check_updates = false
+"""
+
+
+def _porucha(hodnoty, prevod):
+    vysledek = {}
+    for hodnota in hodnoty or []:
+        klic, _, cislo = hodnota.partition('=')
+        vysledek[klic] = prevod(cislo)
+    return vysledek
+
+
+def jeden_beh(upstream, tiskarna, studeny, pamet=False):
+    """Projde celé vytiskni_prehled() v aktuálním adresáři a vrátí naměřené hodnoty"""
+    import fleet
+    import http_client
+    import print_daily
+
+    if studeny and os.path.exists('cache'):
+        shutil.rmtree('cache')
+
+    mereni = Mereni()
+    puvodni = {}
+    for modul, nazev, sekce in [
+        (print_daily, 'get_weather', 'pocasi'),
+        (print_daily, 'get_ical_events', 'kalendar'),
+        (print_daily, 'get_rss_news', 'zpravy'),
+        (print_daily, 'get_horoskop', 'horoskop'),
+        (print_daily, 'vykresli_prehled', 'vykresleni'),
+        (fleet, 'tiskni_vsude', 'tisk'),
+    ]:
+        puvodni[(modul, nazev)] = mereni.obal(modul, nazev, sekce)
+    for nazev in ('get', 'post'):
+        puvodni[(http_client, nazev)] = mereni.sleduj_odpovedi(http_client, nazev)
+
+    with upstream.zamek:
+        upstream.odeslano.clear()
+    prijato_pred = tiskarna.prijato
+
+    vystup = io.StringIO()
+    ok = True
+    # tracemalloc výrazně zpomaluje, proto jen na vyžádání
+    if pamet:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(vystup):
+            print_daily.nacti_nastaveni()
+            print_daily.vytiskni_prehled()
+    except SystemExit as e:
+        ok = not e.code
+    finally:
+        cas = time.perf_counter() - start
+        spicka = None
+        if pamet:
+            _, spicka = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        for (modul, nazev), funkce in puvodni.items():
+            setattr(modul, nazev, funkce)
+
+    # Tiskárna dostane data asynchronně, krátce počkáme na doručení
+    konec = time.monotonic() + 1
+    while tiskarna.prijato == prijato_pred and time.monotonic() < konec:
+        time.sleep(0.01)
+
+    return {
+        'studeny': studeny,
+        'ok': ok,
+        'cas_s': round(cas, 4),
+        'sekce_s': {nazev: round(hodnota, 4) for nazev, hodnota in mereni.sekce.items()},
+        'stazeno_b': mereni.stazeno(),
+        'odeslano_serverem_b': sum(upstream.odeslano.values()),
+        'vytisknuto_b': tiskarna.prijato - prijato_pred,
+        'spicka_pameti_b': spicka,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'vystup': vystup.getvalue().splitlines()[-5:] if not ok else [],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark tisku PrintMaster")
+    parser.add_argument('--runs', type=int, default=3, help="počet běhů")
+    parser.add_argument('--warm', action='store_true', help="ponechat cache mezi běhy")
+    parser.add_argument('--events', type=int, default=2000, help="událostí v každém kalendáři")
+    parser.add_argument('--calendars', type=int, default=2, help="počet kalendářů")
+    parser.add_argument('--feeds', type=int, default=4, help="počet RSS feedů")
+    parser.add_argument('--items', type=int, default=100, help="položek v každém feedu")
+    parser.add_argument('--description', type=int, default=2000, help="velikost popisu položky v bajtech")
+    parser.add_argument('--deadline', type=float, default=5, help="fetch_deadline v sekundách")
+    parser.add_argument('--latency', action='append', metavar='CESTA=S', help="zpoždění odpovědi")
+    parser.add_argument('--error', action='append', metavar='CESTA=KOD', help="HTTP chyba")
+    parser.add_argument('--hang', action='append', metavar='CESTA', help="odpověď nepřijde")
+    parser.add_argument('--memory', action='store_true', help="měřit špičku paměti přes tracemalloc (zpomalí běh)")
+    parser.add_argument('--output', help="připojit výsledek jako řádek JSON do souboru")
+    args = parser.parse_args()
+
+    soubory = {'/weather/weather': pocasi_json(), '/horoscope': horoskop_json()}
+    for i in range(args.calendars):
+        soubory[f'/calendar{i + 1}.ics'] = kalendar_ics(args.events)
+    for i in range(args.feeds):
+        soubory[f'/rss{i + 1}.xml'] = rss_xml(f"Zdroj {i + 1}", args.items, args.description)
+
+    upstream = Upstream(
+        soubory,
+        zpozdeni=_porucha(args.latency, float),
+        chyby=_porucha(args.error, int),
+        zamrznuti=args.hang,
+    ).spust()
+    tiskarna = ZachytavaciTiskarna()
+
+    # Výpisy programu (i opožděné z vláken) jdou na stderr, stdout patří JSONu
+    vystup_json = sys.stdout
+    sys.stdout = sys.stderr
+
+    puvodni_adresar = os.getcwd()
+    output = os.path.abspath(args.output) if args.output else None
+    pracovni = tempfile.mkdtemp(prefix='printmaster-bench-')
+    behy = []
+    try:
+        os.chdir(pracovni)
+        with open('config.ini', 'w', encoding='utf-8') as f:
+            f.write(_konfigurace(upstream, tiskarna, args))
+        for i in range(args.runs):
+            behy.append(jeden_beh(upstream, tiskarna, studeny=not args.warm or i == 0, pamet=args.memory))
+    finally:
+        os.chdir(puvodni_adresar)
+        shutil.rmtree(pracovni, ignore_errors=True)
+        upstream.zastav()
+        tiskarna.zavri()
+
+    import print_daily
+
+    vysledek = {
+        'verze': print_daily.VERSION,
+        'cas': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'stroj': platform.machine(),
+        'scenar': {k: v for k, v in vars(args).items() if k not in ('output', 'runs')},
+        'behy': behy,
+        'median_s': round(statistics.median(b['cas_s'] for b in behy), 4) if behy else None,
+    }
+
+    print(json.dumps(vysledek, ensure_ascii=False, indent=2), file=vystup_json)
+    if output:
+        with open(output, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(vysledek, ensure_ascii=False) + '\n')
+
+    if not all(beh['ok'] for beh in behy):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Předpočítaný převod textu do kódové stránky tiskárny (CP852 / PC-Latin2)
+PrintMaster - https://github.com/Quertz/printmaster
+
+Pro zvolenou kódovou stránku se jednou sestaví překladová tabulka
+znak -> bajt. Celý text se pak převede jediným str.translate a zakódováním
+do latin-1 (znak s kódem n = bajt n). Znaky, které kódová stránka nemá
+(emoji, typografické uvozovky, pomlčky), se přepíšou na nejbližší
+náhradu a náhrada se do tabulky uloží, takže se počítá jen jednou. Text bez
+chybějících znaků zakóduje rovnou kodek Pythonu.
+"""
+
+import unicodedata
+
+# Ruční přepis znaků, které CP852 nemá
+PREPIS = {
+    '„': '"', '“': '"', '”': '"', '«': '"', '»': '"',
+    '‚': "'", '‘': "'", '’': "'", '′': "'",
+    '–': '-', '—': '-', '−': '-', '‐': '-',
+    '…': '...', '•': '*', '·': '*',
+    '\u00a0': ' ', '\u2009': ' ', '\u202f': ' ', '\u200b': '',
+    '€': 'EUR', '™': '(TM)', '©': '(C)', '®': '(R)',
+    '→': '->', '←': '<-', '✓': 'v', '✔': 'v', '✗': 'x', '✘': 'x',
+    # Variační selektor a spojovník emoji
+    '\ufe0f': '', '\u200d': '',
+}
+
+NAHRADA = '?'
+
+
+class Tabulka(dict):
+    """Překladová tabulka pro str.translate s dopočítáním chybějících znaků"""
+
+    def __init__(self, kodovani):
+        super().__init__()
+        self.kodovani = kodovani
+        for bajt in range(256):
+            try:
+                znak = bytes([bajt]).decode(kodovani)
+            except UnicodeDecodeError:
+                continue
+            self.setdefault(ord(znak), chr(bajt))
+
+    def __missing__(self, kod):
+        znak = chr(kod)
+        nahrada = self._prepis(znak)
+        self[kod] = nahrada
+        return nahrada
+
+    def _prepis(self, znak):
+        if znak in PREPIS:
+            return PREPIS[znak].translate(self)
+        # Písmeno s diakritikou, kterou stránka nemá -> základní písmeno
+        rozlozeny = unicodedata.normalize('NFKD', znak)
+        zaklad = ''.join(z for z in rozlozeny if not unicodedata.combining(z))
+        if zaklad and zaklad != znak and all(ord(z) in self for z in zaklad):
+            return zaklad.translate(self)
+        # Emoji a symboly (ikony kalendářů) se vynechají, ostatní nahradí
+        if unicodedata.category(znak) in ('So', 'Sk', 'Cs', 'Co', 'Cf') or 0x1F000 <= ord(znak) <= 0x1FAFF:
+            return ''
+        return NAHRADA
+
+
+_TABULKY = {}
+
+
+def tabulka(kodovani):
+    """Vrátí (a jednou sestaví) překladovou tabulku pro kódování"""
+    if kodovani not in _TABULKY:
+        _TABULKY[kodovani] = Tabulka(kodovani)
+    return _TABULKY[kodovani]
+
+
+def prepis(text, kodovani='cp852'):
+    """Vrátí text tak, jak jej kódová stránka skutečně vytiskne
+
+    Chybějící znaky se nahradí stejně jako v koduj(), takže délku
+    výsledku lze měřit pro zalamování (náhrada '…' -> '...' je delší,
+    vynechané emoji nezabírá nic).
+    """
+    try:
+        text.encode(kodovani)
+        return text
+    except UnicodeEncodeError:
+        return text.translate(tabulka(kodovani)).encode('latin-1').decode(kodovani)
+
+
+def koduj(text, kodovani='cp852'):
+    """Převede text na bajty kódové stránky jedním průchodem
+
+    Text, který stránka pokryje celý, zakóduje přímo kodek (tabulka v C);
+    jen text s chybějícími znaky jde přes překladovou tabulku s přepisem.
+    """
+    try:
+        return text.encode(kodovani)
+    except UnicodeEncodeError:
+        return text.translate(tabulka(kodovani)).encode('latin-1')
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tisk jedné účtenky na více tiskáren najednou
+PrintMaster - https://github.com/Quertz/printmaster
+
+Tiskárny se definují v config.ini - výchozí sekce [Printer] a libovolný
+počet dalších sekcí [Printer.<název>]:
+
+    [Printer.kuchyn]
+    type = network
+    host = 192.168.1.50
+    port = 9100
+    timeout = 10
+    retries = 2
+    status = true
+    chunk_size = 1024
+    pause_timeout = 60
+    print_speed = 70
+
+    [Printer.pracovna]
+    type = usb
+    vendor_id = 0x0416
+    product_id = 0x5011
+
+Účtenka se vykreslí jednou do bajtů a každá tiskárna ji dostane přes
+vlastní frontu a vlastní vlákno s opakováním a časovým limitem, takže
+zaseknutá tiskárna nezdrží ostatní. Data jdou přes transport.Prenos
+(bloky s kontrolou stavu tiskárny, viz transport.py).
+"""
+
+import queue
+import threading
+import time
+
+VYCHOZI_PORT = 9100
+VYCHOZI_TIMEOUT = 10
+VYCHOZI_POKUSY = 2
+PRODLEVA_OPAKOVANI = 1.0
+VYCHOZI_PAUZA = 60
+VYCHOZI_RYCHLOST_TISKU = 70
+
+
+def _tiskarna_ze_sekce(nazev, sekce):
+    """Převede sekci konfigurace na popis tiskárny"""
+    return {
+        'nazev': nazev,
+        'typ': sekce.get('type', 'usb').strip().lower(),
+        'vendor_id': int(sekce.get('vendor_id', '0x0416'), 16),
+        'product_id': int(sekce.get('product_id', '0x5011'), 16),
+        'host': sekce.get('host', ''),
+        'port': sekce.getint('port', VYCHOZI_PORT),
+        'timeout': sekce.getfloat('timeout', VYCHOZI_TIMEOUT),
+        'pokusy': sekce.getint('retries', VYCHOZI_POKUSY),
+        'stav': sekce.getboolean('status', True),
+        'blok': sekce.getint('chunk_size', 0) or None,
+        'pauza': sekce.getfloat('pause_timeout', VYCHOZI_PAUZA),
+        'rychlost_tisku': sekce.getfloat('print_speed', VYCHOZI_RYCHLOST_TISKU),
+    }
+
+
+def nacti_tiskarny(config):
+    """Vrátí seznam tiskáren z konfigurace ([Printer] a [Printer.*])"""
+    tiskarny = []
+    for nazev_sekce in config.sections():
+        if nazev_sekce == 'Printer':
+            tiskarny.append(_tiskarna_ze_sekce('vychozi', config[nazev_sekce]))
+        elif nazev_sekce.startswith('Printer.'):
+            tiskarny.append(_tiskarna_ze_sekce(nazev_sekce.split('.', 1)[1], config[nazev_sekce]))
+    return tiskarny
+
+
+def otevri(tiskarna):
+    """Vytvoří objekt python-escpos pro popis tiskárny"""
+    if tiskarna['typ'] == 'network':
+        from escpos.printer import Network
+        return Network(tiskarna['host'], port=tiskarna['port'], timeout=tiskarna['timeout'])
+    if tiskarna['typ'] == 'usb':
+        from escpos.printer import Usb
+        return Usb(tiskarna['vendor_id'], tiskarna['product_id'], timeout=int(tiskarna['timeout'] * 1000))
+    raise ValueError(f"Neznámý typ tiskárny: {tiskarna['typ']}")
+
+
+class Uloha:
+    """Jedna účtenka pro jednu tiskárnu - výsledek se nastaví po dokončení"""
+
+    def __init__(self, data):
+        self.data = data
+        self.hotovo = threading.Event()
+        self.zrusena = threading.Event()
+        self.chyba = None
+        self.pokusu = 0
+
+    @property
+    def ok(self):
+        return self.hotovo.is_set() and self.chyba is None
+
+
+class Pracovnik(threading.Thread):
+    """Vlákno s vlastní frontou úloh pro jednu tiskárnu"""
+
+    def __init__(self, tiskarna, otevri_tiskarnu=otevri):
+        super().__init__(name=f"tiskarna-{tiskarna['nazev']}", daemon=True)
+        self.tiskarna = tiskarna
+        self.fronta = queue.Queue()
+        self._otevri = otevri_tiskarnu
+        self._zarizeni = None
+        self._prenos = None
+        # Úloha, kterou vlákno právě tiskne (pro přerušení po limitu)
+        self._zamek = threading.Lock()
+        self._aktualni = None
+
+    def zarad(self, data):
+        """Zařadí data do fronty tiskárny a vrátí úlohu"""
+        uloha = Uloha(data)
+        self.fronta.put(uloha)
+        return uloha
+
+    def zastav(self):
+        self.fronta.put(None)
+
+    def prerus(self, uloha):
+        """Zruší úlohu po vypršení limitu
+
+        Další pokusy se už nekonají a probíhající odeslání se přeruší
+        zavřením spojení. Spojení se zavře jen tehdy, když vlákno tiskne
+        právě tuto úlohu - následující úlohy se to nedotkne.
+        """
+        with self._zamek:
+            uloha.zrusena.set()
+            if self._aktualni is not uloha:
+                return
+            zarizeni, self._zarizeni, self._prenos = self._zarizeni, None, None
+        if zarizeni is not None:
+            try:
+                zarizeni.close()
+            except Exception:
+                pass
+
+    def run(self):
+        while True:
+            uloha = self.fronta.get()
+            if uloha is None:
+                self._zavri()
+                return
+            with self._zamek:
+                self._aktualni = uloha
+            if uloha.zrusena.is_set():
+                uloha.chyba = TimeoutError("úloha zrušena po vypršení limitu")
+            else:
+                self._zpracuj(uloha)
+            with self._zamek:
+                self._aktualni = None
+            uloha.hotovo.set()
+
+    def _zpracuj(self, uloha):
+        import telemetry
+        import transport
+
+        for pokus in range(self.tiskarna['pokusy'] + 1):
+            if uloha.zrusena.is_set():
+                # Po vypršení limitu se už neopakuje - úlohu převezme jiný pokus
+                uloha.chyba = TimeoutError("úloha zrušena po vypršení limitu")
+                return
+            uloha.pokusu = pokus + 1
+            start = time.perf_counter()
+            try:
+                if self._zarizeni is None:
+                    self._zarizeni = self._otevri(self.tiskarna)
+                    # Ručně sestavený popis tiskárny (bez konfigurace) stav nekontroluje
+                    self._prenos = transport.Prenos(self._zarizeni, self.tiskarna['nazev'],
+                                                    blok=self.tiskarna.get('blok'),
+                                                    kontrolovat_stav=self.tiskarna.get('stav', False),
+                                                    max_pauza=self.tiskarna.get('pauza', VYCHOZI_PAUZA))
+                # Spojení může zavřít prerus() z jiného vlákna
+                prenos = self._prenos
+                prenos.odesli(uloha.data)
+                uloha.chyba = None
+                telemetry.zaznamenej('printer', time.perf_counter() - start, tiskarna=self.tiskarna['nazev'],
+                                     pokus=pokus + 1, bajty=len(uloha.data), blok=prenos.blok,
+                                     rychlost_b_s=prenos.rychlost_b_s)
+                return
+            except Exception as e:
+                uloha.chyba = e
+                telemetry.zaznamenej('printer', time.perf_counter() - start, tiskarna=self.tiskarna['nazev'],
+                                     pokus=pokus + 1, chyba=f"{type(e).__name__}: {e}")
+                # Po chybě se spojení naváže znovu
+                self._zavri()
+                if pokus < self.tiskarna['pokusy']:
+                    time.sleep(PRODLEVA_OPAKOVANI * (2 ** pokus))
+
+    def _zavri(self):
+        with self._zamek:
+            zarizeni, self._zarizeni, self._prenos = self._zarizeni, None, None
+        if zarizeni is not None:
+            try:
+                zarizeni.close()
+            except Exception:
+                pass
+
+
+def limit_ulohy(tiskarna, data=None):
+    """Nejdelší doba, po kterou se čeká na jednu tiskárnu
+
+    S daty se připočte odhad doby tisku a případná pauza (došlý papír).
+    """
+    import transport
+
+    pokusy = tiskarna['pokusy'] + 1
+    prodlevy = sum(PRODLEVA_OPAKOVANI * (2 ** i) for i in range(tiskarna['pokusy']))
+    limit = tiskarna['timeout'] * pokusy + prodlevy
+    if data is not None:
+        odhad = transport.odhad_ms(data, tiskarna['nazev'],
+                                   tiskarna.get('rychlost_tisku', VYCHOZI_RYCHLOST_TISKU)) / 1000
+        pauza = tiskarna.get('pauza', VYCHOZI_PAUZA) if tiskarna.get('stav', False) else 0
+        limit += (odhad + pauza) * pokusy
+    return limit
+
+
+def tiskni_vsude(tiskarny, data, otevri_tiskarnu=otevri):
+    """Pošle stejná data na všechny tiskárny souběžně
+
+    Vrátí slovník nazev -> Uloha. Úloha, která nedoběhla v limitu,
+    má hotovo nenastavené a chybu TimeoutError; její odesílání se
+    přeruší, takže se účtenka po ohlášení chyby už nevytiskne.
+    """
+    return tiskni_davku([(tiskarny, data)], otevri_tiskarnu)[0]
+
+
+def tiskni_davku(zakazky, otevri_tiskarnu=otevri):
+    """Pošle více účtenek, každou na její seznam tiskáren
+
+    Zakázky jsou dvojice (tiskárny, data). Každá tiskárna má jedno
+    vlákno a jedno spojení pro všechny své účtenky, tiskárny běží
+    souběžně. Vrátí seznam slovníků nazev -> Uloha v pořadí zakázek.
+    """
+    pracovnici = {}
+    vysledky = []
+    for tiskarny, data in zakazky:
+        ulohy = {}
+        for tiskarna in tiskarny:
+            if tiskarna['nazev'] not in pracovnici:
+                pracovnici[tiskarna['nazev']] = Pracovnik(tiskarna, otevri_tiskarnu)
+                pracovnici[tiskarna['nazev']].start()
+            ulohy[tiskarna['nazev']] = pracovnici[tiskarna['nazev']].zarad(data)
+        vysledky.append(ulohy)
+    for pracovnik in pracovnici.values():
+        pracovnik.zastav()
+
+    # Úlohy jedné tiskárny běží za sebou - limit roste s jejich počtem
+    start = time.monotonic()
+    for nazev, pracovnik in pracovnici.items():
+        termin = start
+        for ulohy in vysledky:
+            uloha = ulohy.get(nazev)
+            if uloha is None:
+                continue
+            limit = limit_ulohy(pracovnik.tiskarna, uloha.data)
+            termin += limit
+            if not uloha.hotovo.wait(max(0, termin - time.monotonic())):
+                # Ohlášená chyba platí - zaseknutý pokus se přeruší a už se neopakuje
+                pracovnik.prerus(uloha)
+                uloha.chyba = TimeoutError(f"tiskárna neodpověděla do {limit:g} s")
+
+    return vysledky
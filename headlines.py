@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Odstranění duplicitních titulků napříč zdroji a index vytištěných zpráv
+PrintMaster - https://github.com/Quertz/printmaster
+
+Titulek se převede na množinu normalizovaných slov (bez diakritiky,
+bez krátkých slov, zkrácených na kmen) a z ní na podpis MinHash.
+Podobné titulky ("Vláda schválila rozpočet" / "Rozpočet schválila vláda")
+mají podobné podpisy. Hledání kandidátů jde přes LSH koše, takže cena
+nezávisí na počtu uložených titulků.
+
+Vytištěné titulky se ukládají do omezeného indexu na disku; další
+účtenka dá přednost zprávám, které ještě vytištěné nebyly.
+"""
+
+import json
+import os
+import re
+import tempfile
+import time
+import unicodedata
+import zlib
+
+# Kolik titulků se bere z každého zdroje jako kandidáti na výběr
+KANDIDATU = 6
+
+POCET_HASHU = 16
+RADKU_V_PASMU = 2
+PRAH_PODOBNOSTI = 0.5
+DELKA_KMENE = 5
+
+MAX_ZAZNAMU = 2000
+MAX_STARI_DNI = 7
+
+_PRVOCISLO = (1 << 61) - 1
+_KOEFICIENTY = [((i * 0x9E3779B1 + 1) % _PRVOCISLO, (i * 0x85EBCA77 + 7) % _PRVOCISLO)
+                for i in range(1, POCET_HASHU + 1)]
+
+_SLOVO = re.compile(r"\w+")
+
+
+def normalizuj(titulek):
+    """Množina kmenů slov titulku bez diakritiky a krátkých slov"""
+    bez_diakritiky = unicodedata.normalize('NFKD', titulek.lower())
+    bez_diakritiky = ''.join(z for z in bez_diakritiky if not unicodedata.combining(z))
+    return frozenset(slovo[:DELKA_KMENE] for slovo in _SLOVO.findall(bez_diakritiky)
+                     if len(slovo) > 2 or slovo.isdigit())
+
+
+def podpis(slova):
+    """MinHash podpis množiny slov (stabilní mezi běhy)"""
+    if not slova:
+        return ()
+    hodnoty = [zlib.crc32(slovo.encode('utf-8')) for slovo in slova]
+    return tuple(min((a * h + b) % _PRVOCISLO for h in hodnoty) for a, b in _KOEFICIENTY)
+
+
+def podobnost(podpis_a, podpis_b):
+    """Odhad Jaccardovy podobnosti ze shody podpisů"""
+    if not podpis_a or not podpis_b:
+        return 0.0
+    return sum(a == b for a, b in zip(podpis_a, podpis_b)) / POCET_HASHU
+
+
+def _pasma(podpis_titulku):
+    for i in range(0, POCET_HASHU, RADKU_V_PASMU):
+        yield i, podpis_titulku[i:i + RADKU_V_PASMU]
+
+
+class Index:
+    """Omezená množina podpisů s LSH koši pro rychlé hledání podobných"""
+
+    def __init__(self, cesta=None):
+        self.cesta = cesta
+        self.zaznamy = []
+        self._kose = {}
+        if cesta:
+            self._nacti()
+
+    def _nacti(self):
+        try:
+            with open(self.cesta, 'r', encoding='utf-8') as f:
+                ulozene = json.load(f)
+        except (OSError, ValueError):
+            return
+        hranice = time.time() - MAX_STARI_DNI * 86400
+        for cas, podpis_titulku in ulozene[-MAX_ZAZNAMU:]:
+            if cas >= hranice:
+                self._pridej(cas, tuple(podpis_titulku))
+
+    def _pridej(self, cas, podpis_titulku):
+        self.zaznamy.append((cas, podpis_titulku))
+        for pasmo in _pasma(podpis_titulku):
+            self._kose.setdefault(pasmo, []).append(podpis_titulku)
+
+    def pridej(self, podpis_titulku):
+        if podpis_titulku:
+            self._pridej(time.time(), podpis_titulku)
+
+    def obsahuje(self, podpis_titulku):
+        """Zda index obsahuje podobný titulek"""
+        if not podpis_titulku:
+            return False
+        for pasmo in _pasma(podpis_titulku):
+            for kandidat in self._kose.get(pasmo, ()):
+                if podobnost(podpis_titulku, kandidat) >= PRAH_PODOBNOSTI:
+                    return True
+        return False
+
+    def uloz(self):
+        """Atomicky uloží nejnovější záznamy"""
+        adresar = os.path.dirname(self.cesta) or '.'
+        os.makedirs(adresar, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=adresar, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.zaznamy[-MAX_ZAZNAMU:], f)
+            os.replace(tmp, self.cesta)
+        except OSError as e:
+            print(f"Varování: nelze uložit index titulků: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def vyber(kandidati, max_zprav, na_zdroj=2, vytistene=None):
+    """Vybere až max_zprav různých zpráv, nevytištěné mají přednost
+
+    Kandidáti jsou zprávy ve tvaru {'titulek', 'zdroj'} v pořadí zdrojů
+    a feedů. Z jednoho zdroje se vezme nejvýše na_zdroj zpráv. Pokud
+    nových zpráv není dost, doplní se už vytištěné (ale stále různé).
+    """
+    vybrane = []
+    videne = Index()
+    z_vytistenych = []
+    ze_zdroje = {}
+
+    for zprava in kandidati:
+        podpis_titulku = podpis(normalizuj(zprava['titulek']))
+        if videne.obsahuje(podpis_titulku):
+            continue
+        if ze_zdroje.get(zprava['zdroj'], 0) >= na_zdroj:
+            continue
+        videne.pridej(podpis_titulku)
+        if vytistene is not None and vytistene.obsahuje(podpis_titulku):
+            z_vytistenych.append(zprava)
+            continue
+        ze_zdroje[zprava['zdroj']] = ze_zdroje.get(zprava['zdroj'], 0) + 1
+        vybrane.append(zprava)
+        if len(vybrane) >= max_zprav:
+            return vybrane
+
+    for zprava in z_vytistenych:
+        if len(vybrane) >= max_zprav:
+            break
+        if ze_zdroje.get(zprava['zdroj'], 0) < na_zdroj:
+            ze_zdroje[zprava['zdroj']] = ze_zdroje.get(zprava['zdroj'], 0) + 1
+            vybrane.append(zprava)
+
+    # Doplněné zprávy se vrátí v původním pořadí kandidátů
+    poradi = {id(zprava): i for i, zprava in enumerate(kandidati)}
+    return sorted(vybrane, key=lambda zprava: poradi[id(zprava)])
+
+
+def zaznamenej(cesta, zpravy):
+    """Přidá vytištěné titulky do indexu na disku"""
+    index = Index(cesta)
+    for zprava in zpravy or []:
+        index.pridej(podpis(normalizuj(zprava['titulek'])))
+    index.uloz()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perzistentní HTTP cache s podmíněnými dotazy (ETag / Last-Modified)
+PrintMaster - https://github.com/Quertz/printmaster
+
+Každá URL má v adresáři cache tři soubory:
+  <hash>.meta   - JSON s validátory (ETag, Last-Modified)
+  <hash>.body   - poslední stažené tělo odpovědi
+  <hash>.parsed - volitelně už zpracovaný výsledek (pickle)
+
+Odpověď 304 Not Modified znovu použije uložené tělo a případně
+i zpracovaný výsledek, takže se nic nestahuje ani neparsuje znovu.
+Proudové čtení (rss_stream.py) ukládá jen validátory a výsledek, bez těla.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+
+ADRESAR = os.path.join('cache', 'http')
+VELIKOST_BLOKU = 64 * 1024
+
+
+class Odpoved:
+    """Výsledek stažení - stav, cesta k tělu a zda přišlo z cache"""
+
+    def __init__(self, url, status, cesta=None, z_cache=False):
+        self.url = url
+        self.status = status
+        self.cesta = cesta
+        self.z_cache = z_cache
+
+    @property
+    def ok(self):
+        return self.status == 200 and self.cesta is not None
+
+    def obsah(self):
+        """Vrátí celé tělo odpovědi jako bytes"""
+        with open(self.cesta, 'rb') as f:
+            return f.read()
+
+
+def _klic(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _cesta(url, pripona):
+    return os.path.join(ADRESAR, _klic(url) + pripona)
+
+
+def _zapis_atomicky(cesta, data):
+    """Zapíše soubor přes dočasný soubor a přejmenování"""
+    fd, tmp = tempfile.mkstemp(dir=ADRESAR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, cesta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def nacti_meta(url):
+    """Vrátí uložené validátory pro URL (nebo prázdný slovník)"""
+    try:
+        with open(_cesta(url, '.meta'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def podminene_hlavicky(url):
+    """Hlavičky If-None-Match / If-Modified-Since z uložených validátorů"""
+    meta = nacti_meta(url)
+    hlavicky = {}
+    if meta.get('etag'):
+        hlavicky['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        hlavicky['If-Modified-Since'] = meta['last_modified']
+    return hlavicky
+
+
+def uloz_meta(url, hlavicky_odpovedi):
+    """Uloží validátory z hlaviček odpovědi 200"""
+    os.makedirs(ADRESAR, exist_ok=True)
+    meta = {
+        'url': url,
+        'etag': hlavicky_odpovedi.get('ETag'),
+        'last_modified': hlavicky_odpovedi.get('Last-Modified'),
+        'ulozeno': time.time(),
+    }
+    _zapis_atomicky(_cesta(url, '.meta'), json.dumps(meta).encode('utf-8'))
+
+
+def stahni(url, headers=None, timeout=10):
+    """Stáhne URL s podmíněným GET a tělo uloží do cache
+
+    Tělo se zapisuje na disk po blocích, v paměti se nikdy nedrží celé.
+    """
+    import telemetry
+
+    with telemetry.span('http', url=telemetry.adresa(url)) as s:
+        try:
+            odpoved = _stahni(url, headers, timeout)
+        except Exception as e:
+            # Text výjimky obsahuje celou adresu - do telemetrie jen typ
+            s['chyba'] = type(e).__name__
+            raise
+        s['status'] = odpoved.status
+        s['cache'] = 'hit' if odpoved.z_cache else 'miss'
+        if odpoved.ok and not odpoved.z_cache:
+            s['bajty'] = os.path.getsize(odpoved.cesta)
+        return odpoved
+
+
+def _stahni(url, headers, timeout):
+    import http_client
+
+    os.makedirs(ADRESAR, exist_ok=True)
+
+    cesta_tela = _cesta(url, '.body')
+    hlavicky = dict(headers or {})
+
+    if os.path.exists(cesta_tela):
+        hlavicky.update(podminene_hlavicky(url))
+
+    with http_client.get(url, headers=hlavicky, timeout=timeout, stream=True, allow_redirects=True) as response:
+        if response.status_code == 304 and os.path.exists(cesta_tela):
+            return Odpoved(url, 200, cesta_tela, z_cache=True)
+
+        if response.status_code != 200:
+            return Odpoved(url, response.status_code)
+
+        fd, tmp = tempfile.mkstemp(dir=ADRESAR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for blok in response.iter_content(VELIKOST_BLOKU):
+                    f.write(blok)
+            os.replace(tmp, cesta_tela)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        # Nové tělo znamená, že starý zpracovaný výsledek už neplatí
+        if os.path.exists(_cesta(url, '.parsed')):
+            os.remove(_cesta(url, '.parsed'))
+
+        uloz_meta(url, response.headers)
+
+    return Odpoved(url, 200, cesta_tela)
+
+
+def nacti_vysledek(url, klic):
+    """Vrátí zpracovaný výsledek uložený pro aktuální tělo URL
+
+    Klíč odlišuje různé pohledy na stejná data (např. datum u kalendáře).
+    Pokud výsledek neexistuje nebo patří k jinému klíči, vrátí None.
+    """
+    try:
+        with open(_cesta(url, '.parsed'), 'rb') as f:
+            ulozeny_klic, hodnota = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+        return None
+
+    return hodnota if ulozeny_klic == klic else None
+
+
+def uloz_vysledek(url, klic, hodnota):
+    """Uloží zpracovaný výsledek k aktuálnímu tělu URL"""
+    os.makedirs(ADRESAR, exist_ok=True)
+    _zapis_atomicky(_cesta(url, '.parsed'), pickle.dumps((klic, hodnota)))
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sdílený HTTP klient pro všechna stahování
+PrintMaster - https://github.com/Quertz/printmaster
+
+Všechny zdroje (počasí, horoskop, kalendáře, RSS, aktualizace) jdou přes
+jednu requests.Session na proces:
+
+- pool spojení pro každý host s keep-alive - více kalendářů na
+  calendar.google.com nebo více feedů jednoho webu sdílí spojení
+  a TLS handshake proběhne jen jednou,
+- omezený počet opakování s exponenciální prodlevou a náhodným
+  rozptylem (chyby spojení a stavy 429/5xx),
+- výsledky DNS dotazů se v procesu pamatují po DNS_PLATNOST sekund,
+- jednotný User-Agent.
+
+Stahování pro tisk má termín (fetch_deadline). Funkce spuštěná přes
+s_terminem() ho předá svým dotazům: timeout pokusu se omezí na zbývající
+čas a opakuje se jen tolikrát, kolik pokusů se do termínu vejde. Po
+termínu nový dotaz hned skončí výjimkou - vlákna, na která už tisk
+nečeká, se nezdržují dalšími pokusy.
+"""
+
+import os
+import socket
+import threading
+import time
+
+USER_AGENT = "Mozilla/5.0 (compatible; PrintMaster/1.0; +https://github.com/Quertz/printmaster)"
+
+VYCHOZI_TIMEOUT = 10
+# Počet hostů s vlastním poolem a spojení v poolu jednoho hostu
+POCET_POOLU = 16
+SPOJENI_NA_HOST = 8
+
+POKUSU = 2
+PRODLEVA = 0.3
+ROZPTYL = 0.3
+OPAKOVAT_STAVY = (429, 500, 502, 503, 504)
+
+DNS_PLATNOST = 300
+
+_zamek = threading.Lock()
+_session = None
+_pid = None
+_dns = {}
+# Termín (time.monotonic) dotazů vlákna a opakování omezená termínem
+_mistni = threading.local()
+
+
+def _resolvuj(host, port, rodina):
+    """Adresy hostu z cache, nebo z getaddrinfo (výsledek se zapamatuje)"""
+    klic = (host, port, rodina)
+    with _zamek:
+        zaznam = _dns.get(klic)
+    if zaznam and time.monotonic() - zaznam[0] < DNS_PLATNOST:
+        return zaznam[1]
+    adresy = [info[4][0] for info in socket.getaddrinfo(host, port, rodina, socket.SOCK_STREAM)]
+    # Stejná adresa může přijít víckrát (pro různé protokoly)
+    adresy = list(dict.fromkeys(adresy))
+    with _zamek:
+        _dns[klic] = (time.monotonic(), adresy)
+    return adresy
+
+
+class _DnsCache:
+    """Spojení urllib3, které bere adresu hostu z DNS cache
+
+    Připojuje se na adresu z cache; když žádná nefunguje, záznam se
+    zahodí a host se příště přeloží znovu. Platí jen pro spojení sdílené
+    session - ostatní uživatelé urllib3 v procesu se nemění.
+    """
+
+    def _new_conn(self):
+        from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+        from urllib3.util import connection
+
+        host = self._dns_host
+        klic = (host, self.port, connection.allowed_gai_family())
+        try:
+            adresy = _resolvuj(*klic)
+        except OSError:
+            return super()._new_conn()
+
+        chyba = None
+        for adresa in adresy:
+            # Jen pro připojení soketu - TLS (SNI, ověření certifikátu) dostane zpět jméno hostu
+            self._dns_host = adresa
+            try:
+                return super()._new_conn()
+            except (ConnectTimeoutError, NewConnectionError) as e:
+                chyba = e
+            finally:
+                self._dns_host = host
+        # Adresa se mohla změnit - příště se host přeloží znovu
+        with _zamek:
+            _dns.pop(klic, None)
+        raise chyba
+
+
+def _adapter():
+    """HTTPAdapter, jehož pooly vytvářejí spojení s DNS cache"""
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class Spojeni(_DnsCache, HTTPConnection):
+        pass
+
+    class SpojeniTLS(_DnsCache, HTTPSConnection):
+        pass
+
+    class Pool(HTTPConnectionPool):
+        ConnectionCls = Spojeni
+
+    class PoolTLS(HTTPSConnectionPool):
+        ConnectionCls = SpojeniTLS
+
+    class Adapter(HTTPAdapter):
+        # Opakování se čtou při každém dotazu - v termínu platí omezená pro vlákno
+        @property
+        def max_retries(self):
+            return getattr(_mistni, 'opakovani', None) or self._max_retries
+
+        @max_retries.setter
+        def max_retries(self, hodnota):
+            self._max_retries = hodnota
+
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {'http': Pool, 'https': PoolTLS}
+
+        def send(self, request, timeout=None, **kwargs):
+            import requests
+
+            termin = getattr(_mistni, 'termin', None)
+            if termin is None:
+                return super().send(request, timeout=timeout, **kwargs)
+            zbyva = termin - time.monotonic()
+            if zbyva <= 0:
+                raise requests.exceptions.ConnectTimeout("vypršel limit načítání", request=request)
+            timeout, opakovani = _v_terminu(timeout, zbyva)
+            _mistni.opakovani = self._max_retries.new(total=opakovani)
+            try:
+                return super().send(request, timeout=timeout, **kwargs)
+            finally:
+                _mistni.opakovani = None
+
+    return Adapter(pool_connections=POCET_POOLU, pool_maxsize=SPOJENI_NA_HOST, max_retries=_retry())
+
+
+def _v_terminu(timeout, zbyva):
+    """Timeout pokusu (spojení, čtení) a počet opakování, které se vejdou do zbývajícího času"""
+    spojeni, cteni = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    spojeni = zbyva if spojeni is None else min(spojeni, zbyva)
+    cteni = zbyva if cteni is None else min(cteni, zbyva)
+    # Každý pokus může trvat až do timeoutu
+    opakovani = min(POKUSU, int(zbyva // max(spojeni, cteni)) - 1)
+    return (spojeni, cteni), max(0, opakovani)
+
+
+def s_terminem(funkce, termin=None):
+    """Obalí funkci pro pool vláken tak, aby její dotazy dodržely termín
+
+    Termín je čas time.monotonic(); bez něj se převezme termín
+    volajícího vlákna (vnořené pooly tak dodrží termín celého načítání).
+    """
+    if termin is None:
+        termin = getattr(_mistni, 'termin', None)
+
+    def v_terminu(*args, **kwargs):
+        predchozi = getattr(_mistni, 'termin', None)
+        _mistni.termin = termin
+        try:
+            return funkce(*args, **kwargs)
+        finally:
+            _mistni.termin = predchozi
+
+    return v_terminu
+
+
+def _retry():
+    from urllib3.util.retry import Retry
+
+    parametry = dict(
+        total=POKUSU,
+        read=1,
+        backoff_factor=PRODLEVA,
+        status_forcelist=OPAKOVAT_STAVY,
+        # Chybový stav se vrátí volajícímu, výjimka by zakryla status
+        raise_on_status=False,
+        # Retry-After by mohl zdržet tisk o hodiny
+        respect_retry_after_header=False,
+    )
+    try:
+        return Retry(backoff_jitter=ROZPTYL, **parametry)
+    except TypeError:
+        # urllib3 1.x nezná backoff_jitter
+        return Retry(**parametry)
+
+
+def _nova_session():
+    import requests
+
+    session = requests.Session()
+    adapter = _adapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def session():
+    """Sdílená session procesu (po forku se vytvoří nová - spojení se nesdílí)"""
+    global _session, _pid
+    with _zamek:
+        if _session is None or _pid != os.getpid():
+            _session = _nova_session()
+            _pid = os.getpid()
+        return _session
+
+
+def get(url, **kwargs):
+    kwargs.setdefault('timeout', VYCHOZI_TIMEOUT)
+    return session().get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    kwargs.setdefault('timeout', VYCHOZI_TIMEOUT)
+    return session().post(url, **kwargs)
+
+
+def zavri():
+    """Zavře všechna spojení sdílené session"""
+    global _session
+    with _zamek:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perzistentní index výskytů událostí pro jednotlivé kalendáře
+PrintMaster - https://github.com/Quertz/printmaster
+
+Index drží výskyty všech událostí kalendáře v horizontu několika týdnů,
+seřazené podle začátku. Každá VEVENT je v indexu uložená pod klíčem
+(UID, RECURRENCE-ID) spolu s otiskem svého obsahu (událost bez UID pod
+otiskem, opakovaný UID s pořadovým číslem). Když se kalendář změní,
+znovu se rozvíjí jen přidané a změněné události a odebrané zmizí; dotazy typu "dnes", "příštích 7 dní" nebo "další událost"
+jsou pak jen bisect nad seřazenými začátky.
+"""
+
+import bisect
+import datetime
+import hashlib
+import os
+import pickle
+import tempfile
+
+from dateutil import tz
+
+import ical_stream
+
+ADRESAR = os.path.join('cache', 'ical')
+VERZE_INDEXU = 1
+
+# Jak daleko do budoucnosti se výskyty předpočítávají
+HORIZONT = datetime.timedelta(days=31)
+
+
+def otisk_bloku(blok):
+    """Otisk obsahu VEVENT; DTSTAMP se ignoruje, protože se mění při každém exportu"""
+    h = hashlib.sha1()
+    for radek in blok:
+        if not radek.startswith('DTSTAMP'):
+            h.update(radek.encode('utf-8'))
+            h.update(b'\n')
+    return h.hexdigest()
+
+
+def klic_bloku(blok, otisk=''):
+    """Klíč VEVENT v indexu - UID a případně RECURRENCE-ID
+
+    Událost bez UID identifikuje otisk jejího obsahu (jinak by se všechny
+    takové události v indexu přepsaly pod prázdným klíčem).
+    """
+    uid = ical_stream.vlastnost(blok, 'UID') or f"#{otisk}"
+    return uid, ical_stream.vlastnost(blok, 'RECURRENCE-ID') or ''
+
+
+class IndexKalendare:
+    """Index výskytů jednoho kalendáře uložený mezi spuštěními"""
+
+    def __init__(self, url, mistni=None, adresar=None):
+        self.url = url
+        self.mistni = mistni or tz.tzlocal()
+        self.adresar = adresar or ADRESAR
+        self.cesta = os.path.join(self.adresar, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.idx')
+        self.od = None
+        self.do = None
+        # klic -> (otisk, výskyty, přepsaný termín nebo None)
+        self.udalosti = {}
+        self.starty = []
+        self.vyskyty = []
+        self.max_trvani = datetime.timedelta(0)
+        self._nacti()
+
+    def _nacti(self):
+        try:
+            with open(self.cesta, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return
+        if data.get('verze') != VERZE_INDEXU:
+            return
+        self.od = data['od']
+        self.do = data['do']
+        self.udalosti = data['udalosti']
+        self._serad()
+
+    def uloz(self):
+        """Atomicky uloží index na disk"""
+        os.makedirs(self.adresar, exist_ok=True)
+        data = {'verze': VERZE_INDEXU, 'od': self.od, 'do': self.do, 'udalosti': self.udalosti}
+        fd, tmp = tempfile.mkstemp(dir=self.adresar, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.cesta)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def pokryva(self, od, do):
+        """Zda index obsahuje výskyty pro celé okno <od, do)"""
+        return self.od is not None and self.od <= od and do <= self.do
+
+    def aktualizuj(self, cesta_tela, od, do, zmeneno=True):
+        """Zaktualizuje index ze staženého kalendáře
+
+        Pokud se kalendář nezměnil a index pokrývá požadované okno,
+        nic se nečte. Jinak se projdou bloky VEVENT a znovu se rozvinou
+        jen ty, jejichž otisk se změnil. Když okno vybočí z horizontu,
+        index se přepočítá pro nový horizont.
+        Vrátí počet znovu rozvinutých událostí.
+        """
+        if not zmeneno and self.pokryva(od, do):
+            return 0
+
+        if not self.pokryva(od, do):
+            # Nový horizont - všechny události je potřeba rozvinout znovu
+            self.od = od - datetime.timedelta(days=1)
+            self.do = max(do, od + HORIZONT)
+            stare = {}
+        else:
+            stare = self.udalosti
+
+        nove = {}
+        rozvinuto = 0
+        with open(cesta_tela, 'rb') as soubor:
+            for blok in ical_stream.vevent_bloky(ical_stream.rozvin_radky(soubor)):
+                otisk = otisk_bloku(blok)
+                klic = zaklad = klic_bloku(blok, otisk)
+                # Feed se stejným UID u více událostí - každá dostane pořadové číslo
+                poradi = 1
+                while klic in nove:
+                    klic = zaklad + (poradi,)
+                    poradi += 1
+
+                puvodni = stare.get(klic)
+                if puvodni is not None and puvodni[0] == otisk:
+                    nove[klic] = puvodni
+                    continue
+
+                nove[klic] = (otisk,) + self._rozvin_blok(blok)
+                rozvinuto += 1
+
+        self.udalosti = nove
+        self._serad()
+        self.uloz()
+        return rozvinuto
+
+    def _rozvin_blok(self, blok):
+        """Vrátí (výskyty v horizontu, přepsaný termín) pro jeden blok"""
+        prepsany = None
+        if not ical_stream.muze_zasahnout(blok, self.od, self.do):
+            return [], None
+
+        udalost = ical_stream.parsuj_blok(blok)
+        if udalost is None:
+            return [], None
+
+        if udalost.get('RECURRENCE-ID') is not None:
+            prepsany = ical_stream.na_mistni(udalost['RECURRENCE-ID'].dt, self.mistni)
+        if str(udalost.get('STATUS', '')).upper() == 'CANCELLED':
+            return [], prepsany
+
+        return ical_stream.rozvin(udalost, self.od, self.do, self.mistni), prepsany
+
+    def _serad(self):
+        """Sestaví seřazené pole výskytů s uplatněním přepsaných termínů"""
+        prepsane = {
+            (klic[0], prepsany)
+            for klic, (_, _, prepsany) in self.udalosti.items()
+            if prepsany is not None
+        }
+        vyskyty = [
+            v
+            for _, seznam, _ in self.udalosti.values()
+            for v in seznam
+            if v['prepis'] or (v['uid'], v['puvodni']) not in prepsane
+        ]
+        vyskyty.sort(key=lambda v: v['zacatek'])
+        self.vyskyty = vyskyty
+        self.starty = [v['zacatek'] for v in vyskyty]
+        self.max_trvani = max((v['konec'] - v['zacatek'] for v in vyskyty), default=datetime.timedelta(0))
+
+    def v_okne(self, od, do):
+        """Výskyty, které zasahují do okna <od, do), seřazené podle začátku"""
+        zacatek = bisect.bisect_left(self.starty, od - self.max_trvani)
+        konec = bisect.bisect_left(self.starty, do)
+        return [
+            v for v in self.vyskyty[zacatek:konec]
+            if v['konec'] > od or v['zacatek'] >= od
+        ]
+
+    def zacinajici_v(self, od, do):
+        """Výskyty, které začínají v okně <od, do)"""
+        zacatek = bisect.bisect_left(self.starty, od)
+        konec = bisect.bisect_left(self.starty, do)
+        return self.vyskyty[zacatek:konec]
+
+    def dalsi_po(self, cas):
+        """První výskyt začínající v čase cas nebo později (nebo None)"""
+        i = bisect.bisect_left(self.starty, cas)
+        return self.vyskyty[i] if i < len(self.vyskyty) else None
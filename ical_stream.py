@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Proudové čtení iCal kalendářů omezené na časové okno
+PrintMaster - https://github.com/Quertz/printmaster
+
+Kalendář se čte řádek po řádku. Celé se parsují jen bloky VEVENT,
+které mohou zasáhnout do požadovaného okna, a opakování (RRULE, RDATE,
+EXDATE, RECURRENCE-ID) se rozvíjí jen uvnitř okna. Paměť tak nezávisí
+na velikosti ani stáří kalendáře.
+"""
+
+import datetime
+
+from dateutil import rrule, tz
+from icalendar import Event
+from icalendar.prop import vDuration
+
+# Rezerva pro rychlé předfiltrování podle data (posuny časových pásem)
+REZERVA = datetime.timedelta(days=1)
+
+
+def rozvin_radky(soubor):
+    """Vrací logické řádky iCal souboru (spojí zalomené řádky podle RFC 5545)
+
+    Soubor může být otevřený binárně i textově.
+    """
+    aktualni = None
+    for radek in soubor:
+        if isinstance(radek, bytes):
+            radek = radek.decode('utf-8', errors='replace')
+        radek = radek.rstrip('\r\n')
+        if radek[:1] in (' ', '\t'):
+            if aktualni is not None:
+                aktualni += radek[1:]
+            continue
+        if aktualni is not None:
+            yield aktualni
+        aktualni = radek
+    if aktualni:
+        yield aktualni
+
+
+def vevent_bloky(radky):
+    """Vrací řádky jednotlivých bloků VEVENT (včetně vnořených VALARM)"""
+    blok = None
+    hloubka = 0
+    for radek in radky:
+        if blok is None:
+            if radek == 'BEGIN:VEVENT':
+                blok = [radek]
+                hloubka = 1
+            continue
+
+        blok.append(radek)
+        if radek.startswith('BEGIN:'):
+            hloubka += 1
+        elif radek.startswith('END:'):
+            hloubka -= 1
+            if hloubka == 0:
+                yield blok
+                blok = None
+
+
+def vlastnost(blok, nazev):
+    """Rychle najde hodnotu vlastnosti v bloku bez úplného parsování"""
+    for radek in blok:
+        if radek.startswith(nazev) and radek[len(nazev):len(nazev) + 1] in (':', ';'):
+            return radek.split(':', 1)[1] if ':' in radek else None
+    return None
+
+
+def _rychle_datum(hodnota):
+    """Z hodnoty typu 20250101 nebo 20250101T090000Z vrátí datum"""
+    try:
+        return datetime.date(int(hodnota[0:4]), int(hodnota[4:6]), int(hodnota[6:8]))
+    except (TypeError, ValueError):
+        return None
+
+
+def muze_zasahnout(blok, od, do):
+    """Levně rozhodne, zda blok může mít výskyt v okně <od, do)
+
+    Vrací True i v nejistých případech - přesné rozhodnutí udělá
+    až rozvinutí výskytů.
+    """
+    zacatek = _rychle_datum(vlastnost(blok, 'DTSTART'))
+    if zacatek is None:
+        return True
+
+    od_datum = od.date() - REZERVA
+    do_datum = do.date() + REZERVA
+
+    # Přepsaný výskyt opakované události ruší původní termín v okně
+    puvodni = _rychle_datum(vlastnost(blok, 'RECURRENCE-ID'))
+    if puvodni is not None and od_datum <= puvodni <= do_datum:
+        return True
+
+    if zacatek > do_datum:
+        return False
+
+    pravidlo = vlastnost(blok, 'RRULE')
+    if pravidlo is not None or vlastnost(blok, 'RDATE') is not None:
+        if pravidlo and 'UNTIL=' in pravidlo:
+            konec_pravidla = _rychle_datum(pravidlo.split('UNTIL=', 1)[1])
+            if konec_pravidla is not None and konec_pravidla < od_datum:
+                return False
+        return True
+
+    konec = _rychle_datum(vlastnost(blok, 'DTEND'))
+    if konec is None:
+        trvani = vlastnost(blok, 'DURATION')
+        if trvani is None:
+            konec = zacatek
+        else:
+            try:
+                konec = zacatek + vDuration.from_ical(trvani)
+            except ValueError:
+                return True
+
+    return konec >= od_datum
+
+
+def parsuj_blok(blok):
+    """Úplně zpracuje jeden blok VEVENT (při chybě vrátí None)"""
+    try:
+        return Event.from_ical('\r\n'.join(blok))
+    except ValueError as e:
+        print(f"Varování: nelze zpracovat událost {vlastnost(blok, 'UID')}: {e}")
+        return None
+
+
+def na_mistni(hodnota, mistni):
+    """Převede date/datetime na datetime v místním pásmu"""
+    if not isinstance(hodnota, datetime.datetime):
+        return datetime.datetime.combine(hodnota, datetime.time(), mistni)
+    if hodnota.tzinfo is None:
+        return hodnota.replace(tzinfo=mistni)
+    return hodnota.astimezone(mistni)
+
+
+def _seznam_datumu(udalost, nazev):
+    """Vrátí všechny hodnoty vlastnosti typu EXDATE/RDATE"""
+    hodnoty = udalost.get(nazev)
+    if hodnoty is None:
+        return []
+    if not isinstance(hodnoty, list):
+        hodnoty = [hodnoty]
+    return [d.dt for seznam in hodnoty for d in seznam.dts]
+
+
+def rozvin(udalost, od, do, mistni=None):
+    """Rozvine jednu VEVENT na výskyty, které zasahují do okna <od, do)
+
+    Výskyt je slovník s klíči uid, nazev, zacatek, konec, celodenni,
+    puvodni (původní termín pro párování s RECURRENCE-ID) a prepis.
+    """
+    mistni = mistni or tz.tzlocal()
+    od = na_mistni(od, mistni)
+    do = na_mistni(do, mistni)
+
+    dtstart = udalost.get('DTSTART')
+    if dtstart is None:
+        return []
+    start = dtstart.dt
+    celodenni = not isinstance(start, datetime.datetime)
+
+    if udalost.get('DTEND') is not None:
+        trvani = udalost['DTEND'].dt - start
+    elif udalost.get('DURATION') is not None:
+        trvani = udalost['DURATION'].dt
+    else:
+        trvani = datetime.timedelta(days=1) if celodenni else datetime.timedelta(0)
+
+    uid = str(udalost.get('UID', ''))
+    nazev = str(udalost.get('SUMMARY', ''))
+    prepis = udalost.get('RECURRENCE-ID') is not None
+
+    # Začátky výskytů v původním tvaru (date / naivní / s pásmem)
+    if 'RRULE' in udalost and not prepis:
+        pravidlo_start = start if not celodenni else datetime.datetime.combine(start, datetime.time())
+        pravidlo_text = udalost['RRULE'].to_ical().decode('utf-8')
+        try:
+            pravidlo = rrule.rrulestr(pravidlo_text, dtstart=pravidlo_start)
+        except ValueError:
+            # UNTIL v UTC u "plovoucího" začátku - porovnáme bez pásma
+            pravidlo_text = pravidlo_text.replace('Z;', ';').rstrip('Z')
+            pravidlo = rrule.rrulestr(pravidlo_text, dtstart=pravidlo_start.replace(tzinfo=None))
+            pravidlo_start = pravidlo_start.replace(tzinfo=None)
+
+        if pravidlo_start.tzinfo is None:
+            okno_od = (od - trvani).replace(tzinfo=None) - REZERVA
+            okno_do = do.replace(tzinfo=None) + REZERVA
+        else:
+            okno_od = od - trvani
+            okno_do = do
+        starty = pravidlo.between(okno_od, okno_do, inc=True)
+        if celodenni:
+            starty = [s.date() for s in starty]
+    else:
+        starty = [start]
+
+    for dalsi in _seznam_datumu(udalost, 'RDATE'):
+        if dalsi not in starty:
+            starty.append(dalsi)
+
+    vynechane = {na_mistni(d, mistni) for d in _seznam_datumu(udalost, 'EXDATE')}
+
+    vyskyty = []
+    for s in starty:
+        zacatek = na_mistni(s, mistni)
+        if zacatek in vynechane:
+            continue
+        konec = na_mistni(s + trvani, mistni) if trvani else zacatek
+        if zacatek >= do or (konec <= od and not (konec == zacatek == od)):
+            continue
+        vyskyty.append({
+            'uid': uid,
+            'nazev': nazev,
+            'zacatek': zacatek,
+            'konec': konec,
+            'celodenni': celodenni,
+            'puvodni': zacatek,
+            'prepis': prepis,
+        })
+
+    if prepis:
+        puvodni = na_mistni(udalost['RECURRENCE-ID'].dt, mistni)
+        for vyskyt in vyskyty:
+            vyskyt['puvodni'] = puvodni
+
+    return vyskyty
+
+
+def udalosti_v_okne(soubor, od, do, mistni=None):
+    """Vrátí seřazené výskyty všech událostí kalendáře v okně <od, do)
+
+    Soubor je otevřený iCal soubor (nebo jiný iterátor řádků).
+    """
+    mistni = mistni or tz.tzlocal()
+    vyskyty = []
+    prepsane = set()
+
+    for blok in vevent_bloky(rozvin_radky(soubor)):
+        if not muze_zasahnout(blok, od, do):
+            continue
+
+        udalost = parsuj_blok(blok)
+        if udalost is None:
+            continue
+
+        if udalost.get('RECURRENCE-ID') is not None:
+            prepsane.add((str(udalost.get('UID', '')), na_mistni(udalost['RECURRENCE-ID'].dt, mistni)))
+        if str(udalost.get('STATUS', '')).upper() == 'CANCELLED':
+            continue
+
+        vyskyty.extend(rozvin(udalost, od, do, mistni))
+
+    vysledek = [
+        v for v in vyskyty
+        if v['prepis'] or (v['uid'], v['puvodni']) not in prepsane
+    ]
+    vysledek.sort(key=lambda v: v['zacatek'])
+    return vysledek
@@ -129,15 +129,15 @@ echo "=========================================="
 echo "Instaluji Python závislosti..."
 
 if [ "$OS" = "linux" ]; then
-    pip3 install --break-system-packages python-escpos requests icalendar feedparser python-dateutil
+    pip3 install --break-system-packages python-escpos requests icalendar feedparser python-dateutil Pillow qrcode
 elif [ "$OS" = "macos" ]; then
-    pip3 install python-escpos requests icalendar feedparser python-dateutil
+    pip3 install python-escpos requests icalendar feedparser python-dateutil Pillow qrcode
 fi
 
 if [ $? -ne 0 ]; then
     echo "❌ Chyba při instalaci Python knihoven"
     echo "Zkouším alternativní metodu..."
-    python3 -m pip install --user python-escpos requests icalendar feedparser python-dateutil
+    python3 -m pip install --user python-escpos requests icalendar feedparser python-dateutil Pillow qrcode
     
     if [ $? -ne 0 ]; then
         echo "❌ Instalace stále selhává"
@@ -266,21 +266,38 @@ if [[ "$setup_cron" =~ ^([aA][nN][oO]|[aA]|[yY][eE][sS]|[yY])$ ]]; then
     read -r cron_minute
     cron_minute=${cron_minute:-0}
     
-    CRON_CMD="$cron_minute $cron_hour * * * cd $INSTALL_DIR && /usr/bin/python3 update.py >> $INSTALL_DIR/log.txt 2>&1"
+    echo "Kolik minut předem načíst data? (0 = vypnuto) [10]:"
+    read -r lead_minutes
+    lead_minutes=${lead_minutes:-10}
     
+    PYTHON_PATH=/usr/bin/python3
     if [ "$OS" = "macos" ]; then
         # Na macOS použijeme plnou cestu k pythonu
         PYTHON_PATH=$(which python3)
-        CRON_CMD="$cron_minute $cron_hour * * * cd $INSTALL_DIR && $PYTHON_PATH update.py >> $INSTALL_DIR/log.txt 2>&1"
+    fi
+    
+    CRON_CMD="$cron_minute $cron_hour * * * cd $INSTALL_DIR && $PYTHON_PATH update.py >> $INSTALL_DIR/log.txt 2>&1"
+    
+    # Načtení dat s předstihem (čas tisku minus lead_minutes, přes půlnoc)
+    PREFETCH_CMD=""
+    if [ "$lead_minutes" -gt 0 ] 2>/dev/null; then
+        prefetch_total=$(( (10#$cron_hour * 60 + 10#$cron_minute - lead_minutes + 1440) % 1440 ))
+        PREFETCH_CMD="$(( prefetch_total % 60 )) $(( prefetch_total / 60 )) * * * cd $INSTALL_DIR && $PYTHON_PATH runme.py --prefetch >> $INSTALL_DIR/log.txt 2>&1"
     fi
     
     # Odstranění starých cron úloh pro tento projekt
-    (crontab -l 2>/dev/null | grep -v "printmaster" | grep -v "update.py") > /tmp/mycron 2>/dev/null
+    (crontab -l 2>/dev/null | grep -v "printmaster" | grep -v "update.py" | grep -v "runme.py --prefetch") > /tmp/mycron 2>/dev/null
+    if [ -n "$PREFETCH_CMD" ]; then
+        echo "$PREFETCH_CMD" >> /tmp/mycron
+    fi
     echo "$CRON_CMD" >> /tmp/mycron
     crontab /tmp/mycron
     rm /tmp/mycron
     
     echo "✓ Cron úloha přidána: každý den v ${cron_hour}:${cron_minute}"
+    if [ -n "$PREFETCH_CMD" ]; then
+        echo "✓ Data se načtou ${lead_minutes} minut předem"
+    fi
     
     if [ "$OS" = "macos" ]; then
         echo ""
@@ -351,7 +368,7 @@ cat > "$INSTALL_DIR/update-now.sh" << 'EOF'
 #!/bin/bash
 # Ruční kontrola aktualizací
 cd "$(dirname "$0")"
-python3 update.py
+python3 update.py --now
 EOF
 
 chmod +x "$INSTALL_DIR/update-now.sh"
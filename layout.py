@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zalamování textu podle skutečné šířky řádku tiskárny
+PrintMaster - https://github.com/Quertz/printmaster
+
+Počet sloupců závisí na šířce papíru (58 / 80 mm), fontu (A / B)
+a násobku šířky písma. Text se zalamuje hladově po slovech, slova
+delší než řádek se rozdělí natvrdo. Zalomení opakovaných textů
+(nadpisy, položky šatníku) se pamatují.
+"""
+
+import unicodedata
+from functools import lru_cache
+
+# (šířka papíru v mm, font) -> počet znaků na řádek při normální šířce
+SLOUPCE = {
+    (58, 'a'): 32,
+    (58, 'b'): 42,
+    (80, 'a'): 48,
+    (80, 'b'): 64,
+}
+
+PAPIR = 58
+
+
+def sloupcu(font='a', sirka=1, papir=None):
+    """Počet znaků na řádek pro font a násobek šířky písma"""
+    papir = papir or PAPIR
+    return max(1, SLOUPCE.get((papir, font), SLOUPCE[(58, 'a')]) // max(1, sirka))
+
+
+@lru_cache(maxsize=4096)
+def sirka_znaku(znak):
+    """Počet sloupců, které znak zabere (diakritická znaménka 0, široké znaky 2)"""
+    if unicodedata.combining(znak):
+        return 0
+    if unicodedata.east_asian_width(znak) in ('W', 'F'):
+        return 2
+    return 1
+
+
+def delka(text):
+    """Šířka textu ve sloupcích"""
+    return sum(sirka_znaku(znak) for znak in text)
+
+
+def _rozdel_slovo(slovo, sloupce):
+    """Rozdělí příliš dlouhé slovo na kusy o šířce nejvýše sloupce"""
+    kusy = []
+    kus = []
+    sirka = 0
+    for znak in slovo:
+        s = sirka_znaku(znak)
+        if sirka + s > sloupce and kus:
+            kusy.append(''.join(kus))
+            kus = []
+            sirka = 0
+        kus.append(znak)
+        sirka += s
+    if kus:
+        kusy.append(''.join(kus))
+    return kusy
+
+
+@lru_cache(maxsize=1024)
+def zalom(text, sloupce=32, odsazeni=0):
+    """Zalomí text na řádky o šířce nejvýše `sloupce`; vrátí n-tici řádků
+
+    Konce řádků v textu se zachovají, prázdný odstavec dá prázdný řádek.
+    S odsazením se text zalomí do užšího sloupce a pokračovací řádky se
+    odsadí mezerami - první řádek doplní volající předponou stejné šířky.
+    """
+    odsazeni = min(odsazeni, sloupce // 2)
+    limit = sloupce - odsazeni
+    radky = []
+    for odstavec in text.split('\n'):
+        hotove = []
+        radek = []
+        sirka = 0
+        for slovo in odstavec.split():
+            sirka_slova = delka(slovo)
+            if radek and sirka + 1 + sirka_slova <= limit:
+                radek.append(slovo)
+                sirka += 1 + sirka_slova
+                continue
+            if radek:
+                hotove.append(' '.join(radek))
+            kusy = [slovo] if sirka_slova <= limit else _rozdel_slovo(slovo, limit)
+            # Slovo delší než řádek se rozdělí natvrdo
+            hotove.extend(kusy[:-1])
+            radek = [kusy[-1]]
+            sirka = delka(kusy[-1])
+        hotove.append(' '.join(radek))
+        radky.append(hotove[0])
+        radky.extend(' ' * odsazeni + radek for radek in hotove[1:])
+    return tuple(radky)
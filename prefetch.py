@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Předběžné načtení dat s předstihem před časem tisku
+PrintMaster - https://github.com/Quertz/printmaster
+
+Cron spustí `python3 runme.py --prefetch` několik minut před tiskem
+(lead_minutes v install.sh). Všechny zdroje se načtou a uloží do úložiště
+snímků (snapshots.py). Při samotném tisku se znovu stáhnou jen zdroje,
+jejichž snímek mezitím zastaral, a tisk na ně čeká jen krátce.
+"""
+
+import snapshots
+import telemetry
+
+
+def predstih():
+    """Načte všechny zdroje a uloží je jako snímky pro pozdější tisk"""
+    import print_daily
+    import weather
+
+    telemetry.zacni_beh()
+    # Počasí pro všechna místa jednou dávkou - účtenky ho pak vezmou z cache
+    mista = weather.nacti_mista(print_daily.CONFIG)
+    if len(mista) > 1:
+        print_daily.sluzba_pocasi().ziskej(mista)
+    data = snapshots.obnov_vse()
+    telemetry.dokonci_beh(print_daily.CONFIG, all(h is not None for h in data.values()),
+                          verze=print_daily.VERSION, faze='prefetch')
+    for zdroj, hodnota in data.items():
+        if hodnota is None:
+            print(f"Varování: zdroj {zdroj} se nepodařilo načíst předem")
+    print(f"✓ Předem načteno: {', '.join(sorted(z for z, h in data.items() if h is not None))}")
@@ -8,14 +8,18 @@ Vytiskne denní přehled s počasím, kalendářem, zprávami, horoskopem a dopo
 """
 
 import datetime
-import requests
 import random
-from icalendar import Calendar
-import feedparser
-from dateutil import tz
 import configparser
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import telemetry
+
+# Těžké závislosti (requests, icalendar, feedparser, dateutil, escpos) se
+# importují až ve funkcích, které je potřebují. Vypnutá sekce tak nic
+# nenačítá a samotný import modulu je rychlý.
 
 VERSION = "1.0.0"
 GITHUB_REPO = "Quertz/printmaster"
@@ -33,63 +37,107 @@ def load_config():
     config.read('config.ini', encoding='utf-8')
     return config
 
-CONFIG = load_config()
-
-# Načtení konfiguračních hodnot
-DRY_RUN = CONFIG.getboolean('General', 'dry_run', fallback=True)
-OPENWEATHER_API_KEY = CONFIG.get('Weather', 'api_key', fallback='')
-CITY = CONFIG.get('Weather', 'city', fallback='Prague')
-COUNTRY_CODE = CONFIG.get('Weather', 'country_code', fallback='CZ')
-ZVEROKRUH = CONFIG.get('Personal', 'zodiac_sign', fallback='aries')
-
-# Načtení kalendářů
-KALENDARE = []
-for key in CONFIG['Calendars']:
-    if key.startswith('calendar_'):
-        parts = CONFIG['Calendars'][key].split('|')
-        if len(parts) == 3:
-            KALENDARE.append({
-                'nazev': parts[0],
-                'ikona': parts[1],
-                'url': parts[2]
-            })
-
-# Načtení RSS zdrojů
-RSS_ZDROJE = []
-for key in CONFIG['RSS']:
-    if key.startswith('rss_'):
-        parts = CONFIG['RSS'][key].split('|')
-        if len(parts) == 2:
-            RSS_ZDROJE.append({
-                'nazev': parts[0],
-                'url': parts[1]
-            })
+CONFIG = None
+
+def nacti_nastaveni(config=None):
+    """Načte konfigurační hodnoty do proměnných modulu
+    
+    Volá se z main(), ne při importu - import modulu tak nesahá na disk.
+    """
+    global CONFIG, DRY_RUN, MAX_VLAKEN, LIMIT_NACITANI, CACHE_DIR
+    global OPENWEATHER_API_KEY, CITY, COUNTRY_CODE, ZVEROKRUH, HOROSKOP_URL, POCASI
+    global KALENDARE, RSS_ZDROJE, MAX_NEWS, SATNIK
+    global LOGO, RASTR, IKONA_POCASI, KALENDAR_QR, VYHLED_DNI
+    import layout
+    import raster
+    
+    CONFIG = config if config is not None else load_config()
+    
+    # Načtení konfiguračních hodnot
+    DRY_RUN = CONFIG.getboolean('General', 'dry_run', fallback=True)
+    MAX_VLAKEN = CONFIG.getint('General', 'max_workers', fallback=8)
+    LIMIT_NACITANI = CONFIG.getfloat('General', 'fetch_deadline', fallback=25)
+    CACHE_DIR = CONFIG.get('General', 'cache_dir', fallback='cache')
+    OPENWEATHER_API_KEY = CONFIG.get('Weather', 'api_key', fallback='')
+    CITY = CONFIG.get('Weather', 'city', fallback='Prague')
+    COUNTRY_CODE = CONFIG.get('Weather', 'country_code', fallback='CZ')
+    ZVEROKRUH = CONFIG.get('Personal', 'zodiac_sign', fallback='aries')
+    # Adresy API lze přesměrovat (např. na místní server v bench.py),
+    # počasí si čte [Weather] api_url samo (weather.sluzba)
+    POCASI = None
+    HOROSKOP_URL = CONFIG.get('Personal', 'horoscope_url', fallback='https://aztro.sameerkumar.website/')
+    layout.PAPIR = CONFIG.getint('Printer', 'paper_width', fallback=58)
+    
+    # Obrázky - logo, ikona počasí a QR kód celého kalendáře
+    raster.ADRESAR = os.path.join(CACHE_DIR, 'raster')
+    LOGO = CONFIG.get('Printer', 'logo', fallback='')
+    RASTR = CONFIG.get('Printer', 'dither', fallback='floyd')
+    if RASTR not in raster.REZIMY:
+        print(f"Varování: neznámý režim dither '{RASTR}', použije se floyd")
+        RASTR = 'floyd'
+    # Bez Pillow je ikona ve výchozím stavu vypnutá - jinak by každý tisk hlásil chybu
+    IKONA_POCASI = CONFIG.getboolean('Printer', 'weather_icon', fallback=raster.dostupny())
+    KALENDAR_QR = CONFIG.get('Calendars', 'qr_url', fallback='')
+    
+    # Načtení kalendářů
+    KALENDARE = nacti_kalendare(CONFIG['Calendars'])
+    VYHLED_DNI = CONFIG.getint('Calendars', 'lookahead_days', fallback=3)
+    
+    # Načtení RSS zdrojů
+    RSS_ZDROJE = []
+    for key in CONFIG['RSS']:
+        if key.startswith('rss_'):
+            parts = CONFIG['RSS'][key].split('|')
+            if len(parts) == 2:
+                RSS_ZDROJE.append({
+                    'nazev': parts[0],
+                    'url': parts[1]
+                })
+    
+    MAX_NEWS = CONFIG.getint('RSS', 'max_news', fallback=5)
+    
+    # Načtení šatníku
+    SATNIK = nacti_satnik(CONFIG)
+    
+    return CONFIG
 
-MAX_NEWS = CONFIG.getint('RSS', 'max_news', fallback=5)
-
-# Načtení šatníku
-SATNIK = {
-    "vrchní": {
-        "lehké": [x.strip() for x in CONFIG.get('Wardrobe', 'light_top', fallback='tričko').split(',')],
-        "střední": [x.strip() for x in CONFIG.get('Wardrobe', 'medium_top', fallback='svetr').split(',')],
-        "teplé": [x.strip() for x in CONFIG.get('Wardrobe', 'warm_top', fallback='fleece').split(',')],
-        "velmi_teplé": [x.strip() for x in CONFIG.get('Wardrobe', 'very_warm_top', fallback='bunda').split(',')]
-    },
-    "spodní": {
-        "lehké": [x.strip() for x in CONFIG.get('Wardrobe', 'light_bottom', fallback='kraťasy').split(',')],
-        "teplé": [x.strip() for x in CONFIG.get('Wardrobe', 'warm_bottom', fallback='džíny').split(',')]
-    },
-    "doplňky": {
-        "déšť": [x.strip() for x in CONFIG.get('Wardrobe', 'rain_accessories', fallback='deštník').split(',')],
-        "zima": [x.strip() for x in CONFIG.get('Wardrobe', 'cold_accessories', fallback='čepice').split(',')],
-        "slunce": [x.strip() for x in CONFIG.get('Wardrobe', 'sun_accessories', fallback='brýle').split(',')]
+def nacti_kalendare(sekce):
+    """Vrátí seznam kalendářů z klíčů calendar_* sekce (název|ikona|url)"""
+    kalendare = []
+    for key in sekce:
+        if key.startswith('calendar_'):
+            parts = sekce[key].split('|')
+            if len(parts) == 3:
+                kalendare.append({
+                    'nazev': parts[0],
+                    'ikona': parts[1],
+                    'url': parts[2]
+                })
+    return kalendare
+
+def nacti_satnik(config, profil=None):
+    """Vrátí šatník z [Wardrobe]; klíče v sekci profilu mají přednost"""
+    def hodnota(key, fallback):
+        vychozi = config.get('Wardrobe', key, fallback=fallback)
+        return config.get(profil, key, fallback=vychozi) if profil else vychozi
+    
+    return {
+        "vrchní": {
+            "lehké": [x.strip() for x in hodnota('light_top', fallback='tričko').split(',')],
+            "střední": [x.strip() for x in hodnota('medium_top', fallback='svetr').split(',')],
+            "teplé": [x.strip() for x in hodnota('warm_top', fallback='fleece').split(',')],
+            "velmi_teplé": [x.strip() for x in hodnota('very_warm_top', fallback='bunda').split(',')]
+        },
+        "spodní": {
+            "lehké": [x.strip() for x in hodnota('light_bottom', fallback='kraťasy').split(',')],
+            "teplé": [x.strip() for x in hodnota('warm_bottom', fallback='džíny').split(',')]
+        },
+        "doplňky": {
+            "déšť": [x.strip() for x in hodnota('rain_accessories', fallback='deštník').split(',')],
+            "zima": [x.strip() for x in hodnota('cold_accessories', fallback='čepice').split(',')],
+            "slunce": [x.strip() for x in hodnota('sun_accessories', fallback='brýle').split(',')]
+        }
     }
-}
-
-# Tiskárna
-if not DRY_RUN:
-    PRINTER_VENDOR_ID = int(CONFIG.get('Printer', 'vendor_id', fallback='0x0416'), 16)
-    PRINTER_PRODUCT_ID = int(CONFIG.get('Printer', 'product_id', fallback='0x5011'), 16)
 
 # ====== ČESKÉ SVÁTKY 2025-2026 ======
 SVATKY = {
@@ -302,36 +350,34 @@ class DryRunPrinter:
 
 # ====== FUNKCE ======
 
-def get_weather():
-    """Získá aktuální počasí"""
-    if not OPENWEATHER_API_KEY:
-        print("Varování: OpenWeatherMap API klíč není nastaven")
-        return None
+@telemetry.mereno('weather')
+def get_weather(misto=None):
+    """Získá aktuální počasí (výchozí město, nebo zadané weather.Misto)"""
+    import weather
     
-    try:
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={CITY},{COUNTRY_CODE}&appid={OPENWEATHER_API_KEY}&units=metric&lang=cz"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        
-        return {
-            "teplota": round(data["main"]["temp"]),
-            "pocit": round(data["main"]["feels_like"]),
-            "popis": data["weather"][0]["description"],
-            "vlhkost": data["main"]["humidity"],
-            "vitr": round(data["wind"]["speed"] * 3.6),
-            "dest": "rain" in data or "drizzle" in data["weather"][0]["main"].lower(),
-            "snih": "snow" in data["weather"][0]["main"].lower(),
-            "oblacnost": data["clouds"]["all"]
-        }
-    except Exception as e:
-        print(f"Chyba při získávání počasí: {e}")
-        return None
+    misto = misto or weather.Misto('vychozi', f"{CITY},{COUNTRY_CODE}")
+    return sluzba_pocasi().ziskej([misto])[misto.klic]
 
-def get_horoskop():
-    """Získá horoskop z API"""
+def sluzba_pocasi():
+    """Sdílená služba počasí (cache a kvóta v CACHE_DIR/weather)"""
+    global POCASI
+    import weather
+    
+    if POCASI is None:
+        POCASI = weather.sluzba(CONFIG, os.path.join(CACHE_DIR, 'weather'))
+    return POCASI
+
+@telemetry.mereno('horoscope')
+def get_horoskop(znameni=None):
+    """Získá horoskop z API (pro znamení z konfigurace, nebo zadané)"""
+    import http_client
+    
     try:
-        url = f"https://aztro.sameerkumar.website/?sign={ZVEROKRUH}&day=today"
-        response = requests.post(url, timeout=10)
+        url = f"{HOROSKOP_URL}?sign={znameni or ZVEROKRUH}&day=today"
+        with telemetry.span('http', url=HOROSKOP_URL) as s:
+            response = http_client.post(url, timeout=10)
+            s['status'] = response.status_code
+            s['bajty'] = len(response.content)
         data = response.json()
         
         return {
@@ -342,113 +388,234 @@ def get_horoskop():
         }
     except Exception as e:
         print(f"Chyba při získávání horoskopu: {e}")
-        offline_horoskopy = [
-            "Dnes je skvělý den pro nové začátky.",
-            "Buďte pozorní k detailům.",
-            "Komunikace bude klíčem k úspěchu.",
-            "Důvěřujte své intuici.",
-            "Dobrý den pro kreativitu."
-        ]
-        return {
-            "popis": random.choice(offline_horoskopy),
-            "stesti": "?",
-            "barva": "?",
-            "nalada": "?"
-        }
+        # Náhradní horoskop doplní až sestavení účtenky, snímek zůstane platný
+        return None
+
+def offline_horoskop():
+    """Vrátí náhradní horoskop, když API není dostupné"""
+    offline_horoskopy = [
+        "Dnes je skvělý den pro nové začátky.",
+        "Buďte pozorní k detailům.",
+        "Komunikace bude klíčem k úspěchu.",
+        "Důvěřujte své intuici.",
+        "Dobrý den pro kreativitu."
+    ]
+    return {
+        "popis": random.choice(offline_horoskopy),
+        "stesti": "?",
+        "barva": "?",
+        "nalada": "?"
+    }
 
-def get_ical_events():
-    """Získá události ze všech iCal kalendářů"""
-    vsechny_udalosti = []
+@telemetry.mereno('calendar')
+def nacti_kalendar(kalendar, dnes):
+    """Stáhne jeden iCal kalendář a vrátí jeho události od dneška (None při chybě)
     
-    for kalendar in KALENDARE:
-        if not kalendar["url"] or kalendar["url"].startswith("https://calendar.google.com/calendar/ical/xxxxx"):
-            continue
+    Vrací výskyty zasahující do dneška a dalších VYHLED_DNI dnů seřazené
+    podle začátku, včetně vícedenních událostí, které začaly dřív.
+    """
+    import http_cache
+    import ical_index
+    from dateutil import tz
+    
+    udalosti = []
+    
+    try:
+        response = http_cache.stahni(kalendar["url"], timeout=10)
+        if not response.ok:
+            print(f"Varování: kalendář {kalendar['nazev']} vrátil status {response.status}")
+            return None
         
-        try:
-            response = requests.get(kalendar["url"], timeout=10)
-            cal = Calendar.from_ical(response.content)
-            
-            dnes = datetime.datetime.now(tz.tzlocal()).date()
-            
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    start = component.get('dtstart').dt
-                    
-                    # Převod na date pokud je datetime
-                    if isinstance(start, datetime.datetime):
-                        start_date = start.date()
-                        start_time = start.time()
-                    else:
-                        start_date = start
-                        start_time = None
-                    
-                    # Pouze dnešní události
-                    if start_date == dnes:
-                        vsechny_udalosti.append({
-                            "cas": start_time if start_time else None,
-                            "nazev": str(component.get('summary')),
-                            "kalendar": kalendar["nazev"],
-                            "ikona": kalendar["ikona"]
-                        })
-            
-        except Exception as e:
-            print(f"Chyba při načítání kalendáře {kalendar['nazev']}: {e}")
-            continue
+        # Index výskytů se aktualizuje jen o změněné události
+        mistni = tz.tzlocal()
+        od = datetime.datetime.combine(dnes, datetime.time(), mistni)
+        do = od + datetime.timedelta(days=1 + VYHLED_DNI)
+        index = ical_index.IndexKalendare(kalendar["url"], mistni, adresar=os.path.join(CACHE_DIR, 'ical'))
+        with telemetry.span('ical_parse', kalendar=kalendar["nazev"]) as s:
+            s['rozvinuto'] = index.aktualizuj(response.cesta, od, do, zmeneno=not response.z_cache)
+        
+        for vyskyt in index.v_okne(od, do):
+            udalosti.append({
+                "zacatek": vyskyt["zacatek"],
+                "konec": vyskyt["konec"],
+                "celodenni": vyskyt["celodenni"],
+                "cas": None if vyskyt["celodenni"] else vyskyt["zacatek"].time(),
+                "nazev": vyskyt["nazev"],
+                "kalendar": kalendar["nazev"],
+                "ikona": kalendar["ikona"]
+            })
+        
+    except Exception as e:
+        print(f"Chyba při načítání kalendáře {kalendar['nazev']}: {e}")
+        return None
     
-    # Seřadit podle času (celodenní nakonec)
-    vsechny_udalosti.sort(key=lambda x: (x["cas"] is None, x["cas"] or datetime.time.max))
-    return vsechny_udalosti
+    return udalosti
 
-def get_rss_news(max_zprav=5):
-    """Získá nejnovější zprávy z RSS"""
-    zpravy = []
+def platne_kalendare(kalendare):
+    """Kalendáře s vyplněnou adresou (bez ukázkové adresy z instalace)"""
+    return [
+        kalendar for kalendar in kalendare
+        if kalendar["url"] and not kalendar["url"].startswith("https://calendar.google.com/calendar/ical/xxxxx")
+    ]
 
-    # Hlavičky pro přístup k RSS feedům (některé weby blokují přístup bez user-agent)
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+def spoj_udalosti(vysledky):
+    """Slije události jednotlivých kalendářů do jednoho seznamu podle začátku
+    
+    Vrátí None, pokud se nepodařilo načíst žádný kalendář.
+    """
+    import agenda
+    
+    if vysledky and all(udalosti is None for udalosti in vysledky):
+        return None
+    return agenda.slij(udalosti for udalosti in vysledky if udalosti)
 
-    for zdroj in RSS_ZDROJE:
-        try:
-            # Použití requestů s hlavičkami pro získání RSS feede
-            response = requests.get(zdroj["url"], headers=headers, timeout=10, allow_redirects=True)
-
-            # Kontrola HTTP statusu
-            if response.status_code != 200:
-                print(f"Varování: {zdroj['nazev']} vrátil status {response.status_code}")
-                continue
-
-            # Parse feedu z obsahu
-            feed = feedparser.parse(response.content)
-
-            # Kontrola, zda feed obsahuje záznamy
-            if not hasattr(feed, 'entries') or len(feed.entries) == 0:
-                print(f"Varování: {zdroj['nazev']} nemá žádné zprávy")
-                continue
-
-            # Zpracování prvních 2 zpráv z každého zdroje
-            for entry in feed.entries[:2]:
-                if not hasattr(entry, 'title'):
-                    continue
-
-                titulek = entry.title
-                if len(titulek) > 60:
-                    titulek = titulek[:57] + "..."
-
-                zpravy.append({
-                    "titulek": titulek,
-                    "zdroj": zdroj["nazev"]
-                })
+def get_ical_events(kalendare=None):
+    """Získá události ze všech iCal kalendářů (kalendáře se stahují souběžně)
+    
+    Vrátí None, pokud se nepodařilo načíst žádný kalendář - poslední
+    uložený snímek tak zůstane platný.
+    """
+    kalendare = platne_kalendare(KALENDARE if kalendare is None else kalendare)
+    if not kalendare:
+        return []
+    
+    from dateutil import tz
+    
+    dnes = datetime.datetime.now(tz.tzlocal()).date()
+    
+    import http_client
+    
+    with ThreadPoolExecutor(max_workers=min(MAX_VLAKEN, len(kalendare))) as pool:
+        vysledky = list(pool.map(http_client.s_terminem(lambda kalendar: nacti_kalendar(kalendar, dnes)), kalendare))
+    
+    return spoj_udalosti(vysledky)
 
-                if len(zpravy) >= max_zprav:
-                    return zpravy
+@telemetry.mereno('rss')
+def nacti_rss(zdroj, pocet=2):
+    """Stáhne jeden RSS zdroj a vrátí jeho první zprávy (None při chybě)"""
+    import rss_stream
+    
+    zpravy = []
 
-        except Exception as e:
-            print(f"Chyba při načítání RSS z {zdroj['nazev']}: {e}")
-            continue
+    try:
+        # Feed se čte proudově jen do potřebné položky, pak se spojení zavře
+        status, titulky = rss_stream.prvni_titulky(zdroj["url"], pocet, timeout=10)
+
+        # Kontrola HTTP statusu
+        if titulky is None:
+            print(f"Varování: {zdroj['nazev']} vrátil status {status}")
+            return None
+
+        # Kontrola, zda feed obsahuje záznamy
+        if not titulky:
+            print(f"Varování: {zdroj['nazev']} nemá žádné zprávy")
+            return zpravy
+
+        for titulek in titulky:
+            if len(titulek) > 60:
+                titulek = titulek[:57] + "..."
+
+            zpravy.append({
+                "titulek": titulek,
+                "zdroj": zdroj["nazev"]
+            })
+
+    except Exception as e:
+        print(f"Chyba při načítání RSS z {zdroj['nazev']}: {e}")
+        return None
 
     return zpravy
 
+def get_rss_news(max_zprav=5):
+    """Získá nejnovější zprávy z RSS (zdroje se stahují souběžně)
+    
+    Stejná zpráva z více zdrojů se vytiskne jen jednou a už vytištěné
+    zprávy dostanou místo, jen když nových není dost. Vrátí None,
+    pokud se nepodařilo načíst žádný zdroj.
+    """
+    import headlines
+    import http_client
+    
+    if not RSS_ZDROJE:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(MAX_VLAKEN, len(RSS_ZDROJE))) as pool:
+        vysledky = list(pool.map(http_client.s_terminem(lambda zdroj: nacti_rss(zdroj, headlines.KANDIDATU)),
+                                 RSS_ZDROJE))
+
+    if all(zpravy_zdroje is None for zpravy_zdroje in vysledky):
+        return None
+
+    # Pořadí zpráv zůstává podle pořadí zdrojů v konfiguraci
+    kandidati = [zprava for zpravy_zdroje in vysledky for zprava in zpravy_zdroje or []]
+    vytistene = headlines.Index(os.path.join(CACHE_DIR, 'headlines.json'))
+    return headlines.vyber(kandidati, max_zprav, na_zdroj=2, vytistene=vytistene)
+
+def zaznamenej_zpravy(zpravy):
+    """Uloží titulky vytištěných zpráv, aby se příště neopakovaly"""
+    import headlines
+    
+    try:
+        headlines.zaznamenej(os.path.join(CACHE_DIR, 'headlines.json'), zpravy)
+    except Exception as e:
+        print(f"Varování: nelze zaznamenat vytištěné zprávy: {e}")
+
+def nastav_cache():
+    """Nasměruje perzistentní cache do adresáře z konfigurace"""
+    import http_cache
+    import transport
+    
+    http_cache.ADRESAR = os.path.join(CACHE_DIR, 'http')
+    transport.SOUBOR = os.path.join(CACHE_DIR, 'transport.json')
+
+def zdroje_dat():
+    """Vrátí slovník nazev zdroje -> funkce, která jej načte"""
+    return {
+        "pocasi": get_weather,
+        "udalosti": get_ical_events,
+        "zpravy": lambda: get_rss_news(max_zprav=MAX_NEWS),
+        "horoskop": get_horoskop,
+    }
+
+def ziskej_data(limit=None):
+    """Souběžně načte všechny zdroje dat ještě před začátkem tisku
+    
+    Vrátí slovník s tím, co stihlo doběhnout do limitu; chybějící
+    zdroje mají hodnotu None.
+    """
+    if limit is None:
+        limit = LIMIT_NACITANI
+    
+    nastav_cache()
+    
+    # Značka pro zprávu o studeném startu (python3 runme.py --startup-report)
+    if 'startup' in sys.modules:
+        sys.modules['startup'].znacka('začátek načítání dat')
+    
+    import http_client
+    
+    zdroje = zdroje_dat()
+    data = dict.fromkeys(zdroje)
+    
+    # Dotazy zdrojů (i jejich opakování) nepřetáhnou limit načítání
+    termin = time.monotonic() + limit
+    pool = ThreadPoolExecutor(max_workers=min(MAX_VLAKEN, len(zdroje)), thread_name_prefix="nacitani")
+    ulohy = {pool.submit(http_client.s_terminem(funkce, termin)): nazev for nazev, funkce in zdroje.items()}
+    hotove, nedokoncene = wait(ulohy, timeout=limit)
+    
+    for uloha in hotove:
+        try:
+            data[ulohy[uloha]] = uloha.result()
+        except Exception as e:
+            print(f"Chyba při načítání zdroje {ulohy[uloha]}: {e}")
+    
+    for uloha in nedokoncene:
+        print(f"Varování: zdroj {ulohy[uloha]} nestihl odpovědět do {limit:g} s")
+    
+    # Na pomalé zdroje nečekáme, tisk pokračuje s tím, co je k dispozici
+    pool.shutdown(wait=False, cancel_futures=True)
+    return data
+
 def get_svatek_a_jmeniny():
     """Vrátí dnešní svátek a jmeniny"""
     dnes = datetime.datetime.now()
@@ -496,169 +663,313 @@ def doporuc_obleceni(pocasi):
     return obleceni
 
 def wrap_text(text, width=32):
-    """Zalomí text na řádky o dané šířce"""
-    words = text.split()
-    lines = []
-    line = ""
-    
-    for word in words:
-        if len(line + word) < width:
-            line += word + " "
-        else:
-            if line:
-                lines.append(line.strip())
-            line = word + " "
-    
-    if line:
-        lines.append(line.strip())
+    """Zalomí text na řádky o dané šířce (viz layout.zalom)"""
+    import layout
     
-    return lines
+    if not text.strip():
+        return []
+    return list(layout.zalom(text, width))
 
-def vytiskni_prehled():
-    """Hlavní funkce - vytiskne denní přehled"""
+def pridej_obrazek(p, vyrob, popis):
+    """Přidá do dokumentu vycentrovaný obrázek; chyba obrázku tisk nezastaví"""
     try:
-        # Výběr tiskárny podle režimu
+        data = vyrob()
+    except Exception as e:
+        print(f"Varování: nelze připravit obrázek ({popis}): {e}")
+        return
+    p.set(align='center')
+    p.obrazek(data, popis)
+    p.set(align='left')
+
+def sablona_prehledu():
+    """Rozvržení přehledu - statické části a sloty pro denní obsah"""
+    import layout
+    import raster
+    import templates
+    
+    # Nadpis horoskopu závisí na znamení - každé má vlastní kompilovanou šablonu
+    sablona = templates.Sablona(f"prehled-{ZVEROKRUH}")
+    
+    # Hlavička
+    p = sablona.staticka()
+    if LOGO:
+        pridej_obrazek(p, lambda: raster.rastr(LOGO, rezim=RASTR), "logo")
+    p.set(align='center', text_type='B', width=2, height=2)
+    p.text("DNESNI PREHLED\n")
+    
+    sablona.slot('datum')
+    p = sablona.staticka()
+    p.set(align='center')
+    p.text("=" * layout.sloupcu() + "\n\n")
+    
+    sablona.slot('pocasi', "POCASI")
+    sablona.slot('obleceni', "CO NA SEBE")
+    sablona.slot('udalosti', "KALENDAR")
+    sablona.slot('vyhled', "DALSI DNY")
+    sablona.slot('zpravy', "ZPRAVY")
+    sablona.slot('horoskop', f"HOROSKOP ({ZVEROKRUH_CZ.get(ZVEROKRUH, ZVEROKRUH).upper()})")
+    sablona.slot('vtip', "VTIP DNE")
+    
+    # Patička
+    p = sablona.staticka()
+    p.text("\n" + "=" * layout.sloupcu() + "\n")
+    p.set(align='center')
+    p.text("Hezky den!\n\n\n")
+    
+    # Řez papíru
+    p.cut()
+    
+    return sablona
+
+def popis_stari(sekundy):
+    """Krátký popis stáří uložených dat pro vytištění"""
+    minuty = int(sekundy // 60)
+    cas = (datetime.datetime.now() - datetime.timedelta(seconds=sekundy)).strftime("%H:%M")
+    if minuty < 60:
+        return f"(data z {cas}, pred {minuty} min)"
+    if minuty < 48 * 60:
+        return f"(data z {cas}, pred {minuty // 60} h)"
+    return f"(data z {cas}, pred {minuty // (24 * 60)} dny)"
+
+def sestav_sloty(data):
+    """Sestaví denní obsah jednotlivých slotů šablony z načtených dat
+    
+    Zdroje uvedené v data['stari'] se vytisknou s poznámkou o stáří.
+    """
+    import agenda
+    import raster
+    import receipt
+    from dateutil import tz
+    
+    sloty = {}
+    stari = data.get('stari') or {}
+    
+    def poznamka_stari(p, zdroj):
+        if zdroj in stari:
+            p.odstavec(popis_stari(stari[zdroj]))
+    
+    # Datum, svátky a jmeniny
+    p = sloty['datum'] = receipt.Dokument()
+    p.set(align='center')
+    
+    datum = datetime.datetime.now()
+    den_tyden = ["pondělí", "úterý", "středa", "čtvrtek", "pátek", "sobota", "neděle"]
+    mesice = ["ledna", "února", "března", "dubna", "května", "června", 
+              "července", "srpna", "září", "října", "listopadu", "prosince"]
+    
+    den_text = f"{den_tyden[datum.weekday()]}, {datum.day}. {mesice[datum.month-1]} {datum.year}"
+    p.odstavec(den_text)
+    
+    svatek, jmeniny = get_svatek_a_jmeniny()
+    if svatek:
+        p.set(text_type='B')
+        p.odstavec(f"SVATEK: {svatek}")
+        p.set(text_type='normal')
+    if jmeniny:
+        p.odstavec(f"Jmeniny: {jmeniny}")
+    
+    # Počasí
+    p = sloty['pocasi'] = receipt.Dokument()
+    
+    pocasi = data["pocasi"]
+    if pocasi:
+        poznamka_stari(p, "pocasi")
+        if IKONA_POCASI:
+            pridej_obrazek(p, lambda: raster.ikona_pocasi(pocasi), f"ikona: {raster.druh_ikony(pocasi)}")
+        p.odstavec(f"Teplota: {pocasi['teplota']}°C (pocit {pocasi['pocit']}°C)")
+        p.odstavec(pocasi['popis'].capitalize())
+        p.odstavec(f"Vlhkost: {pocasi['vlhkost']}% | Vitr: {pocasi['vitr']} km/h")
+    else:
+        p.odstavec("Nepodařilo se načíst počasí")
+    
+    p.text("\n")
+    
+    # Doporučené oblečení
+    p = sloty['obleceni'] = receipt.Dokument()
+    
+    obleceni = doporuc_obleceni(pocasi)
+    for item in obleceni:
+        p.odstavec(item, predpona="• ")
+    
+    p.text("\n")
+    
+    # Kalendář ze všech zdrojů - dnešek (i události přes půlnoc) a další dny
+    mistni = tz.tzlocal()
+    od = datetime.datetime.combine(datum.date(), datetime.time(), mistni)
+    do = od + datetime.timedelta(days=1)
+    kalendar = agenda.Agenda(data["udalosti"] or [])
+    
+    def predpona_kalendare(udalost, cas_str):
+        # V dry run módu použijeme ikony, na tiskárně ASCII
         if DRY_RUN:
-            p = DryRunPrinter()
+            prefix = udalost['ikona']
         else:
-            from escpos.printer import Usb
-            p = Usb(PRINTER_VENDOR_ID, PRINTER_PRODUCT_ID)
-        
-        # Hlavička
-        p.set(align='center', text_type='B', width=2, height=2)
-        p.text("DNESNI PREHLED\n")
-        p.set(align='center', text_type='normal')
-        
-        datum = datetime.datetime.now()
-        den_tyden = ["pondělí", "úterý", "středa", "čtvrtek", "pátek", "sobota", "neděle"]
-        mesice = ["ledna", "února", "března", "dubna", "května", "června", 
-                  "července", "srpna", "září", "října", "listopadu", "prosince"]
-        
-        den_text = f"{den_tyden[datum.weekday()]}, {datum.day}. {mesice[datum.month-1]} {datum.year}"
-        p.text(f"{den_text}\n")
+            # ASCII alternativa pro tiskárnu
+            prefix = "[O]" if udalost["kalendar"] == "Osobní" else "[P]"
+        return f"{prefix} {cas_str:>10} "
+    
+    def cas_dnes(udalost):
+        """(text času, klíč řazení) - probíhající nejdřív, celodenní nakonec"""
+        if udalost["celodenni"] or (udalost["zacatek"] < od and udalost["konec"] >= do):
+            return "celodenni", (True, od)
+        if udalost["zacatek"] < od:
+            return f"do {udalost['konec'].strftime('%H:%M')}", (False, od)
+        return udalost["zacatek"].strftime("%H:%M"), (False, udalost["zacatek"])
+    
+    dnesni = sorted(((cas_dnes(u), u) for u in kalendar.v_okne(od, do)), key=lambda x: x[0][1])
+    if dnesni:
+        p = sloty['udalosti'] = receipt.Dokument()
+        poznamka_stari(p, "udalosti")
         
-        # Svátky a jmeniny
-        svatek, jmeniny = get_svatek_a_jmeniny()
-        if svatek:
-            p.set(text_type='B')
-            p.text(f"SVATEK: {svatek}\n")
-            p.set(text_type='normal')
-        if jmeniny:
-            p.text(f"Jmeniny: {jmeniny}\n")
+        for (cas_str, _), udalost in dnesni[:8]:
+            p.odstavec(udalost['nazev'], predpona=predpona_kalendare(udalost, cas_str))
         
-        p.text("=" * 32 + "\n\n")
-        
-        # Počasí
-        p.set(align='left', text_type='B')
-        p.text("POCASI\n")
-        p.set(text_type='normal')
-        
-        pocasi = get_weather()
-        if pocasi:
-            p.text(f"Teplota: {pocasi['teplota']}°C ")
-            p.text(f"(pocit {pocasi['pocit']}°C)\n")
-            p.text(f"{pocasi['popis'].capitalize()}\n")
-            p.text(f"Vlhkost: {pocasi['vlhkost']}% | ")
-            p.text(f"Vitr: {pocasi['vitr']} km/h\n")
-        else:
-            p.text("Nepodařilo se načíst počasí\n")
+        if KALENDAR_QR:
+            p.text("\n")
+            pridej_obrazek(p, lambda: raster.qr(KALENDAR_QR), "QR: cely kalendar")
         
         p.text("\n")
-        
-        # Doporučené oblečení
-        p.set(text_type='B')
-        p.text("CO NA SEBE\n")
-        p.set(text_type='normal')
-        
-        obleceni = doporuc_obleceni(pocasi)
-        for item in obleceni:
-            p.text(f"• {item}\n")
+    
+    # Události dalších dnů podle začátku, po dnech
+    dalsi = kalendar.zacinajici_v(do, do + datetime.timedelta(days=VYHLED_DNI))
+    if dalsi:
+        p = sloty['vyhled'] = receipt.Dokument()
+        zkratky = ["po", "ut", "st", "ct", "pa", "so", "ne"]
+        den = None
+        for udalost in dalsi[:8]:
+            zacatek = udalost["zacatek"]
+            if zacatek.date() != den:
+                den = zacatek.date()
+                nazev_dne = f"{zkratky[den.weekday()]} {den.day}.{den.month}."
+                if den == do.date():
+                    nazev_dne += " (zitra)"
+                p.set(text_type='B')
+                p.odstavec(nazev_dne)
+                p.set(text_type='normal')
+            cas_str = "celodenni" if udalost["celodenni"] else zacatek.strftime("%H:%M")
+            p.odstavec(udalost['nazev'], predpona=predpona_kalendare(udalost, cas_str))
         
         p.text("\n")
+    
+    # RSS Zprávy
+    zpravy = data["zpravy"]
+    if zpravy:
+        p = sloty['zpravy'] = receipt.Dokument()
+        poznamka_stari(p, "zpravy")
         
-        # Kalendář ze všech zdrojů
-        udalosti = get_ical_events()
-        if udalosti:
-            p.set(text_type='B')
-            p.text("KALENDAR\n")
-            p.set(text_type='normal')
-            
-            for udalost in udalosti[:8]:
-                if udalost["cas"]:
-                    cas_str = udalost["cas"].strftime("%H:%M")
-                else:
-                    cas_str = "celodenni"
-                
-                # V dry run módu použijeme ikony, na tiskárně ASCII
-                if DRY_RUN:
-                    p.text(f"{udalost['ikona']} {cas_str:>10} ")
-                else:
-                    # ASCII alternativa pro tiskárnu
-                    prefix = "[O]" if udalost["kalendar"] == "Osobní" else "[P]"
-                    p.text(f"{prefix} {cas_str:>10} ")
-                
-                p.text(f"{udalost['nazev']}\n")
-            
-            p.text("\n")
-        
-        # RSS Zprávy
-        zpravy = get_rss_news(max_zprav=MAX_NEWS)
-        if zpravy:
-            p.set(text_type='B')
-            p.text("ZPRAVY\n")
-            p.set(text_type='normal')
-            
-            for zprava in zpravy:
-                lines = wrap_text(zprava['titulek'], 32)
-                for line in lines:
-                    p.text(f"{line}\n")
-                p.text(f"  ({zprava['zdroj']})\n")
-            
-            p.text("\n")
-        
-        # Horoskop
-        p.set(text_type='B')
-        p.text(f"HOROSKOP ({ZVEROKRUH_CZ.get(ZVEROKRUH, ZVEROKRUH).upper()})\n")
-        p.set(text_type='normal')
+        for zprava in zpravy:
+            p.odstavec(zprava['titulek'])
+            p.odstavec(f"({zprava['zdroj']})", predpona="  ")
         
-        horoskop = get_horoskop()
-        lines = wrap_text(horoskop['popis'], 32)
-        for line in lines:
-            p.text(f"{line}\n")
+        p.text("\n")
+    
+    # Horoskop
+    p = sloty['horoskop'] = receipt.Dokument()
+    
+    if data["horoskop"]:
+        poznamka_stari(p, "horoskop")
+    horoskop = data["horoskop"] or offline_horoskop()
+    p.odstavec(horoskop['popis'])
+    
+    if horoskop['stesti'] != "?":
+        p.odstavec(f"Stestne cislo: {horoskop['stesti']}")
+        p.odstavec(f"Barva dne: {horoskop['barva']}")
+    
+    p.text("\n")
+    
+    # Vtip dne
+    p = sloty['vtip'] = receipt.Dokument()
+    
+    vtip = random.choice(VTIPY)
+    p.odstavec(vtip)
+    
+    return sloty
+
+def sestav_prehled(data):
+    """Sestaví celý dokument přehledu z načtených dat (nic netiskne)"""
+    import templates
+    
+    return templates.sestav_dokument(sablona_prehledu(), sestav_sloty(data))
+
+@telemetry.mereno('render')
+def vykresli_prehled(data):
+    """Vykreslí přehled do bajtů ESC/POS
+    
+    Statické části se berou z kompilované šablony uložené na disku,
+    kódují se jen denní sloty.
+    """
+    import raster
+    import templates
+    
+    templates.ADRESAR = os.path.join(CACHE_DIR, 'templates')
+    config_text = ''
+    if os.path.exists('config.ini'):
+        with open('config.ini', 'rb') as f:
+            config_text = f.read()
+    
+    # Klíč jen z levných vstupů - šablona (i rastr loga) se sestaví jen při změně
+    vstupy = (VERSION, config_text, ZVEROKRUH, raster.VERZE,
+              templates.popis_souboru(__file__), templates.popis_souboru(LOGO) if LOGO else '')
+    kompilovana = templates.nacti_nebo_kompiluj(f"prehled-{ZVEROKRUH}", sablona_prehledu, *vstupy)
+    return templates.vykresli(kompilovana, sestav_sloty(data))
+
+def vytiskni_prehled():
+    """Hlavní funkce - vytiskne denní přehled"""
+    import fleet
+    import snapshots
+    
+    if CONFIG is None:
+        nacti_nastaveni()
+    
+    telemetry.zacni_beh()
+    ok = False
+    try:
+        # Nejdřív načíst všechna data, teprve potom začít tisknout
+        # (uložené snímky se použijí hned, zastaralé se obnovují na pozadí)
+        data = snapshots.data_pro_tisk()
         
-        if horoskop['stesti'] != "?":
-            p.text(f"Stestne cislo: {horoskop['stesti']}\n")
-            p.text(f"Barva dne: {horoskop['barva']}\n")
+        # Výběr tiskárny podle režimu
+        if DRY_RUN:
+            sestav_prehled(data).prehraj(DryRunPrinter())
+            ok = True
+            return
         
-        p.text("\n")
+        # Celá účtenka se vykreslí v paměti dřív, než se cokoli pošle do tiskárny
+        start = time.perf_counter()
+        bajty = vykresli_prehled(data)
+        cas_sestaveni = time.perf_counter() - start
         
-        # Vtip dne
-        p.set(text_type='B')
-        p.text("VTIP DNE\n")
-        p.set(text_type='normal')
+        # Stejné bajty na všechny nakonfigurované tiskárny souběžně
+        tiskarny = fleet.nacti_tiskarny(CONFIG)
+        start = time.perf_counter()
+        ulohy = fleet.tiskni_vsude(tiskarny, bajty)
+        cas_tisku = time.perf_counter() - start
         
-        vtip = random.choice(VTIPY)
-        for radek in vtip.split('\n'):
-            lines = wrap_text(radek, 32)
-            for line in lines:
-                p.text(f"{line}\n")
+        print(f"Vykresleno {len(bajty)} B za {cas_sestaveni * 1000:.0f} ms, "
+              f"odesláno za {cas_tisku * 1000:.0f} ms")
         
-        # Patička
-        p.text("\n" + "=" * 32 + "\n")
-        p.set(align='center')
-        p.text("Hezky den!\n\n\n")
+        chyby = 0
+        for nazev, uloha in ulohy.items():
+            if uloha.ok:
+                print(f"✓ Tisk dokončen: {nazev}")
+            else:
+                chyby += 1
+                print(f"✗ Tisk selhal: {nazev} ({uloha.chyba}, pokusů: {uloha.pokusu})")
         
-        # Řez papíru
-        p.cut()
+        if chyby:
+            sys.exit(1)
         
-        if not DRY_RUN:
-            print("Tisk dokončen!")
+        zaznamenej_zpravy(data["zpravy"])
+        ok = True
         
     except Exception as e:
         print(f"Chyba při tisku: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        # Jeden řádek JSON za běh (a textfile pro Prometheus, je-li nastaven)
+        telemetry.dokonci_beh(CONFIG, ok, verze=VERSION, dry_run=DRY_RUN)
 
 def main():
     """Hlavní spouštěcí funkce"""
@@ -666,6 +977,7 @@ def main():
     print(f"https://github.com/{GITHUB_REPO}")
     print("")
     
+    nacti_nastaveni()
     vytiskni_prehled()
 
 if __name__ == "__main__":
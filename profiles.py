@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Personalizované účtenky pro více profilů v jednom běhu
+PrintMaster - https://github.com/Quertz/printmaster
+
+Každý profil je sekce [Profile.<název>] v config.ini:
+
+    [Profile.jana]
+    zodiac_sign = leo
+    location = brno
+    calendar_1 = Práce|💼|https://example.com/jana.ics
+    light_top = tílko, košile
+    printer = kuchyn
+
+location je název místa z [Weather] location_<název> (nebo přímo dotaz
+"město,země" či "šířka,délka"), bez něj platí výchozí město. Bez vlastních
+calendar_* platí kalendáře z [Calendars], klíče šatníku přepisují
+[Wardrobe] a printer omezí tisk na vyjmenované tiskárny (čárkou).
+
+Společné vstupy se stáhnou jednou za běh: zprávy, počasí pro každé
+různé místo (jednou dávkou), horoskop pro každé různé znamení a každý
+kalendář (URL) jednou, i když ho sdílí více profilů. Po profilech se
+počítá jen spojení událostí, výběr oblečení a vykreslení, které běží
+v pooli procesů ([Profiles] workers). Cena běhu tak roste s počtem
+různých zdrojů, ne s počtem profilů.
+
+Procesy poolu se nespouštějí forkem: vlákna stahování, která nestihla
+limit, mohou ještě držet zámky (HTTP klient, telemetrie, snímky) a kopie
+drženého zámku by proces poolu zablokovala. Procesy proto startují
+čisté (forkserver, jinde spawn) a konfiguraci dostanou jako text.
+
+Spuštění: python3 runme.py --profiles
+"""
+
+import configparser
+import contextlib
+import datetime
+import io
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import telemetry
+
+
+def _misto(config, hodnota):
+    """Místo pro počasí podle hodnoty location profilu"""
+    import print_daily
+    import weather
+
+    if not hodnota:
+        return weather.Misto('vychozi', f"{print_daily.CITY},{print_daily.COUNTRY_CODE}")
+    parts = config.get('Weather', f"location_{hodnota}", fallback='').split('|')
+    if len(parts) == 2:
+        return weather.Misto(parts[0], parts[1])
+    return weather.Misto(hodnota, hodnota)
+
+
+def nacti_profily(config):
+    """Vrátí seznam profilů ze sekcí [Profile.*]"""
+    import print_daily
+
+    profily = []
+    for nazev_sekce in config.sections():
+        if not nazev_sekce.startswith('Profile.'):
+            continue
+        sekce = config[nazev_sekce]
+        kalendare = print_daily.nacti_kalendare(sekce)
+        tiskarny = [nazev.strip() for nazev in sekce.get('printer', '').split(',') if nazev.strip()]
+        profily.append({
+            'nazev': nazev_sekce.split('.', 1)[1],
+            'zverokruh': sekce.get('zodiac_sign', print_daily.ZVEROKRUH),
+            'misto': _misto(config, sekce.get('location', '')),
+            'kalendare': kalendare or print_daily.KALENDARE,
+            'satnik': print_daily.nacti_satnik(config, nazev_sekce),
+            'tiskarny': tiskarny or None,
+        })
+    return profily
+
+
+def ziskej_spolecna(profily):
+    """Stáhne každý zdroj potřebný pro profily právě jednou
+
+    Vrátí {'pocasi': {klic místa: data}, 'horoskop': {znamení: data},
+    'kalendare': {url: události}, 'zpravy': zprávy}; co nestihlo
+    doběhnout do limitu, chybí (nebo je None).
+    """
+    import http_client
+    import print_daily
+    from dateutil import tz
+
+    print_daily.nastav_cache()
+    dnes = datetime.datetime.now(tz.tzlocal()).date()
+    mista = list({profil['misto'].klic: profil['misto'] for profil in profily}.values())
+    znameni = sorted({profil['zverokruh'] for profil in profily})
+    kalendare = {kalendar['url']: kalendar for profil in profily
+                 for kalendar in print_daily.platne_kalendare(profil['kalendare'])}
+
+    spolecna = {'pocasi': {}, 'horoskop': {}, 'kalendare': {}, 'zpravy': None}
+    termin = time.monotonic() + print_daily.LIMIT_NACITANI
+    pool = ThreadPoolExecutor(max_workers=print_daily.MAX_VLAKEN, thread_name_prefix="profily")
+
+    def spust(funkce, *args):
+        return pool.submit(http_client.s_terminem(funkce, termin), *args)
+
+    ulohy = {spust(print_daily.sluzba_pocasi().ziskej, mista): ('pocasi', None),
+             spust(print_daily.get_rss_news, print_daily.MAX_NEWS): ('zpravy', None)}
+    for zverokruh in znameni:
+        ulohy[spust(print_daily.get_horoskop, zverokruh)] = ('horoskop', zverokruh)
+    for url, kalendar in kalendare.items():
+        ulohy[spust(print_daily.nacti_kalendar, kalendar, dnes)] = ('kalendare', url)
+
+    hotove, nedokoncene = wait(ulohy, timeout=print_daily.LIMIT_NACITANI)
+    for uloha in hotove:
+        druh, klic = ulohy[uloha]
+        try:
+            vysledek = uloha.result()
+        except Exception as e:
+            print(f"Chyba při načítání zdroje {druh}: {e}")
+            continue
+        if druh == 'pocasi':
+            spolecna['pocasi'] = vysledek
+        elif druh == 'zpravy':
+            spolecna['zpravy'] = vysledek
+        else:
+            spolecna[druh][klic] = vysledek
+    for uloha in nedokoncene:
+        druh, klic = ulohy[uloha]
+        print(f"Varování: zdroj {klic or druh} nestihl odpovědět do {print_daily.LIMIT_NACITANI:g} s")
+
+    pool.shutdown(wait=False, cancel_futures=True)
+    return spolecna
+
+
+def data_profilu(profil, spolecna):
+    """Složí data jedné účtenky ze společných vstupů"""
+    import print_daily
+
+    vysledky = [spolecna['kalendare'].get(kalendar['url'])
+                for kalendar in print_daily.platne_kalendare(profil['kalendare'])]
+    return {
+        'pocasi': spolecna['pocasi'].get(profil['misto'].klic),
+        'udalosti': print_daily.spoj_udalosti(vysledky),
+        'zpravy': spolecna['zpravy'],
+        'horoskop': spolecna['horoskop'].get(profil['zverokruh']),
+    }
+
+
+def _text_konfigurace(config):
+    """Konfigurace jako text ini včetně sekce DEFAULT (hodnoty bez interpolace)"""
+    vystup = io.StringIO()
+    config.write(vystup)
+    return vystup.getvalue()
+
+
+def _priprav_proces(text):
+    """Inicializace procesu poolu - stejná konfigurace jako v hlavním procesu"""
+    import print_daily
+
+    config = configparser.ConfigParser()
+    config.read_string(text)
+    print_daily.nacti_nastaveni(config)
+    # Každý proces losuje vtipy a oblečení sám za sebe
+    random.seed()
+
+
+def _kontext_procesu():
+    """Způsob startu procesů poolu bez forku hlavního procesu (viz popis modulu)"""
+    zpusob = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(zpusob)
+
+
+def vykresli_profil(profil, data):
+    """Vykreslí účtenku profilu - bajty ESC/POS, v dry run módu text"""
+    import print_daily
+
+    # Znamení a šatník profilu platí jen pro toto vykreslení
+    puvodni = print_daily.ZVEROKRUH, print_daily.SATNIK
+    print_daily.ZVEROKRUH = profil['zverokruh']
+    print_daily.SATNIK = profil['satnik']
+    try:
+        if print_daily.DRY_RUN:
+            vystup = io.StringIO()
+            with contextlib.redirect_stdout(vystup):
+                print_daily.sestav_prehled(data).prehraj(print_daily.DryRunPrinter())
+            return vystup.getvalue()
+        return print_daily.vykresli_prehled(data)
+    finally:
+        print_daily.ZVEROKRUH, print_daily.SATNIK = puvodni
+
+
+def vykresli_vse(profily, spolecna, procesu=None):
+    """Vykreslí účtenky všech profilů, při více profilech v pooli procesů"""
+    import print_daily
+
+    data = [data_profilu(profil, spolecna) for profil in profily]
+    procesu = min(procesu or os.cpu_count() or 1, len(profily))
+    if procesu <= 1:
+        return [vykresli_profil(profil, d) for profil, d in zip(profily, data)]
+
+    with ProcessPoolExecutor(max_workers=procesu, mp_context=_kontext_procesu(), initializer=_priprav_proces,
+                             initargs=(_text_konfigurace(print_daily.CONFIG),)) as pool:
+        return list(pool.map(vykresli_profil, profily, data))
+
+
+def vytiskni_profily():
+    """Vytiskne účtenky všech profilů; vrátí True, pokud se vše povedlo"""
+    import fleet
+    import print_daily
+
+    config = print_daily.CONFIG
+    profily = nacti_profily(config)
+    if not profily:
+        print("Varování: v config.ini není žádná sekce [Profile.*]")
+        return False
+
+    telemetry.zacni_beh()
+    ok = False
+    try:
+        with telemetry.span('shared_fetch', profilu=len(profily)):
+            spolecna = ziskej_spolecna(profily)
+        with telemetry.span('render', profilu=len(profily)):
+            vykreslene = vykresli_vse(profily, spolecna, config.getint('Profiles', 'workers', fallback=0))
+
+        if print_daily.DRY_RUN:
+            for profil, text in zip(profily, vykreslene):
+                print(f"\n### Profil: {profil['nazev']}")
+                print(text, end='')
+            ok = True
+            return ok
+
+        tiskarny = fleet.nacti_tiskarny(config)
+        zakazky = []
+        for profil, bajty in zip(profily, vykreslene):
+            vybrane = tiskarny
+            if profil['tiskarny']:
+                vybrane = [t for t in tiskarny if t['nazev'] in profil['tiskarny']]
+                for nazev in set(profil['tiskarny']) - {t['nazev'] for t in tiskarny}:
+                    print(f"Varování: profil {profil['nazev']} má neznámou tiskárnu {nazev}")
+            zakazky.append((vybrane, bajty))
+
+        chyby = 0
+        for profil, ulohy in zip(profily, fleet.tiskni_davku(zakazky)):
+            for nazev, uloha in ulohy.items():
+                if uloha.ok:
+                    print(f"✓ Tisk dokončen: {profil['nazev']} -> {nazev}")
+                else:
+                    chyby += 1
+                    print(f"✗ Tisk selhal: {profil['nazev']} -> {nazev} ({uloha.chyba}, pokusů: {uloha.pokusu})")
+
+        print_daily.zaznamenej_zpravy(spolecna['zpravy'])
+        ok = not chyby
+        return ok
+    finally:
+        telemetry.dokonci_beh(config, ok, verze=print_daily.VERSION, dry_run=print_daily.DRY_RUN,
+                              faze='profiles', profilu=len(profily))
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rastrové obrázky pro účtenku - logo, ikona počasí a QR kód
+PrintMaster - https://github.com/Quertz/printmaster
+
+Obrázek se převede do odstínů šedi (průhlednost na bílé pozadí), zmenší
+na šířku tiskové hlavy (384 bodů u 58mm papíru, 576 u 80mm) a převede
+na černobílý rastr jedním z režimů:
+
+    floyd      Floyd-Steinberg (fotografie, loga s přechody)
+    bayer      uspořádaný rozptyl maticí 8x8 (rovnoměrný vzor, bez šmouh)
+    threshold  prostý práh (ikony, QR kódy, ostré hrany)
+
+Práh a matice Bayer se počítají vektorově v NumPy a bity se balí
+np.packbits. NumPy je volitelné - bez něj totéž obstará Pillow v C
+(ImageChops.subtract proti opakované matici prahů a Image.point) se
+stejným výsledkem. Floyd-Steinberg obstará vždy Pillow - difuze chyby
+je sekvenční a ve vektorech by nebyla rychlejší.
+
+Výsledkem jsou bajty příkazu GS v 0 po pásech nejvýše 256 řádků.
+Zakódované obrázky se ukládají do CACHE_DIR/raster podle otisku zdroje,
+šířky a režimu, opakovaný tisk stejného obrázku nic nepočítá.
+
+Konfigurace v config.ini:
+    [Printer]
+    logo = /home/pi/logo.png
+    dither = floyd
+    weather_icon = true
+
+    [Calendars]
+    qr_url = https://calendar.google.com/calendar/u/0/r
+"""
+
+import hashlib
+import math
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import layout
+
+GS_V0 = b'\x1dv0'
+
+# Šířka tiskové hlavy v bodech podle šířky papíru v mm
+BODU = {58: 384, 80: 576}
+
+REZIMY = ('floyd', 'bayer', 'threshold')
+PRAH = 128
+VYSKA_PASU = 256
+IKONA = 96
+
+ADRESAR = os.path.join('cache', 'raster')
+# Zvýšit při změně kódování nebo kresby ikon (zneplatní uložené obrázky)
+VERZE = 1
+
+# Zakódované obrázky v paměti procesu (nejdéle nepoužité se zahodí)
+MAX_PAMET = 32
+_pamet = OrderedDict()
+_zamek = threading.Lock()
+
+
+def _numpy():
+    """Modul numpy, nebo None, pokud není nainstalovaný"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def dostupny():
+    """Je nainstalovaný Pillow? Bez něj se obrázky netisknou"""
+    import importlib.util
+
+    return importlib.util.find_spec('PIL') is not None
+
+
+def bodu(papir=None):
+    """Šířka tiskové hlavy v bodech pro šířku papíru"""
+    return BODU.get(papir or layout.PAPIR, BODU[58])
+
+
+def matice_bayer(n=8):
+    """Prahová matice uspořádaného rozptylu n x n (hodnoty 0..n*n-1)"""
+    matice = [[0]]
+    while len(matice) < n:
+        m = len(matice)
+        matice = [[4 * matice[y % m][x % m] + (0, 2, 3, 1)[(y // m) * 2 + x // m]
+                   for x in range(2 * m)]
+                  for y in range(2 * m)]
+    return matice
+
+
+def _odstiny_sedi(obraz):
+    """Převede obrázek Pillow do odstínů šedi, průhlednost na bílém pozadí"""
+    from PIL import Image
+
+    if obraz.mode in ('RGBA', 'LA', 'PA') or (obraz.mode == 'P' and 'transparency' in obraz.info):
+        obraz = obraz.convert('RGBA')
+        pozadi = Image.new('RGBA', obraz.size, (255, 255, 255, 255))
+        obraz = Image.alpha_composite(pozadi, obraz)
+    return obraz.convert('L')
+
+
+def _zmensi(obraz, sirka, rezim):
+    """Zmenší obrázek na požadovanou šířku (nejvýše šířku hlavy), poměr stran zůstane"""
+    from PIL import Image
+
+    sirka = min(sirka or obraz.width, bodu())
+    if sirka == obraz.width:
+        return obraz
+    vyska = max(1, round(obraz.height * sirka / obraz.width))
+    # Ostré hrany (ikony, QR) se nesmí rozmazat
+    prevzorkovani = Image.NEAREST if rezim == 'threshold' else Image.LANCZOS
+    return obraz.resize((sirka, vyska), prevzorkovani)
+
+
+_INVERZE = bytes(255 - b for b in range(256))
+
+
+def _bity(obraz, rezim, prah):
+    """Vrátí (bajtů na řádek, zabalené řádky) - 1 = černý bod, MSB vlevo"""
+    from PIL import Image
+
+    sirka, vyska = obraz.size
+    np = _numpy()
+
+    if np is not None:
+        if rezim == 'floyd':
+            # Pillow: bod '1' je bílý
+            cerne = ~np.asarray(obraz.convert('1'), dtype=bool)
+        else:
+            pixely = np.asarray(obraz, dtype=np.uint8)
+            if rezim == 'bayer':
+                matice = np.array(matice_bayer(), dtype=np.float32)
+                prahy = (matice + 0.5) * (256 / matice.size)
+                opakovani = (-(-vyska // len(matice)), -(-sirka // len(matice)))
+                cerne = pixely < np.tile(prahy, opakovani)[:vyska, :sirka]
+            else:
+                cerne = pixely < prah
+        return (sirka + 7) // 8, np.packbits(cerne, axis=1).tobytes()
+
+    if rezim == 'floyd':
+        jednobitovy = obraz.convert('1')
+    elif rezim == 'bayer':
+        from PIL import ImageChops
+
+        # Bod je bílý, když odečtení celočíselného prahu (o 1 menšího) nechá kladný zbytek
+        jednobitovy = ImageChops.subtract(obraz, _obraz_prahu(sirka, vyska)).point(_tabulka_prahu(1), '1')
+    else:
+        jednobitovy = obraz.point(_tabulka_prahu(prah), '1')
+    # Doplnění řádku na celé bajty bílou - po obrácení nesmí vzniknout černý okraj
+    if sirka % 8:
+        doplneny = Image.new('1', (sirka + 8 - sirka % 8, vyska), 1)
+        doplneny.paste(jednobitovy, (0, 0))
+        jednobitovy = doplneny
+    # Pillow balí bílé body jako 1 - pro tiskárnu se bity obrátí
+    return (sirka + 7) // 8, jednobitovy.tobytes().translate(_INVERZE)
+
+
+def _tabulka_prahu(prah):
+    return [255 if i >= prah else 0 for i in range(256)]
+
+
+def _obraz_prahu(sirka, vyska):
+    """Matice Bayer opakovaná přes obrázek jako obrázek 'L'
+
+    Hodnota bodu je nejvyšší úroveň šedi, která je ještě pod prahem
+    (bod je černý, když jeho šeď hodnotu nepřesáhne) - stejný výsledek
+    jako porovnání s desetinnými prahy ve větvi NumPy.
+    """
+    from PIL import Image
+
+    matice = matice_bayer()
+    n = len(matice)
+    krok = 256 / (n * n)
+    radky = [bytes(math.ceil((radek[x % n] + 0.5) * krok) - 1 for x in range(sirka)) for radek in matice]
+    pas = b''.join(radky)
+    data = (pas * -(-vyska // n))[:sirka * vyska]
+    return Image.frombytes('L', (sirka, vyska), data)
+
+
+def gs_v0(bajtu_na_radek, data):
+    """Zabalí řádky rastru do příkazů GS v 0 po pásech nejvýše VYSKA_PASU řádků"""
+    useky = []
+    vyska = len(data) // bajtu_na_radek if bajtu_na_radek else 0
+    for y in range(0, vyska, VYSKA_PASU):
+        radku = min(VYSKA_PASU, vyska - y)
+        useky.append(GS_V0 + bytes([0, bajtu_na_radek & 0xFF, bajtu_na_radek >> 8, radku & 0xFF, radku >> 8]))
+        useky.append(data[y * bajtu_na_radek:(y + radku) * bajtu_na_radek])
+    return b''.join(useky)
+
+
+def zakoduj(obraz, sirka=None, rezim='floyd', prah=PRAH):
+    """Převede obrázek Pillow na bajty GS v 0 (bez cache)"""
+    if rezim not in REZIMY:
+        raise ValueError(f"neznámý režim rastru: {rezim}")
+    obraz = _zmensi(_odstiny_sedi(obraz), sirka, rezim)
+    return gs_v0(*_bity(obraz, rezim, prah))
+
+
+def _z_cache(otisk_zdroje, sirka, rezim, prah, vyrob):
+    """Vrátí zakódovaný obrázek z paměti nebo z disku, jinak jej vyrobí a uloží
+
+    vyrob() vrací obrázek Pillow; volá se jen při chybějící cache.
+    """
+    klic = hashlib.sha256(f"{VERZE}|{otisk_zdroje}|{sirka}|{bodu()}|{rezim}|{prah}".encode('utf-8')).hexdigest()
+    with _zamek:
+        if klic in _pamet:
+            _pamet.move_to_end(klic)
+            return _pamet[klic]
+
+    cesta = os.path.join(ADRESAR, f"{klic}.bin")
+    try:
+        with open(cesta, 'rb') as f:
+            data = f.read()
+    except OSError:
+        data = zakoduj(vyrob(), sirka, rezim, prah)
+        try:
+            os.makedirs(ADRESAR, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=ADRESAR, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, cesta)
+        except OSError as e:
+            print(f"Varování: nelze uložit obrázek do cache: {e}")
+
+    with _zamek:
+        _pamet[klic] = data
+        while len(_pamet) > MAX_PAMET:
+            _pamet.popitem(last=False)
+    return data
+
+
+def rastr(zdroj, sirka=None, rezim='floyd', prah=PRAH):
+    """Bajty GS v 0 pro obrázek ze souboru (cesta) nebo z bajtů souboru"""
+    import io
+
+    if isinstance(zdroj, (bytes, bytearray)):
+        obsah = bytes(zdroj)
+    else:
+        with open(zdroj, 'rb') as f:
+            obsah = f.read()
+
+    def vyrob():
+        from PIL import Image
+
+        obraz = Image.open(io.BytesIO(obsah))
+        obraz.load()
+        return obraz
+
+    return _z_cache(hashlib.sha256(obsah).hexdigest(), sirka, rezim, prah, vyrob)
+
+
+# ====== IKONY POČASÍ ======
+
+# Kód ikony OpenWeatherMap (bez d/n) -> druh ikony
+DRUHY_OWM = {
+    '01': 'jasno',
+    '02': 'polojasno',
+    '03': 'oblacno',
+    '04': 'oblacno',
+    '09': 'dest',
+    '10': 'dest',
+    '11': 'bourka',
+    '13': 'snih',
+    '50': 'mlha',
+}
+
+
+def druh_ikony(pocasi):
+    """Druh ikony pro slovník počasí (podle kódu OWM, jinak podle srážek a oblačnosti)"""
+    druh = DRUHY_OWM.get((pocasi.get('ikona') or '')[:2])
+    if druh:
+        return druh
+    if pocasi.get('snih'):
+        return 'snih'
+    if pocasi.get('dest'):
+        return 'dest'
+    oblacnost = pocasi.get('oblacnost') or 0
+    if oblacnost > 60:
+        return 'oblacno'
+    if oblacnost > 20:
+        return 'polojasno'
+    return 'jasno'
+
+
+def _slunce(kresba, stred, polomer, tloustka):
+    import math
+
+    x, y = stred
+    kresba.ellipse((x - polomer, y - polomer, x + polomer, y + polomer), outline=0, width=tloustka)
+    for i in range(8):
+        uhel = i * math.pi / 4
+        z = polomer * 1.35
+        k = polomer * 1.85
+        kresba.line((x + z * math.cos(uhel), y + z * math.sin(uhel),
+                     x + k * math.cos(uhel), y + k * math.sin(uhel)), fill=0, width=tloustka)
+
+
+def _mrak(kresba, s, dy, tloustka):
+    """Mrak přes šířku ikony; dy posune mrak dolů
+
+    Obrys vznikne nakreslením tvaru černě o tloušťku čáry většího
+    a bíle v původní velikosti - vnitřní hrany kruhů tak nezůstanou.
+    """
+    kruhy = [(0.14, 0.40, 0.48, 0.74), (0.34, 0.22, 0.80, 0.68), (0.58, 0.42, 0.88, 0.74)]
+    spodek = (0.31, 0.57, 0.73, 0.74)
+    for rozsireni, barva in ((tloustka, 0), (0, 255)):
+        for x0, y0, x1, y1 in kruhy:
+            kresba.ellipse((x0 * s - rozsireni, y0 * s + dy - rozsireni,
+                            x1 * s + rozsireni, y1 * s + dy + rozsireni), fill=barva)
+        x0, y0, x1, y1 = spodek
+        kresba.rectangle((x0 * s, y0 * s + dy, x1 * s, y1 * s + dy + rozsireni), fill=barva)
+
+
+def nakresli_ikonu(druh, sirka=IKONA):
+    """Nakreslí ikonu počasí jako obrázek Pillow (černá na bílé)"""
+    from PIL import Image, ImageDraw
+
+    s = sirka
+    t = max(2, s // 24)
+    obraz = Image.new('L', (s, s), 255)
+    kresba = ImageDraw.Draw(obraz)
+
+    if druh == 'jasno':
+        _slunce(kresba, (s / 2, s / 2), s * 0.2, t)
+    elif druh == 'polojasno':
+        _slunce(kresba, (s * 0.36, s * 0.34), s * 0.14, t)
+        _mrak(kresba, s, s * 0.12, t)
+    elif druh == 'mlha':
+        for i in range(4):
+            y = s * (0.3 + i * 0.13)
+            kresba.line((s * (0.15 + 0.05 * (i % 2)), y, s * (0.85 - 0.05 * (i % 2)), y), fill=0, width=t)
+    else:
+        _mrak(kresba, s, -s * 0.08, t)
+        if druh == 'dest':
+            for x in (0.32, 0.5, 0.68):
+                kresba.line((s * x, s * 0.72, s * (x - 0.06), s * 0.9), fill=0, width=t)
+        elif druh == 'snih':
+            for x in (0.32, 0.5, 0.68):
+                r = s * 0.04
+                kresba.ellipse((s * x - r, s * 0.8 - r, s * x + r, s * 0.8 + r), fill=0)
+        elif druh == 'bourka':
+            kresba.polygon([(s * 0.52, s * 0.66), (s * 0.40, s * 0.82), (s * 0.50, s * 0.82),
+                            (s * 0.44, s * 0.96), (s * 0.62, s * 0.76), (s * 0.52, s * 0.76)], fill=0)
+    return obraz
+
+
+def ikona_pocasi(pocasi, sirka=IKONA):
+    """Bajty GS v 0 s ikonou počasí (z cache, kreslí se jen poprvé)"""
+    druh = druh_ikony(pocasi)
+    return _z_cache(f"ikona:{druh}", sirka, 'threshold', PRAH, lambda: nakresli_ikonu(druh, sirka))
+
+
+def qr(text, sirka=None):
+    """Bajty GS v 0 s QR kódem textu (typicky odkazu)
+
+    Modul kódu má celý počet bodů, aby čtečka nedostala rozmazané hrany.
+    """
+    import qrcode
+
+    def vyrob():
+        kod = qrcode.QRCode(border=2)
+        kod.add_data(text)
+        kod.make(fit=True)
+        modulu = kod.modules_count + 2 * kod.border
+        kod.box_size = max(1, min(sirka or bodu() // 2, bodu()) // modulu)
+        return kod.make_image().get_image()
+
+    # Šířka je v otisku, ne v parametru sirka - výsledek se už nezmenšuje,
+    # moduly by pak neměly celý počet bodů
+    otisk = f"qr:{sirka}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+    return _z_cache(otisk, None, 'threshold', PRAH, vyrob)
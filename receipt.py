@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dokumentový model účtenky a serializace do ESC/POS
+PrintMaster - https://github.com/Quertz/printmaster
+
+Účtenka se nejdřív celá sestaví v paměti jako posloupnost bloků se styly
+(stejné rozhraní set/text/cut jako tiskárna). Teprve hotový dokument se
+jednou převede do předem alokovaného bytearray s příkazy ESC/POS
+a pošle do tiskárny ve velkých blocích. Chyba při sestavování tak nikdy
+nezanechá napůl vytištěný papír.
+"""
+
+import codepage
+import layout
+
+ESC = b'\x1b'
+GS = b'\x1d'
+
+INIT = ESC + b'@'
+ZAROVNANI = {'left': 0, 'center': 1, 'right': 2}
+FONTY = {'a': 0, 'b': 1}
+
+# Kódová stránka tiskárny (ESC t n) a odpovídající kódování v Pythonu
+KODOVA_STRANKA = 18
+KODOVANI = 'cp852'
+
+VELIKOST_BLOKU = 4096
+
+VYCHOZI_STYL = ('left', False, 1, 1, 'a')
+
+
+class Dokument:
+    """Účtenka v paměti - bloky textu se styly a řez papíru
+
+    Styl je n-tice (zarovnání, tučně, šířka, výška, font).
+    Blok je ('text', styl, text), ('obraz', styl, (popis, bajty GS v 0))
+    nebo ('rez', None, None).
+    """
+
+    def __init__(self):
+        self.bloky = []
+        self.align, self.bold, self.width, self.height, self.font = VYCHOZI_STYL
+
+    @property
+    def styl(self):
+        return (self.align, self.bold, self.width, self.height, self.font)
+
+    def set(self, align=None, text_type=None, width=None, height=None, font=None):
+        """Změní styl následujícího textu (mění jen zadané vlastnosti)
+
+        text_type 'B' zapne tučné písmo, 'normal' vrátí běžné písmo
+        včetně normální velikosti, pokud není zadána jiná.
+        """
+        if align:
+            self.align = align
+        if text_type == 'B':
+            self.bold = True
+        elif text_type == 'normal':
+            self.bold = False
+            self.width = 1
+            self.height = 1
+        if width:
+            self.width = width
+        if height:
+            self.height = height
+        if font:
+            self.font = font.lower()
+
+    def text(self, text):
+        """Přidá text aktuálním stylem (sousední bloky se stejným stylem se spojí)"""
+        if not text:
+            return
+        if self.bloky and self.bloky[-1][0] == 'text' and self.bloky[-1][1] == self.styl:
+            druh, styl, predchozi = self.bloky[-1]
+            self.bloky[-1] = (druh, styl, predchozi + text)
+        else:
+            self.bloky.append(('text', self.styl, text))
+
+    def odstavec(self, text, predpona=''):
+        """Přidá text zalomený podle šířky řádku pro aktuální font a šířku písma
+
+        Předpona (např. čas události) se vytiskne před prvním řádkem
+        a pokračovací řádky se odsadí na její šířku. Měří se text už
+        přepsaný do kódové stránky, aby náhrady nepřetekly okraj papíru.
+        """
+        text = prepis_text(text)
+        predpona = prepis_text(predpona)
+        sloupce = layout.sloupcu(self.font, self.width)
+        if layout.delka(predpona) > sloupce // 2:
+            # Na úzkém řádku by předpona nechala na text příliš málo místa
+            self.text(predpona.rstrip() + '\n')
+            predpona = ''
+        radky = layout.zalom(text, sloupce, layout.delka(predpona))
+        self.text(predpona + '\n'.join(radky) + '\n')
+
+    def obrazek(self, data, popis='obrázek'):
+        """Přidá rastrový obrázek (bajty GS v 0 z raster.py) zarovnaný podle stylu
+
+        Popis se vypíše místo obrázku při testovacím tisku.
+        """
+        self.bloky.append(('obraz', self.styl, (popis, bytes(data))))
+
+    def cut(self):
+        """Přidá řez papíru"""
+        self.bloky.append(('rez', None, None))
+
+    def prehraj(self, tiskarna):
+        """Přehraje dokument na objekt s rozhraním set/text/cut (např. DryRunPrinter)"""
+        for druh, styl, text in self.bloky:
+            if druh == 'rez':
+                tiskarna.cut()
+                continue
+            align, bold, width, height, font = styl
+            tiskarna.set(align=align, text_type='B' if bold else 'normal', width=width, height=height)
+            if druh == 'obraz':
+                tiskarna.text(f"[{text[0]}]\n")
+                continue
+            tiskarna.text(text)
+
+
+def prikazy_stylu(styl, predchozi=None):
+    """Vrátí příkazy ESC/POS pro přechod z předchozího stylu na nový"""
+    align, bold, width, height, font = styl
+    p_align, p_bold, p_width, p_height, p_font = predchozi or (None,) * 5
+
+    prikazy = b''
+    if align != p_align:
+        prikazy += ESC + b'a' + bytes([ZAROVNANI.get(align, 0)])
+    if bold != p_bold:
+        prikazy += ESC + b'E' + bytes([1 if bold else 0])
+    if (width, height) != (p_width, p_height):
+        prikazy += GS + b'!' + bytes([((width - 1) << 4) | (height - 1)])
+    if font != p_font:
+        prikazy += ESC + b'M' + bytes([FONTY.get(font, 0)])
+    return prikazy
+
+
+def koduj_text(text):
+    """Zakóduje text do kódové stránky tiskárny (s přepisem nepodporovaných znaků)"""
+    return codepage.koduj(text, KODOVANI)
+
+
+def prepis_text(text):
+    """Vrátí text s nepodporovanými znaky přepsanými tak, jak se vytisknou"""
+    return codepage.prepis(text, KODOVANI)
+
+
+def hlavicka():
+    """Inicializace tiskárny a výběr kódové stránky"""
+    return INIT + ESC + b't' + bytes([KODOVA_STRANKA])
+
+
+def useky_bloku(bloky):
+    """Vrací úseky bajtů pro bloky dokumentu
+
+    První blok vždy nastaví celý styl, takže výsledek nezávisí na tom,
+    co se tisklo před ním (lze jej uložit a skládat s jinými úseky).
+    """
+    styl = None
+    for druh, novy_styl, text in bloky:
+        if druh == 'rez':
+            # Posun papíru a částečný řez
+            yield GS + b'V' + bytes([66, 3])
+            continue
+        yield prikazy_stylu(novy_styl, styl)
+        # Obrázek je už hotový rastr, nekóduje se
+        yield text[1] if druh == 'obraz' else koduj_text(text)
+        styl = novy_styl
+
+
+def koduj_bloky(bloky):
+    """Převede bloky dokumentu na souvislý úsek bajtů"""
+    return b''.join(useky_bloku(bloky))
+
+
+def spoj(useky):
+    """Spojí úseky do jednoho předem alokovaného bytearray"""
+    useky = list(useky)
+    data = bytearray(sum(len(u) for u in useky))
+
+    pohled = memoryview(data)
+    pozice = 0
+    for usek in useky:
+        pohled[pozice:pozice + len(usek)] = usek
+        pozice += len(usek)
+
+    return data
+
+
+def serializuj(dokument):
+    """Převede dokument na jeden předem alokovaný bytearray příkazů ESC/POS"""
+    return spoj([hlavicka(), *useky_bloku(dokument.bloky)])
+
+
+def odesli(tiskarna, data, velikost_bloku=VELIKOST_BLOKU):
+    """Pošle hotová data do tiskárny python-escpos ve velkých blocích"""
+    pohled = memoryview(data)
+    for pozice in range(0, len(data), velikost_bloku):
+        tiskarna._raw(bytes(pohled[pozice:pozice + velikost_bloku]))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verzované instalace s atomickým přepnutím a okamžitým návratem
+PrintMaster - https://github.com/Quertz/printmaster
+
+Každé vydání se rozbalí do vlastního adresáře versions/<verze>
+a předkompiluje (.pyc s nekontrolovaným otiskem - adresář verze se už
+nemění, první spuštění po aktualizaci tak nic nekompiluje). Aktivní
+verzi určuje symbolický odkaz current, předchozí odkaz previous.
+Přepnutí je vytvoření nového odkazu vedle a jeho přejmenování přes
+current - jediná atomická operace, běžící tisk dojede se starou verzí.
+Návrat k předchozí verzi je přejmenování previous na current.
+
+Spouštěné skripty v kořeni instalace (runme.py, update.py, spooler.py)
+nahradí malé spouštěče, které při startu rozřeší odkaz current a spustí
+stejnojmenný skript aktivní verze. Konfigurace, cache a log zůstávají
+v kořeni instalace.
+
+    [Updates]
+    keep_versions = 3
+
+Ponechá se keep_versions nejnovějších verzí a vždy aktivní a předchozí.
+"""
+
+import os
+import shutil
+import tempfile
+
+ADRESAR_VERZI = 'versions'
+AKTIVNI = 'current'
+PREDCHOZI = 'previous'
+SPOUSTECE = ('runme.py', 'update.py', 'spooler.py')
+PONECHAT = 3
+
+SPOUSTEC = '''#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spouštěč aktivní verze (vytvořeno při aktualizaci, neupravovat)
+PrintMaster - https://github.com/Quertz/printmaster
+
+Spustí stejnojmenný skript z adresáře, na který ukazuje odkaz current.
+Cesta se rozřeší hned při startu - přepnutí verze během běhu tak
+nesmíchá moduly dvou verzí.
+"""
+
+import os
+import runpy
+import sys
+
+adresar = os.path.realpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'current'))
+sys.path[0] = adresar
+runpy.run_path(os.path.join(adresar, os.path.basename(__file__)), run_name='__main__')
+'''
+
+
+def _verze_odkazu(odkaz):
+    if not os.path.islink(odkaz):
+        return None
+    return os.path.basename(os.path.normpath(os.readlink(odkaz)))
+
+
+def aktivni():
+    """Aktivní verze (cíl odkazu current), nebo None u instalace bez verzí"""
+    return _verze_odkazu(AKTIVNI)
+
+
+def predchozi():
+    """Verze, na kterou se lze vrátit (cíl odkazu previous), nebo None"""
+    return _verze_odkazu(PREDCHOZI)
+
+
+def cesta_verze(verze):
+    return os.path.join(ADRESAR_VERZI, verze)
+
+
+def predkompiluj(adresar):
+    """Zkompiluje moduly verze do __pycache__; vrátí False při chybě syntaxe"""
+    import compileall
+    import py_compile
+
+    return bool(compileall.compile_dir(adresar, quiet=1,
+                                       invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH))
+
+
+def _dokonci(docasny, verze):
+    """Předkompiluje připravený adresář a přejmenuje jej na versions/<verze>"""
+    if not predkompiluj(docasny):
+        raise ValueError(f"verzi {verze} nelze zkompilovat")
+    cil = cesta_verze(verze)
+    if os.path.exists(cil):
+        if verze in (aktivni(), predchozi()):
+            raise ValueError(f"verze {verze} je už nainstalovaná a používá se")
+        shutil.rmtree(cil)
+    os.rename(docasny, cil)
+    return cil
+
+
+def rozbal(zip_cesta, verze):
+    """Rozbalí archiv vydání do versions/<verze> (nejdřív vedle, pak přejmenuje)"""
+    import zipfile
+
+    os.makedirs(ADRESAR_VERZI, exist_ok=True)
+    docasny = tempfile.mkdtemp(dir=ADRESAR_VERZI, prefix='.rozbaleni-')
+    try:
+        with zipfile.ZipFile(zip_cesta) as archiv:
+            archiv.extractall(docasny)
+        # GitHub balí vydání do jednoho adresáře s názvem repozitáře
+        polozky = os.listdir(docasny)
+        koren = docasny
+        if len(polozky) == 1 and os.path.isdir(os.path.join(docasny, polozky[0])):
+            koren = os.path.join(docasny, polozky[0])
+        if not os.path.exists(os.path.join(koren, 'runme.py')):
+            raise ValueError("archiv neobsahuje runme.py")
+        return _dokonci(koren, verze)
+    finally:
+        shutil.rmtree(docasny, ignore_errors=True)
+
+
+def prevezmi_puvodni(verze):
+    """Instalaci bez verzí (moduly v kořeni) převezme jako první verzi
+
+    Moduly se zkopírují do versions/<verze> a ta se aktivuje - první
+    verzovaná aktualizace tak má kam se vrátit. Už verzovanou instalaci
+    nechá být.
+    """
+    if aktivni() is not None or os.path.exists(cesta_verze(verze)):
+        return False
+    os.makedirs(ADRESAR_VERZI, exist_ok=True)
+    docasny = tempfile.mkdtemp(dir=ADRESAR_VERZI, prefix='.prevzeti-')
+    try:
+        for soubor in os.listdir('.'):
+            if soubor.endswith('.py'):
+                shutil.copy2(soubor, os.path.join(docasny, soubor))
+        _dokonci(docasny, verze)
+    finally:
+        shutil.rmtree(docasny, ignore_errors=True)
+    _prepni(AKTIVNI, cesta_verze(verze))
+    return True
+
+
+def _prepni(odkaz, cil):
+    """Atomicky nasměruje odkaz na cíl - nový odkaz vedle a přejmenování přes starý"""
+    docasny = f"{odkaz}.{os.getpid()}.tmp"
+    if os.path.lexists(docasny):
+        os.remove(docasny)
+    os.symlink(cil, docasny)
+    os.replace(docasny, odkaz)
+
+
+def zapis_spoustece():
+    """Nahradí spouštěné skripty v kořeni instalace spouštěči aktivní verze"""
+    for nazev in SPOUSTECE:
+        try:
+            with open(nazev, 'r', encoding='utf-8') as f:
+                if f.read() == SPOUSTEC:
+                    continue
+        except OSError:
+            pass
+        fd, tmp = tempfile.mkstemp(dir='.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(SPOUSTEC)
+        os.chmod(tmp, 0o755)
+        os.replace(tmp, nazev)
+
+
+def aktivuj(verze):
+    """Přepne aktivní verzi; dosud aktivní se stane předchozí"""
+    cil = cesta_verze(verze)
+    if not os.path.isdir(cil):
+        raise ValueError(f"verze {verze} není nainstalovaná")
+    puvodni = os.readlink(AKTIVNI) if os.path.islink(AKTIVNI) else None
+    if puvodni is not None and os.path.normpath(puvodni) != os.path.normpath(cil):
+        _prepni(PREDCHOZI, puvodni)
+    _prepni(AKTIVNI, cil)
+    zapis_spoustece()
+
+
+def vrat_zpet():
+    """Vrátí předchozí verzi jediným přejmenováním; vrátí ji, nebo None"""
+    if not os.path.islink(PREDCHOZI):
+        return None
+    os.replace(PREDCHOZI, AKTIVNI)
+    return aktivni()
+
+
+def _klic_verze(verze):
+    try:
+        return (1, [int(x) for x in verze.split('.')])
+    except ValueError:
+        return (0, [])
+
+
+def ukliz(ponechat=PONECHAT):
+    """Smaže staré verze (ponechá nejnovější, aktivní a předchozí) a staré zálohy
+
+    Vrátí seznam smazaných verzí.
+    """
+    if not os.path.isdir(ADRESAR_VERZI):
+        return []
+    verze = sorted((v for v in os.listdir(ADRESAR_VERZI)
+                    if not v.startswith('.') and os.path.isdir(cesta_verze(v))),
+                   key=_klic_verze, reverse=True)
+    chranene = set(verze[:max(1, ponechat)]) | {aktivni(), predchozi()}
+    smazane = []
+    for v in verze:
+        if v not in chranene:
+            shutil.rmtree(cesta_verze(v), ignore_errors=True)
+            smazane.append(v)
+
+    # Zálohy backup_<čas> z dob kopírování souborů přes živou instalaci
+    if aktivni() is not None:
+        for nazev in os.listdir('.'):
+            if nazev.startswith('backup_') and os.path.isdir(nazev):
+                shutil.rmtree(nazev, ignore_errors=True)
+    return smazane
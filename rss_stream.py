@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Proudové čtení RSS/Atom - jen prvních N titulků, pak se spojení zavře
+PrintMaster - https://github.com/Quertz/printmaster
+
+Tělo odpovědi se čte po blocích (gzip/deflate rozbaluje urllib3) a posílá
+do inkrementálního XML parseru. Jakmile je k dispozici potřebný počet
+položek, čtení skončí a spojení se zavře - přenesená data i čas parsování
+tak závisí na počtu položek, ne na velikosti feedu.
+
+Validátory (ETag / Last-Modified) a hotové titulky se ukládají do HTTP
+cache, takže nezměněný feed vrátí 304 a nic se neparsuje. Feed, který
+XML parser nezvládne (neznámé kódování, HTML entity), se načte celý
+přes feedparser.
+"""
+
+import xml.etree.ElementTree as ET
+
+import http_cache
+
+VELIKOST_BLOKU = 8 * 1024
+
+POLOZKY = {'item', 'entry'}
+
+
+def _mistni_nazev(tag):
+    """Název elementu bez jmenného prostoru"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _titulek(element):
+    return ' '.join(''.join(element.itertext()).split())
+
+
+class Cteni:
+    """Inkrementální extrakce titulků z bloků XML"""
+
+    def __init__(self, pocet):
+        self.pocet = pocet
+        self.titulky = []
+        self.prijato = 0
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._hloubka_polozky = 0
+        self._titulek = None
+
+    @property
+    def hotovo(self):
+        return len(self.titulky) >= self.pocet
+
+    def pridej(self, blok):
+        """Zpracuje další blok dat; vrátí True, když už má dost titulků"""
+        self.prijato += len(blok)
+        self._parser.feed(blok)
+        for udalost, element in self._parser.read_events():
+            nazev = _mistni_nazev(element.tag)
+            if udalost == 'start':
+                if nazev in POLOZKY:
+                    self._hloubka_polozky += 1
+                    self._titulek = None
+                continue
+
+            if self._hloubka_polozky and nazev == 'title' and self._titulek is None:
+                self._titulek = _titulek(element)
+            elif nazev in POLOZKY:
+                self._hloubka_polozky -= 1
+                if self._titulek:
+                    self.titulky.append(self._titulek)
+                # Hotová položka se uvolní, strom v paměti neroste
+                element.clear()
+                if self.hotovo:
+                    return True
+        return False
+
+
+def _zalozni_titulky(url, pocet, headers, timeout):
+    """Celé stažení a feedparser pro feedy, které XML parser nezvládne"""
+    import feedparser
+
+    response = http_cache.stahni(url, headers=headers, timeout=timeout)
+    if not response.ok:
+        return response.status, None
+    feed = feedparser.parse(response.obsah())
+    titulky = [entry.title for entry in feed.entries[:pocet] if hasattr(entry, 'title')]
+    http_cache.uloz_vysledek(url, f"titulky-{pocet}", titulky)
+    return 200, titulky
+
+
+def prvni_titulky(url, pocet, headers=None, timeout=10):
+    """Vrátí (HTTP status, seznam prvních `pocet` titulků feedu)
+
+    Při chybném statusu je seznam None.
+    """
+    import telemetry
+
+    with telemetry.span('http', url=telemetry.adresa(url), proud=True) as s:
+        try:
+            status, titulky = _prvni_titulky(url, pocet, headers, timeout, s)
+        except Exception as e:
+            # Text výjimky obsahuje celou adresu - do telemetrie jen typ
+            s['chyba'] = type(e).__name__
+            raise
+        s['status'] = status
+        return status, titulky
+
+
+def _prvni_titulky(url, pocet, headers, timeout, s):
+    import http_client
+
+    klic = f"titulky-{pocet}"
+    hlavicky = dict(headers or {})
+    hlavicky.setdefault('Accept-Encoding', 'gzip, deflate')
+    if http_cache.nacti_vysledek(url, klic) is not None:
+        hlavicky.update(http_cache.podminene_hlavicky(url))
+
+    with http_client.get(url, headers=hlavicky, timeout=timeout, stream=True, allow_redirects=True) as response:
+        if response.status_code == 304:
+            ulozene = http_cache.nacti_vysledek(url, klic)
+            if ulozene is not None:
+                s['cache'] = 'hit'
+                return 200, ulozene
+        if response.status_code != 200:
+            return response.status_code, None
+
+        s['cache'] = 'miss'
+        cteni = Cteni(pocet)
+        try:
+            for blok in response.raw.stream(VELIKOST_BLOKU, decode_content=True):
+                if cteni.pridej(blok):
+                    break
+        except ET.ParseError:
+            if not cteni.hotovo:
+                s['zalozni'] = True
+                return _zalozni_titulky(url, pocet, headers, timeout)
+        finally:
+            s['bajty'] = cteni.prijato
+
+        # Opuštěním bloku se nedočtené spojení zavře
+        http_cache.uloz_meta(url, response.headers)
+
+    http_cache.uloz_vysledek(url, klic, cteni.titulky)
+    return 200, cteni.titulky
@@ -165,6 +165,35 @@ def create_initial_config():
 
 def main():
     """Hlavní funkce"""
+    # Načtení dat s předstihem před tiskem: python3 runme.py --prefetch
+    if '--prefetch' in sys.argv:
+        if not check_config_exists():
+            print("CHYBA: config.ini neexistuje, spusťte nejdřív python3 runme.py")
+            sys.exit(1)
+        import print_daily
+        import prefetch
+        print_daily.nacti_nastaveni()
+        prefetch.predstih()
+        return
+    
+    # Účtenky pro všechny profily [Profile.*]: python3 runme.py --profiles
+    if '--profiles' in sys.argv:
+        if not check_config_exists():
+            print("CHYBA: config.ini neexistuje, spusťte nejdřív python3 runme.py")
+            sys.exit(1)
+        import print_daily
+        import profiles
+        print_daily.nacti_nastaveni()
+        if not profiles.vytiskni_profily():
+            sys.exit(1)
+        return
+    
+    # Zpráva o studeném startu: python3 runme.py --startup-report
+    mereni = '--startup-report' in sys.argv
+    if mereni:
+        import startup
+        startup.zapni_mereni()
+    
     print(f"PrintMaster v{VERSION}")
     print(f"https://github.com/{GITHUB_REPO}\n")
     
@@ -177,12 +206,21 @@ def main():
     
     try:
         import print_daily
+        if mereni:
+            startup.znacka('import print_daily')
         print_daily.main()
     except Exception as e:
         print(f"Chyba při tisku: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    
+    if mereni:
+        startup.znacka('tisk dokončen')
+        config = configparser.ConfigParser()
+        config.read('config.ini', encoding='utf-8')
+        if not startup.vypis_zpravu(config.getint('General', 'startup_budget_ms', fallback=0)):
+            sys.exit(2)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
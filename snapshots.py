@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Úložiště posledních dobrých dat s obnovou na pozadí (stale-while-revalidate)
+PrintMaster - https://github.com/Quertz/printmaster
+
+Poslední úspěšný výsledek každého zdroje se ukládá do SQLite databáze
+v adresáři cache. Při tisku platí pro každý zdroj:
+
+- čerstvý snímek (mladší než TTL) se použije bez stahování,
+- zastaralý snímek (mladší než maximální stáří) se použije hned, zdroj se
+  obnovuje na pozadí a na papíře se vyznačí stáří dat; pokud obnova
+  doběhne do krátkého limitu refresh_deadline, vytisknou se nová data,
+- bez použitelného snímku se zdroj stahuje s běžným limitem.
+
+Výpadek sítě tak nestojí celý časový limit ani prázdnou sekci.
+
+    [Snapshots]
+    refresh_deadline = 1
+    weather_ttl = 30
+    weather_max_stale = 720
+    calendar_ttl = 60
+    calendar_max_stale = 1440
+    news_ttl = 30
+    news_max_stale = 720
+    horoscope_ttl = 720
+    horoscope_max_stale = 1440
+
+Časy jsou v minutách.
+"""
+
+import datetime
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import http_client
+import print_daily
+import telemetry
+
+SOUBOR = 'snapshots.sqlite3'
+
+# Zdroj -> (předpona klíčů v konfiguraci, výchozí TTL, výchozí maximální stáří)
+POLITIKA = {
+    'pocasi': ('weather', 30, 720),
+    'udalosti': ('calendar', 60, 1440),
+    'zpravy': ('news', 30, 720),
+    'horoskop': ('horoscope', 720, 1440),
+}
+
+# Zdroje vázané na dnešní datum - snímek z jiného dne se nepoužije
+DENNI = {'udalosti', 'horoskop'}
+
+# Verze tvaru dat zdroje - snímek starší verze se nenačte
+VERZE_DAT = {'udalosti': 2}
+
+
+def _klic(zdroj):
+    verze = VERZE_DAT.get(zdroj)
+    return f"{zdroj}:v{verze}" if verze else zdroj
+
+
+class Uloziste:
+    """Snímky posledních dobrých výsledků v SQLite (zdroj -> čas, hodnota)"""
+
+    def __init__(self, cesta):
+        adresar = os.path.dirname(cesta)
+        if adresar:
+            os.makedirs(adresar, exist_ok=True)
+        self.cesta = cesta
+        self._zamek = threading.Lock()
+        # Zápisy přicházejí i z vláken obnovy na pozadí
+        self._db = sqlite3.connect(cesta, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS snimky ("
+            "zdroj TEXT PRIMARY KEY, cas REAL NOT NULL, hodnota BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    def nacti(self, zdroj):
+        """Vrátí (čas uložení, hodnota) nebo None"""
+        with self._zamek:
+            radek = self._db.execute(
+                "SELECT cas, hodnota FROM snimky WHERE zdroj = ?", (_klic(zdroj),)
+            ).fetchone()
+        if radek is None:
+            return None
+        try:
+            return radek[0], pickle.loads(radek[1])
+        except (pickle.UnpicklingError, EOFError, AttributeError, ValueError) as e:
+            print(f"Varování: poškozený snímek {zdroj}: {e}")
+            return None
+
+    def uloz(self, zdroj, hodnota, cas=None):
+        """Uloží poslední dobrý výsledek zdroje"""
+        data = pickle.dumps(hodnota, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._zamek:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snimky (zdroj, cas, hodnota) VALUES (?, ?, ?)",
+                (_klic(zdroj), cas if cas is not None else time.time(), data),
+            )
+            self._db.commit()
+
+    def zavri(self):
+        with self._zamek:
+            self._db.close()
+
+
+def otevri():
+    """Otevře úložiště v adresáři cache z konfigurace"""
+    return Uloziste(os.path.join(print_daily.CACHE_DIR, SOUBOR))
+
+
+def _limity(zdroj):
+    """(TTL, maximální stáří) zdroje v sekundách podle konfigurace"""
+    predpona, ttl, max_stari = POLITIKA[zdroj]
+    config = print_daily.CONFIG
+    if config is not None:
+        ttl = config.getfloat('Snapshots', f'{predpona}_ttl', fallback=ttl)
+        max_stari = config.getfloat('Snapshots', f'{predpona}_max_stale', fallback=max_stari)
+    return ttl * 60, max_stari * 60
+
+
+def stav(zdroj, cas, ted=None):
+    """Vrátí 'cerstvy', 'zastaraly' nebo 'nepouzitelny' pro snímek z času `cas`"""
+    ted = ted or time.time()
+    if zdroj in DENNI and datetime.date.fromtimestamp(cas) != datetime.date.fromtimestamp(ted):
+        return 'nepouzitelny'
+    ttl, max_stari = _limity(zdroj)
+    stari = ted - cas
+    if stari <= ttl:
+        return 'cerstvy'
+    if stari <= max_stari:
+        return 'zastaraly'
+    return 'nepouzitelny'
+
+
+def _nacti_a_uloz(uloziste, zdroj, funkce):
+    hodnota = funkce()
+    if hodnota is not None:
+        uloziste.uloz(zdroj, hodnota)
+    return hodnota
+
+
+def obnov_vse(uloziste=None):
+    """Načte všechny zdroje s běžným limitem a uloží úspěšné výsledky"""
+    uloziste = uloziste or otevri()
+    ted = time.time()
+    data = print_daily.ziskej_data()
+    for zdroj, hodnota in data.items():
+        if hodnota is not None:
+            uloziste.uloz(zdroj, hodnota, ted)
+    return data
+
+
+def data_pro_tisk(uloziste=None):
+    """Data pro tisk podle politiky stale-while-revalidate
+
+    Vrátí slovník zdrojů jako print_daily.ziskej_data(); navíc klíč
+    'stari' se slovníkem zdroj -> stáří vytištěného snímku v sekundách
+    (jen u zastaralých dat). Obnova, která nestihne limit, doběhne na
+    pozadí a uloží výsledek pro příští tisk.
+    """
+    uloziste = uloziste or otevri()
+    ted = time.time()
+    data = {'stari': {}}
+    zastarale, chybejici = [], []
+
+    for zdroj in print_daily.zdroje_dat():
+        snimek = uloziste.nacti(zdroj)
+        stav_snimku = stav(zdroj, snimek[0], ted) if snimek else 'nepouzitelny'
+        if stav_snimku == 'nepouzitelny':
+            data[zdroj] = None
+            chybejici.append(zdroj)
+            continue
+        data[zdroj] = snimek[1]
+        if stav_snimku == 'zastaraly':
+            data['stari'][zdroj] = ted - snimek[0]
+            zastarale.append(zdroj)
+
+    if not zastarale and not chybejici:
+        return data
+
+    print_daily.nastav_cache()
+    funkce = print_daily.zdroje_dat()
+    # Chybějící zdroje mají termín načítání, obnova zastaralých smí doběhnout na pozadí
+    termin = time.monotonic() + print_daily.LIMIT_NACITANI
+    pool = ThreadPoolExecutor(max_workers=len(zastarale) + len(chybejici), thread_name_prefix="obnova")
+    # Obnova, která doběhne až po konci běhu, nepřipíše spany dalšímu běhu
+    ulohy = {pool.submit(telemetry.v_behu(http_client.s_terminem(_nacti_a_uloz, termin if zdroj in chybejici else None)),
+                         uloziste, zdroj, funkce[zdroj]): zdroj
+             for zdroj in zastarale + chybejici}
+
+    # Zastaralá data čekají jen krátce, chybějící zdroje s běžným limitem
+    kratky = print_daily.CONFIG.getfloat('Snapshots', 'refresh_deadline', fallback=1)
+    wait(ulohy, timeout=kratky)
+    if chybejici:
+        zbyva = max(0, print_daily.LIMIT_NACITANI - (time.time() - ted))
+        wait([u for u, zdroj in ulohy.items() if zdroj in chybejici], timeout=zbyva)
+
+    for uloha, zdroj in ulohy.items():
+        if not uloha.done():
+            if zdroj in zastarale:
+                print(f"Varování: zdroj {zdroj} se obnovuje na pozadí, tisknu uložená data")
+            else:
+                print(f"Varování: zdroj {zdroj} nestihl odpovědět a nemá uložený snímek")
+            continue
+        try:
+            hodnota = uloha.result()
+        except Exception as e:
+            print(f"Chyba při načítání zdroje {zdroj}: {e}")
+            continue
+        if hodnota is not None:
+            data[zdroj] = hodnota
+            data['stari'].pop(zdroj, None)
+
+    # Nedokončené obnovy doběhnou na pozadí (proces na ně počká až po tisku)
+    pool.shutdown(wait=False)
+    return data
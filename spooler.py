@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rezidentní tiskový spooler s perzistentní frontou a lokálním socketem
+PrintMaster - https://github.com/Quertz/printmaster
+
+Spuštění démona:
+    python3 spooler.py
+
+Zařazení úlohy (z cronu, skriptu nebo obsluhy tlačítka):
+    python3 spooler.py submit            # denní přehled
+    python3 spooler.py submit text "Ahoj"
+
+Démon drží načtenou konfiguraci, importované moduly a otevřená spojení
+s tiskárnami. Úlohy přijímá přes Unix domain socket (jeden řádek JSON),
+ukládá je do adresáře fronty na disku a neúspěšné opakuje s rostoucí
+prodlevou. Po restartu pokračuje nevyřízenými úlohami.
+
+Úloha, která nestihne limit tiskárny, se přeruší (zavřením spojení)
+a opakuje se až po skončení původního pokusu - pokud ten přece jen
+doběhl, účtenka se podruhé netiskne.
+
+Každá úloha je jeden běh telemetrie (viz telemetry.py).
+"""
+
+import base64
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+SOCKET = 'printmaster.sock'
+ADRESAR = 'spool'
+MAX_POKUSU = 8
+ZAKLADNI_PRODLEVA = 5
+MAX_PRODLEVA = 600
+# Jak dlouho po přerušení úlohy (nad timeout tiskárny) čekat, než ji pracovník opustí
+DOBEH_PO_PRERUSENI = 5
+
+
+# ====== FRONTA NA DISKU ======
+
+class Fronta:
+    """Perzistentní fronta úloh - jeden JSON soubor na úlohu
+
+    Úloha obsahuje id, typ (prehled / text / raw), parametry, počet pokusů,
+    čas dalšího pokusu a seznam tiskáren, na které ještě nebyla vytištěna.
+    Vykreslené bajty se ukládají vedle úlohy (<id>.bin), takže opakovaný
+    pokus tiskne stejnou účtenku a nestahuje data znovu.
+    """
+
+    def __init__(self, adresar=ADRESAR):
+        self.adresar = adresar
+        self.adresar_chyb = os.path.join(adresar, 'failed')
+        os.makedirs(self.adresar_chyb, exist_ok=True)
+        self._zamek = threading.Lock()
+        self._zmena = threading.Condition(self._zamek)
+        self._pocitadlo = 0
+
+    def _cesta(self, id_ulohy, pripona='.json'):
+        return os.path.join(self.adresar, id_ulohy + pripona)
+
+    def uloz(self, uloha):
+        """Atomicky zapíše úlohu do fronty"""
+        cesta = self._cesta(uloha['id'])
+        with open(cesta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(uloha, f, ensure_ascii=False)
+        os.replace(cesta + '.tmp', cesta)
+
+    def pridej(self, typ, **parametry):
+        """Uloží novou úlohu a probudí zpracování; vrátí její id"""
+        with self._zmena:
+            self._pocitadlo += 1
+            id_ulohy = f"{time.time_ns():020d}-{os.getpid()}-{self._pocitadlo}"
+            self.uloz({
+                'id': id_ulohy,
+                'typ': typ,
+                'parametry': parametry,
+                'vytvoreno': time.time(),
+                'pokusy': 0,
+                'dalsi_pokus': 0,
+                'zbyva': None,
+                'chyba': None,
+            })
+            self._zmena.notify_all()
+        return id_ulohy
+
+    def cekajici(self):
+        """Seznam čekajících úloh seřazený podle vzniku"""
+        ulohy = []
+        for soubor in sorted(os.listdir(self.adresar)):
+            if not soubor.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.adresar, soubor), 'r', encoding='utf-8') as f:
+                    ulohy.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Varování: poškozená úloha {soubor}: {e}")
+        return ulohy
+
+    def dalsi(self, stop):
+        """Počká na první úlohu, která je na řadě (nebo na zastavení)"""
+        with self._zmena:
+            while not stop.is_set():
+                ted = time.time()
+                ulohy = self.cekajici()
+                pripravene = [u for u in ulohy if u['dalsi_pokus'] <= ted]
+                if pripravene:
+                    return pripravene[0]
+                cekani = min((u['dalsi_pokus'] - ted for u in ulohy), default=60)
+                self._zmena.wait(max(0.05, min(cekani, 60)))
+        return None
+
+    def uloz_data(self, uloha, data):
+        with open(self._cesta(uloha['id'], '.bin'), 'wb') as f:
+            f.write(data)
+
+    def nacti_data(self, uloha):
+        cesta = self._cesta(uloha['id'], '.bin')
+        if not os.path.exists(cesta):
+            return None
+        with open(cesta, 'rb') as f:
+            return f.read()
+
+    def hotovo(self, uloha):
+        """Odstraní dokončenou úlohu z fronty"""
+        for pripona in ('.json', '.bin'):
+            if os.path.exists(self._cesta(uloha['id'], pripona)):
+                os.remove(self._cesta(uloha['id'], pripona))
+
+    def odloz(self, uloha, chyba):
+        """Naplánuje další pokus s exponenciální prodlevou (nebo úlohu vyřadí)
+
+        Vrátí True, pokud se úloha bude opakovat, False, pokud skončila
+        mezi chybnými (adresář failed).
+        """
+        uloha['pokusy'] += 1
+        uloha['chyba'] = str(chyba)
+        if uloha['pokusy'] >= MAX_POKUSU:
+            print(f"✗ Úloha {uloha['id']} vyřazena po {uloha['pokusy']} pokusech: {chyba}")
+            for pripona in ('.json', '.bin'):
+                if os.path.exists(self._cesta(uloha['id'], pripona)):
+                    os.replace(self._cesta(uloha['id'], pripona),
+                               os.path.join(self.adresar_chyb, uloha['id'] + pripona))
+            return False
+        prodleva = min(MAX_PRODLEVA, ZAKLADNI_PRODLEVA * 2 ** (uloha['pokusy'] - 1))
+        uloha['dalsi_pokus'] = time.time() + prodleva
+        self.uloz(uloha)
+        print(f"Úloha {uloha['id']} selhala ({chyba}), další pokus za {prodleva} s")
+        return True
+
+
+# ====== ZPRACOVÁNÍ ÚLOH ======
+
+class Spooler:
+    """Zpracovává frontu a drží otevřená spojení s tiskárnami"""
+
+    def __init__(self, fronta, tiskarny, dry_run=False, otevri_tiskarnu=None, config=None):
+        import fleet
+
+        self.fronta = fronta
+        self.dry_run = dry_run
+        # Konfigurace pro zápis telemetrie (bez ní se běhy úloh nezapisují)
+        self.config = config
+        otevri = otevri_tiskarnu or (_KonzolovaTiskarna if dry_run else fleet.otevri)
+        # Pracovníci běží po celou dobu démona - spojení zůstávají otevřená
+        self.pracovnici = {}
+        for tiskarna in tiskarny:
+            pracovnik = fleet.Pracovnik(tiskarna, otevri)
+            pracovnik.start()
+            self.pracovnici[tiskarna['nazev']] = pracovnik
+        self.stop = threading.Event()
+        # (id úlohy, tiskárna) -> fleet.Uloha, která po přerušení ještě neskončila
+        self.nedobehle = {}
+        # Jedno úložiště snímků po celou dobu démona (zapisují do něj i obnovy na pozadí)
+        self.uloziste = None
+
+    def vykresli(self, uloha):
+        """Vykreslí úlohu do bajtů ESC/POS"""
+        import print_daily
+        import receipt
+        import snapshots
+
+        if uloha['typ'] == 'prehled':
+            if self.uloziste is None:
+                self.uloziste = snapshots.otevri()
+            data = snapshots.data_pro_tisk(self.uloziste)
+            # Titulky se zaznamenají až po úspěšném tisku
+            uloha['zpravy'] = data['zpravy']
+            return print_daily.vykresli_prehled(data)
+        if uloha['typ'] == 'text':
+            dokument = receipt.Dokument()
+            dokument.text(uloha['parametry'].get('text', '').rstrip('\n') + '\n\n\n')
+            dokument.cut()
+            return receipt.serializuj(dokument)
+        if uloha['typ'] == 'raw':
+            return base64.b64decode(uloha['parametry']['data'])
+        raise ValueError(f"Neznámý typ úlohy: {uloha['typ']}")
+
+    def zpracuj(self, uloha):
+        """Vytiskne úlohu na tiskárny, které ji ještě nemají; vrátí True po úspěchu"""
+        import fleet
+
+        data = self.fronta.nacti_data(uloha)
+        if data is None:
+            import transport
+            data = self.vykresli(uloha)
+            # Odhad doby tisku pro plánování (viz stav fronty)
+            uloha['odhad_ms'] = transport.odhad_ms(data)
+            self.fronta.uloz_data(uloha, data)
+            self.fronta.uloz(uloha)
+
+        zbyva = uloha['zbyva'] or list(self.pracovnici)
+        ulohy = {}
+        for nazev in zbyva:
+            if nazev not in self.pracovnici:
+                continue
+            # Předchozí pokus, který po limitu ještě běžel - nový se zařadí, jen když opravdu selhal
+            stara = self.nedobehle.pop((uloha['id'], nazev), None)
+            if stara is not None and (stara.ok or not stara.hotovo.is_set()):
+                ulohy[nazev] = stara
+            else:
+                ulohy[nazev] = self.pracovnici[nazev].zarad(data)
+
+        chyby = {}
+        for nazev, uloha_tiskarny in ulohy.items():
+            pracovnik = self.pracovnici[nazev]
+            limit = fleet.limit_ulohy(pracovnik.tiskarna, data)
+            if uloha_tiskarny.hotovo.wait(limit):
+                continue
+            # Opakování se nesmí potkat s původním pokusem - ten se přeruší a počká se na jeho konec
+            pracovnik.prerus(uloha_tiskarny)
+            if not uloha_tiskarny.hotovo.wait(pracovnik.tiskarna['timeout'] + DOBEH_PO_PRERUSENI):
+                self.nedobehle[(uloha['id'], nazev)] = uloha_tiskarny
+            chyby[nazev] = TimeoutError(f"tiskárna neodpověděla do {limit:g} s")
+
+        neuspesne = {nazev: chyby.get(nazev) or u.chyba for nazev, u in ulohy.items() if not u.ok}
+        if not neuspesne:
+            print(f"✓ Úloha {uloha['id']} ({uloha['typ']}) vytištěna")
+            self.fronta.hotovo(uloha)
+            self._zapomen(uloha)
+            if uloha.get('zpravy') and not self.dry_run:
+                import print_daily
+                print_daily.zaznamenej_zpravy(uloha['zpravy'])
+            return True
+
+        uloha['zbyva'] = sorted(neuspesne)
+        self._odloz(uloha, "; ".join(f"{n}: {c}" for n, c in neuspesne.items()))
+        return False
+
+    def _odloz(self, uloha, chyba):
+        if not self.fronta.odloz(uloha, chyba):
+            self._zapomen(uloha)
+
+    def _zapomen(self, uloha):
+        """Zahodí nedoběhlé pokusy úlohy, která už se opakovat nebude"""
+        for klic in [klic for klic in self.nedobehle if klic[0] == uloha['id']]:
+            del self.nedobehle[klic]
+
+    def bez(self):
+        """Hlavní smyčka zpracování fronty - každá úloha je jeden běh telemetrie"""
+        import telemetry
+
+        while not self.stop.is_set():
+            uloha = self.fronta.dalsi(self.stop)
+            if uloha is None:
+                break
+            telemetry.zacni_beh()
+            pokus = uloha['pokusy'] + 1
+            ok = False
+            try:
+                ok = self.zpracuj(uloha)
+            except Exception as e:
+                self._odloz(uloha, e)
+            finally:
+                telemetry.dokonci_beh(self.config, ok, faze='spooler', uloha=uloha['id'],
+                                      typ=uloha['typ'], pokus=pokus, dry_run=self.dry_run)
+
+    def zastav(self):
+        self.stop.set()
+        with self.fronta._zmena:
+            self.fronta._zmena.notify_all()
+        for pracovnik in self.pracovnici.values():
+            pracovnik.zastav()
+        if self.uloziste is not None:
+            self.uloziste.zavri()
+            self.uloziste = None
+
+
+class _KonzolovaTiskarna:
+    """Náhrada tiskárny v testovacím režimu - jen vypíše velikost dat"""
+
+    def __init__(self, tiskarna):
+        self.nazev = tiskarna['nazev']
+
+    def _raw(self, data):
+        print(f"[TESTOVACÍ REŽIM] {self.nazev}: {len(data)} B")
+
+    def close(self):
+        pass
+
+
+# ====== SOCKET ======
+
+class _Obsluha(socketserver.StreamRequestHandler):
+    """Přijme jeden řádek JSON s úlohou a odpoví jejím id"""
+
+    def handle(self):
+        try:
+            pozadavek = json.loads(self.rfile.readline().decode('utf-8'))
+            typ = pozadavek.pop('typ', 'prehled')
+            if typ == 'stav':
+                cekajici = self.server.fronta.cekajici()
+                odpoved = {'ok': True, 'cekajici': len(cekajici),
+                           'odhad_ms': sum(uloha.get('odhad_ms', 0) for uloha in cekajici)}
+            elif typ in ('prehled', 'text', 'raw'):
+                odpoved = {'ok': True, 'id': self.server.fronta.pridej(typ, **pozadavek)}
+            else:
+                odpoved = {'ok': False, 'chyba': f"neznámý typ úlohy: {typ}"}
+        except (ValueError, TypeError) as e:
+            odpoved = {'ok': False, 'chyba': str(e)}
+        self.wfile.write((json.dumps(odpoved, ensure_ascii=False) + '\n').encode('utf-8'))
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def spust_server(cesta, fronta):
+    """Spustí server na Unix socketu ve vlákně na pozadí"""
+    if os.path.exists(cesta):
+        os.remove(cesta)
+    server = _Server(cesta, _Obsluha)
+    server.fronta = fronta
+    os.chmod(cesta, 0o660)
+    threading.Thread(target=server.serve_forever, name='spooler-socket', daemon=True).start()
+    return server
+
+
+def odesli_ulohu(uloha, cesta=SOCKET, timeout=5):
+    """Pošle úlohu běžícímu spooleru a vrátí jeho odpověď"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(cesta)
+        s.sendall((json.dumps(uloha, ensure_ascii=False) + '\n').encode('utf-8'))
+        odpoved = b''
+        while not odpoved.endswith(b'\n'):
+            blok = s.recv(4096)
+            if not blok:
+                break
+            odpoved += blok
+    return json.loads(odpoved.decode('utf-8'))
+
+
+# ====== SPUŠTĚNÍ ======
+
+def _nastaveni():
+    import print_daily
+
+    config = print_daily.nacti_nastaveni()
+    cesta_socketu = config.get('Spooler', 'socket', fallback=SOCKET)
+    adresar = config.get('Spooler', 'spool_dir', fallback=ADRESAR)
+    return print_daily, config, cesta_socketu, adresar
+
+
+def main():
+    """Spustí démona, nebo s parametrem submit zařadí úlohu"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'submit':
+        import configparser
+
+        config = configparser.ConfigParser()
+        config.read('config.ini', encoding='utf-8')
+        cesta_socketu = config.get('Spooler', 'socket', fallback=SOCKET)
+
+        uloha = {'typ': sys.argv[2] if len(sys.argv) > 2 else 'prehled'}
+        if uloha['typ'] == 'text':
+            uloha['text'] = ' '.join(sys.argv[3:])
+        try:
+            print(json.dumps(odesli_ulohu(uloha, cesta_socketu), ensure_ascii=False))
+        except OSError as e:
+            print(f"CHYBA: spooler neběží ({cesta_socketu}): {e}")
+            sys.exit(1)
+        return
+
+    import fleet
+
+    print_daily, config, cesta_socketu, adresar = _nastaveni()
+    print(f"PrintMaster v{print_daily.VERSION} - tiskový spooler")
+
+    fronta = Fronta(adresar)
+    spooler = Spooler(fronta, fleet.nacti_tiskarny(config), dry_run=print_daily.DRY_RUN, config=config)
+    server = spust_server(cesta_socketu, fronta)
+    print(f"Naslouchám na {cesta_socketu}, fronta: {adresar} ({len(fronta.cekajici())} čekajících)")
+
+    try:
+        spooler.bez()
+    except KeyboardInterrupt:
+        print("\nUkončuji spooler...")
+    finally:
+        spooler.zastav()
+        server.shutdown()
+        if os.path.exists(cesta_socketu):
+            os.remove(cesta_socketu)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Měření studeného startu - časy importů ve stylu python -X importtime
+PrintMaster - https://github.com/Quertz/printmaster
+
+Zapíná se parametrem --startup-report (python3 runme.py --startup-report).
+Měří se přímo v běžícím procesu, takže zpráva odpovídá skutečnému
+spuštění z cronu včetně importů, které proběhnou až ve vláknech.
+"""
+
+import os
+import sys
+import threading
+import time
+
+ZACATEK = time.perf_counter()
+
+# (nazev, kumulativni cas v s, hloubka vnoreni)
+IMPORTY = []
+ZNACKY = []
+
+_stav = threading.local()
+
+
+def _od_spusteni_procesu():
+    """Kolik sekund uběhlo od spuštění procesu (včetně startu interpretu)"""
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            start_ticky = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticky / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - ZACATEK
+
+
+class _MericiLoader:
+    """Obal původního loaderu, který měří dobu provedení modulu"""
+
+    def __init__(self, loader, nazev):
+        self._loader = loader
+        self._nazev = nazev
+
+    def __getattr__(self, jmeno):
+        return getattr(self._loader, jmeno)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, modul):
+        hloubka = getattr(_stav, 'hloubka', 0)
+        _stav.hloubka = hloubka + 1
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(modul)
+        finally:
+            _stav.hloubka = hloubka
+            IMPORTY.append((self._nazev, time.perf_counter() - start, hloubka))
+
+
+class _MericImportu:
+    """Vyhledávač modulů, který loader nalezeného modulu obalí měřením"""
+
+    def find_spec(self, nazev, cesta, cil=None):
+        for hledac in sys.meta_path:
+            if hledac is self or not hasattr(hledac, 'find_spec'):
+                continue
+            spec = hledac.find_spec(nazev, cesta, cil)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _MericiLoader(spec.loader, nazev)
+        return spec
+
+
+def zapni_mereni():
+    """Začne měřit všechny následující importy"""
+    if not any(isinstance(h, _MericImportu) for h in sys.meta_path):
+        sys.meta_path.insert(0, _MericImportu())
+    znacka('start měření')
+
+
+def znacka(nazev):
+    """Zaznamená časový bod od spuštění procesu"""
+    ZNACKY.append((nazev, _od_spusteni_procesu()))
+
+
+def vypis_zpravu(rozpocet_ms=0, pocet=15):
+    """Vypíše nejpomalejší importy, časové značky a porovnání s rozpočtem
+
+    Vrátí True, pokud byl rozpočet studeného startu dodržen.
+    """
+    print("\n" + "=" * 60)
+    print("ZPRÁVA O STUDENÉM STARTU")
+    print("=" * 60)
+
+    hlavni = sorted((i for i in IMPORTY if i[2] == 0), key=lambda i: i[1], reverse=True)
+    celkem = sum(i[1] for i in hlavni)
+
+    print(f"{'kumulativně [ms]':>18} | modul")
+    for nazev, cas, _ in hlavni[:pocet]:
+        print(f"{cas * 1000:>18.1f} | {nazev}")
+    print(f"Importy celkem: {celkem * 1000:.1f} ms ({len(IMPORTY)} modulů)")
+
+    print("")
+    for nazev, cas in ZNACKY:
+        print(f"{cas * 1000:>10.0f} ms  {nazev}")
+
+    # Studený start = doba do začátku načítání dat ze sítě
+    studeny_start = next((cas for nazev, cas in ZNACKY if nazev == 'začátek načítání dat'), None)
+    if studeny_start is None:
+        studeny_start = _od_spusteni_procesu()
+
+    dodrzeno = not rozpocet_ms or studeny_start * 1000 <= rozpocet_ms
+    if rozpocet_ms:
+        stav = "✓ v rozpočtu" if dodrzeno else "✗ PŘEKROČEN rozpočet"
+        print(f"\nStudený start: {studeny_start * 1000:.0f} ms / {rozpocet_ms} ms - {stav}")
+    else:
+        print(f"\nStudený start: {studeny_start * 1000:.0f} ms")
+
+    return dodrzeno
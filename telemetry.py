@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Měření jednotlivých sekcí tisku a export pro monitoring
+PrintMaster - https://github.com/Quertz/printmaster
+
+Každá sekce (stažení zdroje, parsování, vykreslení, zápis do tiskárny)
+se zaznamená jako span s dobou trvání a atributy (bajty, HTTP status,
+zásah cache, chyba). Po dokončení tisku se celý běh zapíše jako jeden
+řádek JSON a volitelně jako textfile pro node_exporter:
+
+    [Telemetry]
+    jsonl = telemetry.jsonl
+    textfile = /var/lib/node_exporter/textfile_collector/printmaster.prom
+
+    printmaster_section_seconds{section="rss"} 0.231
+
+Adresy zdrojů se zapisují jen jako schéma, server a krátký otisk
+(adresa) - tajná adresa kalendáře je přihlašovací údaj.
+
+Vlákna, která mohou přežít konec běhu (obnova snímků na pozadí), se
+spouštějí přes v_behu(); jejich spany po skončení běhu se zahodí,
+místo aby se připsaly k dalšímu běhu.
+"""
+
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+
+_zamek = threading.Lock()
+_spany = []
+_zacatek = None
+# Pořadové číslo běhu - zvýší se na začátku i na konci běhu
+_beh = 0
+_mistni = threading.local()
+
+
+def zacni_beh():
+    """Zahodí spany předchozího běhu a začne měřit nový"""
+    global _zacatek, _beh
+    with _zamek:
+        _spany.clear()
+        _zacatek = time.time()
+        _beh += 1
+
+
+def zaznamenej(sekce, trvani, **atributy):
+    """Přidá hotový span (span vlákna z už ukončeného běhu se zahodí)"""
+    with _zamek:
+        beh = getattr(_mistni, 'beh', None)
+        if beh is not None and beh != _beh:
+            return
+        _spany.append(dict(atributy, sekce=sekce, trvani_s=round(trvani, 6)))
+
+
+def v_behu(funkce):
+    """Obalí funkci pro jiné vlákno tak, aby její spany patřily jen aktuálnímu běhu"""
+    beh = _beh
+
+    @functools.wraps(funkce)
+    def obalena(*args, **kwargs):
+        _mistni.beh = beh
+        try:
+            return funkce(*args, **kwargs)
+        finally:
+            _mistni.beh = None
+    return obalena
+
+
+def adresa(url):
+    """URL bez cesty a parametrů, s otiskem pro rozlišení zdrojů na stejném serveru"""
+    from urllib.parse import urlsplit
+
+    casti = urlsplit(url)
+    otisk = hashlib.sha256(url.encode('utf-8')).hexdigest()[:12]
+    return f"{casti.scheme}://{casti.hostname or ''}#{otisk}"
+
+
+@contextlib.contextmanager
+def span(sekce, **atributy):
+    """Změří blok kódu; do vráceného slovníku lze doplnit další atributy
+
+        with telemetry.span('rss', zdroj=nazev) as s:
+            s['bajty'] = len(data)
+    """
+    start = time.perf_counter()
+    try:
+        yield atributy
+    except BaseException as e:
+        # Chybu mohl doplnit už měřený kód (např. bez adresy v textu výjimky)
+        atributy.setdefault('chyba', f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        zaznamenej(sekce, time.perf_counter() - start, **atributy)
+
+
+def mereno(sekce):
+    """Dekorátor - změří celé volání funkce jako span sekce
+
+    Výsledek None se zaznamená jako chyba (zdroj nevrátil data),
+    u bajtů se zaznamená jejich délka.
+    """
+    def obal(funkce):
+        @functools.wraps(funkce)
+        def merena(*args, **kwargs):
+            with span(sekce) as s:
+                vysledek = funkce(*args, **kwargs)
+                if vysledek is None:
+                    s['chyba'] = 'bez dat'
+                elif isinstance(vysledek, (bytes, bytearray)):
+                    s['bajty'] = len(vysledek)
+                return vysledek
+        return merena
+    return obal
+
+
+def spany():
+    with _zamek:
+        return list(_spany)
+
+
+def souhrn(seznam=None):
+    """Součty po sekcích: {sekce: {'sekundy', 'bajty', 'chyby', 'pocet'}}"""
+    vysledek = {}
+    for s in seznam if seznam is not None else spany():
+        polozka = vysledek.setdefault(s['sekce'], {'sekundy': 0.0, 'bajty': 0, 'chyby': 0, 'pocet': 0})
+        polozka['sekundy'] += s['trvani_s']
+        polozka['bajty'] += s.get('bajty') or 0
+        polozka['chyby'] += 1 if s.get('chyba') else 0
+        polozka['pocet'] += 1
+    return vysledek
+
+
+def _zapis_atomicky(cesta, text):
+    import tempfile
+
+    adresar = os.path.dirname(cesta) or '.'
+    os.makedirs(adresar, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=adresar, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, cesta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _escape(hodnota):
+    return str(hodnota).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus(souhrn_sekci, ok, trvani, cas):
+    """Text ve formátu node_exporter textfile collectoru"""
+    radky = []
+    metriky = [
+        ('printmaster_section_seconds', 'Doba trvani sekce v poslednim behu.', 'sekundy'),
+        ('printmaster_section_bytes', 'Prenesene bajty sekce v poslednim behu.', 'bajty'),
+        ('printmaster_section_errors', 'Pocet chyb sekce v poslednim behu.', 'chyby'),
+    ]
+    for nazev, popis, klic in metriky:
+        radky.append(f"# HELP {nazev} {popis}")
+        radky.append(f"# TYPE {nazev} gauge")
+        for sekce, hodnoty in sorted(souhrn_sekci.items()):
+            radky.append(f'{nazev}{{section="{_escape(sekce)}"}} {hodnoty[klic]:g}')
+    radky += [
+        "# HELP printmaster_run_seconds Doba celeho behu.",
+        "# TYPE printmaster_run_seconds gauge",
+        f"printmaster_run_seconds {trvani:g}",
+        "# HELP printmaster_run_success 1 pokud se tisk povedl.",
+        "# TYPE printmaster_run_success gauge",
+        f"printmaster_run_success {1 if ok else 0}",
+        "# HELP printmaster_run_timestamp_seconds Cas konce posledniho behu.",
+        "# TYPE printmaster_run_timestamp_seconds gauge",
+        f"printmaster_run_timestamp_seconds {cas:.0f}",
+    ]
+    return "\n".join(radky) + "\n"
+
+
+def dokonci_beh(config, ok, **atributy):
+    """Zapíše běh jako řádek JSON a případně textfile pro Prometheus
+
+    Spany se zahodí a běh se uzavře - pozdější spany vláken spuštěných
+    přes v_behu() už se nezapočítají.
+    """
+    global _beh
+    konec = time.time()
+    with _zamek:
+        zacatek = _zacatek or konec
+        seznam = list(_spany)
+        _spany.clear()
+        _beh += 1
+    zaznam = dict(atributy, cas=round(zacatek, 3), trvani_s=round(konec - zacatek, 6),
+                  ok=ok, sekce=souhrn(seznam), spany=seznam)
+
+    jsonl = config.get('Telemetry', 'jsonl', fallback='telemetry.jsonl') if config else None
+    textfile = config.get('Telemetry', 'textfile', fallback='') if config else ''
+    try:
+        if jsonl:
+            with open(jsonl, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(zaznam, ensure_ascii=False, default=str) + '\n')
+        if textfile:
+            _zapis_atomicky(textfile, prometheus(zaznam['sekce'], ok, konec - zacatek, konec))
+    except OSError as e:
+        print(f"Varování: nelze zapsat telemetrii: {e}")
+    return zaznam
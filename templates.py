@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kompilované šablony účtenek s uloženými statickými úseky ESC/POS
+PrintMaster - https://github.com/Quertz/printmaster
+
+Šablona je posloupnost statických částí (hlavička, oddělovače, nadpisy
+sekcí, patička) a pojmenovaných slotů pro denní obsah. Kompilace převede
+statické části na hotové bajty ESC/POS; výsledek se uloží na disk a
+znovu se kompiluje jen při změně vstupů šablony (verze, konfigurace,
+soubory jako logo). Klíč cache se počítá jen z těchto levných vstupů -
+při zásahu cache se šablona vůbec nesestavuje. Denní tisk pak kóduje
+jen obsah slotů.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+import receipt
+
+ADRESAR = os.path.join('cache', 'templates')
+VERZE = 1
+
+
+class Sablona:
+    """Rozvržení účtenky - statické části a sloty
+
+    Položka je ('staticka', Dokument) nebo ('slot', nazev, Dokument nadpisu
+    nebo None). Nadpis slotu se vytiskne jen tehdy, když má slot obsah.
+    """
+
+    def __init__(self, nazev):
+        self.nazev = nazev
+        self.polozky = []
+
+    def staticka(self):
+        """Přidá statickou část a vrátí dokument, do kterého se píše"""
+        dokument = receipt.Dokument()
+        self.polozky.append(('staticka', dokument))
+        return dokument
+
+    def slot(self, nazev, titulek=None):
+        """Přidá slot pro denní obsah, volitelně s tučným nadpisem"""
+        nadpis = None
+        if titulek:
+            nadpis = receipt.Dokument()
+            nadpis.set(align='left', text_type='B')
+            nadpis.text(f"{titulek}\n")
+        self.polozky.append(('slot', nazev, nadpis))
+
+
+def popis_souboru(cesta):
+    """Čas změny a velikost souboru pro klíč cache (prázdný, pokud chybí)"""
+    try:
+        info = os.stat(cesta)
+    except OSError:
+        return ''
+    return f"{cesta}|{info.st_mtime_ns}|{info.st_size}"
+
+
+def otisk(*vstupy):
+    """Otisk vstupů šablony (verze, text konfigurace, popisy souborů)"""
+    h = hashlib.sha256()
+    h.update(f"{VERZE}|{receipt.KODOVANI}|{receipt.KODOVA_STRANKA}".encode('utf-8'))
+    for hodnota in vstupy:
+        h.update(b'\0')
+        h.update(hodnota if isinstance(hodnota, bytes) else str(hodnota).encode('utf-8'))
+    return h.hexdigest()
+
+
+def kompiluj(sablona):
+    """Převede šablonu na seznam hotových bajtů a slotů
+
+    Výsledek obsahuje bytes pro statické části a ('slot', nazev,
+    bajty nadpisu nebo b'') pro sloty. Sousední statické části se spojí.
+    """
+    kompilovana = [receipt.hlavicka()]
+    for polozka in sablona.polozky:
+        if polozka[0] == 'staticka':
+            bajty = receipt.koduj_bloky(polozka[1].bloky)
+            if isinstance(kompilovana[-1], bytes):
+                kompilovana[-1] += bajty
+            else:
+                kompilovana.append(bajty)
+        else:
+            _, nazev, nadpis = polozka
+            kompilovana.append(('slot', nazev, receipt.koduj_bloky(nadpis.bloky) if nadpis else b''))
+    return kompilovana
+
+
+def nacti_nebo_kompiluj(nazev, vyrob, *vstupy):
+    """Vrátí kompilovanou šablonu z disku, nebo ji vyrobí, zkompiluje a uloží
+
+    vyrob() vrací Sablona a volá se jen při chybějící nebo neplatné
+    cache. Cache se invaliduje otiskem vstupů, ze kterých se šablona
+    sestavuje.
+    """
+    klic = otisk(*vstupy)
+    cesta = os.path.join(ADRESAR, f"{nazev}.pickle")
+
+    try:
+        with open(cesta, 'rb') as f:
+            ulozeny_otisk, kompilovana = pickle.load(f)
+        if ulozeny_otisk == klic:
+            return kompilovana
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+        pass
+
+    kompilovana = kompiluj(vyrob())
+
+    os.makedirs(ADRESAR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=ADRESAR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((klic, kompilovana), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cesta)
+    except OSError as e:
+        print(f"Varování: nelze uložit kompilovanou šablonu: {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    return kompilovana
+
+
+def vykresli(kompilovana, sloty):
+    """Složí bajty účtenky z kompilované šablony a obsahu slotů
+
+    Sloty jsou slovník nazev -> Dokument; prázdný nebo chybějící slot
+    se vynechá i s nadpisem. Kódují se jen dokumenty slotů.
+    """
+    useky = []
+    for polozka in kompilovana:
+        if isinstance(polozka, bytes):
+            useky.append(polozka)
+            continue
+        _, nazev, nadpis = polozka
+        dokument = sloty.get(nazev)
+        if dokument is None or not dokument.bloky:
+            continue
+        useky.append(nadpis)
+        useky.extend(receipt.useky_bloku(dokument.bloky))
+    return receipt.spoj(useky)
+
+
+def sestav_dokument(sablona, sloty):
+    """Sestaví z šablony a slotů jeden Dokument (pro testovací tisk)"""
+    dokument = receipt.Dokument()
+    for polozka in sablona.polozky:
+        if polozka[0] == 'staticka':
+            dokument.bloky.extend(polozka[1].bloky)
+            continue
+        _, nazev, nadpis = polozka
+        obsah = sloty.get(nazev)
+        if obsah is None or not obsah.bloky:
+            continue
+        if nadpis is not None:
+            dokument.bloky.extend(nadpis.bloky)
+        dokument.bloky.extend(obsah.bloky)
+    return dokument
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test agendy - slití kalendářů, dotazy na překryv přes intervalový index
+a blok dalších dnů na účtence
+"""
+
+import configparser
+import datetime
+import random
+
+from dateutil import tz
+
+import agenda
+import print_daily
+
+PRAHA = tz.gettz('Europe/Prague')
+NEW_YORK = tz.gettz('America/New_York')
+
+
+def _vyskyt(nazev, zacatek, hodin=1, kalendar='Osobní', celodenni=False):
+    return {'nazev': nazev, 'zacatek': zacatek, 'konec': zacatek + datetime.timedelta(hours=hodin),
+            'celodenni': celodenni, 'cas': None if celodenni else zacatek.time(),
+            'kalendar': kalendar, 'ikona': '*'}
+
+
+def test_prekryv_odpovida_pruchodu_vsemi():
+    nahoda = random.Random(7)
+    zaklad = datetime.datetime(2025, 3, 1, tzinfo=PRAHA)
+    vyskyty = []
+    for i in range(400):
+        zacatek = zaklad + datetime.timedelta(minutes=nahoda.randrange(0, 60 * 24 * 30))
+        # Většinou krátké, občas okamžité nebo vícedenní
+        hodin = nahoda.choice([0, 0.5, 1, 2, 30, 24 * 9])
+        pasmo = nahoda.choice([PRAHA, NEW_YORK, tz.UTC])
+        vyskyty.append(_vyskyt(f"u{i}", zacatek.astimezone(pasmo), hodin))
+
+    index = agenda.Agenda(vyskyty)
+    for _ in range(200):
+        od = zaklad + datetime.timedelta(minutes=nahoda.randrange(-600, 60 * 24 * 31))
+        do = od + datetime.timedelta(minutes=nahoda.choice([1, 60, 60 * 24, 60 * 24 * 7]))
+        ocekavane = sorted(
+            (v for v in vyskyty
+             if v['zacatek'] < do and (v['konec'] > od or v['zacatek'] >= od)),
+            key=lambda v: v['zacatek'])
+        assert [v['nazev'] for v in index.v_okne(od, do)] == [v['nazev'] for v in ocekavane]
+
+    assert index.v_okne(zaklad - datetime.timedelta(days=10), zaklad) == []
+    assert agenda.Agenda().v_okne(zaklad, zaklad + datetime.timedelta(days=1)) == []
+
+
+def test_slouceni_kalendaru_a_vicedenni_udalost():
+    den = datetime.datetime(2025, 3, 10, tzinfo=PRAHA)
+    prace = [_vyskyt("Konference", den - datetime.timedelta(days=1), hodin=24 * 3, kalendar='Práce'),
+             _vyskyt("Porada", den + datetime.timedelta(hours=9), kalendar='Práce')]
+    osobni = [_vyskyt("Snídaně", den + datetime.timedelta(hours=7)),
+              _vyskyt("Porada doma", den + datetime.timedelta(hours=9))]
+    # Noční spoj zadaný v New Yorku přes půlnoc pražského času
+    spoj = _vyskyt("Let", datetime.datetime(2025, 3, 9, 18, 0, tzinfo=NEW_YORK), hodin=8)
+
+    kalendar = agenda.Agenda.z_kalendaru([prace, None, osobni, [spoj]])
+    assert [v['nazev'] for v in kalendar] == ["Konference", "Let", "Snídaně", "Porada", "Porada doma"]
+    assert [v['nazev'] for v in kalendar.den(den.date(), PRAHA)] == \
+        ["Konference", "Let", "Snídaně", "Porada", "Porada doma"]
+    assert [v['nazev'] for v in kalendar.zacinajici_v(den, den + datetime.timedelta(days=1))] == \
+        ["Snídaně", "Porada", "Porada doma"]
+    assert kalendar.dalsi_po(den + datetime.timedelta(hours=8))['nazev'] == "Porada"
+    # Konec v půlnoci do dalšího dne nezasahuje
+    assert [v['nazev'] for v in kalendar.den(datetime.date(2025, 3, 11), PRAHA)] == ["Konference"]
+    assert kalendar.den(datetime.date(2025, 3, 12), PRAHA) == []
+
+
+def test_uctenka_s_vyhledem():
+    config = configparser.ConfigParser()
+    config.read_string("[General]\ndry_run = false\n[Calendars]\nlookahead_days = 2\n[RSS]\n"
+                       "[Printer]\nweather_icon = false\n")
+    print_daily.nacti_nastaveni(config)
+
+    mistni = tz.tzlocal()
+    dnes = datetime.datetime.combine(datetime.date.today(), datetime.time(), mistni)
+    udalosti = agenda.slij([
+        [_vyskyt("Dovolena", dnes - datetime.timedelta(days=2), hodin=24 * 4, celodenni=True),
+         _vyskyt("Nocni smena", dnes - datetime.timedelta(hours=2), hodin=8),
+         _vyskyt("Obed", dnes + datetime.timedelta(hours=12))],
+        [_vyskyt("Zubar", dnes + datetime.timedelta(days=1, hours=10), kalendar='Práce'),
+         _vyskyt("Za tri dny", dnes + datetime.timedelta(days=3, hours=10), kalendar='Práce')],
+    ])
+    sloty = print_daily.sestav_sloty({'pocasi': None, 'udalosti': udalosti, 'zpravy': [], 'horoskop': None})
+
+    dnesni = ''.join(text for druh, _, text in sloty['udalosti'].bloky)
+    assert dnesni.splitlines()[:3] == [
+        "[O]   do 06:00 Nocni smena",
+        "[O]      12:00 Obed",
+        "[O]  celodenni Dovolena",
+    ]
+    vyhled = ''.join(text for druh, _, text in sloty['vyhled'].bloky)
+    assert "(zitra)" in vyhled and "[P]      10:00 Zubar" in vyhled
+    assert "Za tri dny" not in vyhled and "Obed" not in vyhled
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test převodu do kódové stránky CP852 - diakritika a přepis chybějících znaků
+"""
+
+import codepage
+import receipt
+
+
+def test_ceska_diakritika_odpovida_cp852():
+    text = "Příliš žluťoučký kůň úpěl ďábelské ódy. ŘEŠETO Ůl Ťapka 20°C"
+    assert codepage.koduj(text) == text.encode('cp852')
+
+
+def test_prepis_nepodporovanych_znaku():
+    assert codepage.koduj("„Ahoj“ – svět…") == '"Ahoj" - svět...'.encode('cp852')
+    assert codepage.koduj("🏠 Doma") == b" Doma"
+    assert codepage.koduj("Peña 5 €") == b"Pena 5 EUR"
+    assert codepage.koduj("中") == b"?"
+
+
+def test_receipt_pouziva_tabulku():
+    dokument = receipt.Dokument()
+    dokument.text("• Deštník\n")
+    assert b"* De\xe7tn\xa1k\n" in receipt.serializuj(dokument)
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test tisku na více tiskáren - místní TCP socket zastupuje síťovou tiskárnu
+"""
+
+import configparser
+import contextlib
+import os
+import socket
+import tempfile
+import threading
+
+import pytest
+
+import fleet
+import transport
+
+
+class SocketovaTiskarna:
+    """Místní TCP server na náhodném portu, který ukládá přijatá data"""
+
+    def __init__(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.prijato = bytearray()
+        self.vlakno = threading.Thread(target=self._prijimej, daemon=True)
+        self.vlakno.start()
+
+    def _prijimej(self):
+        spojeni, _ = self.server.accept()
+        with spojeni:
+            while True:
+                data = spojeni.recv(65536)
+                if not data:
+                    break
+                self.prijato.extend(data)
+        self.server.close()
+
+
+@contextlib.contextmanager
+def _docasne_profily():
+    """Naměřené profily tiskáren se neukládají do cache v repozitáři"""
+    puvodni = transport.SOUBOR
+    with tempfile.TemporaryDirectory() as adresar:
+        transport.SOUBOR = os.path.join(adresar, 'transport.json')
+        try:
+            yield
+        finally:
+            transport.SOUBOR = puvodni
+
+
+def _volny_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_nacteni_tiskaren_z_konfigurace():
+    config = configparser.ConfigParser()
+    config.read_string("""
+[Printer]
+vendor_id = 0x0416
+product_id = 0x5011
+
+[Printer.kuchyn]
+type = network
+host = 192.168.1.50
+retries = 0
+""")
+    tiskarny = fleet.nacti_tiskarny(config)
+    assert [(t['nazev'], t['typ']) for t in tiskarny] == [('vychozi', 'usb'), ('kuchyn', 'network')]
+    assert tiskarny[1]['port'] == 9100
+    assert tiskarny[1]['pokusy'] == 0
+
+
+def test_tisk_na_vice_tiskaren():
+    dobra = SocketovaTiskarna()
+    tiskarny = [
+        {'nazev': 'dobra', 'typ': 'network', 'host': '127.0.0.1', 'port': dobra.port,
+         'timeout': 5, 'pokusy': 0},
+        {'nazev': 'vypnuta', 'typ': 'network', 'host': '127.0.0.1', 'port': _volny_port(),
+         'timeout': 1, 'pokusy': 1},
+    ]
+    data = bytearray(b'\x1b@' + b'Ahoj\n' * 5000)
+
+    with _docasne_profily(), pytest.MonkeyPatch.context() as mp:
+        mp.setattr(fleet, 'PRODLEVA_OPAKOVANI', 0.01)
+        ulohy = fleet.tiskni_vsude(tiskarny, data)
+
+    assert ulohy['dobra'].ok
+    assert not ulohy['vypnuta'].ok
+    assert ulohy['vypnuta'].pokusu == 2
+
+    dobra.vlakno.join(5)
+    assert bytes(dobra.prijato) == bytes(data)
+
+
+class ZasekleSpojeni:
+    """První zápis visí, dokud spojení nikdo nezavře (nejvýše prodleva[0] s), a pak selže"""
+
+    def __init__(self, prijato, prodleva):
+        self.prijato = prijato
+        self.prodleva = prodleva
+        self.zavreno = threading.Event()
+
+    def _raw(self, data):
+        prodleva, self.prodleva[0] = self.prodleva[0], 0
+        if prodleva:
+            self.zavreno.wait(prodleva)
+            raise OSError("spojení přerušeno")
+        self.prijato.extend(data)
+
+    def close(self):
+        self.zavreno.set()
+
+
+def test_po_limitu_se_uz_netiskne():
+    prijato = bytearray()
+    prodleva = [1.0]
+    tiskarna = {'nazev': 'zasekla', 'timeout': 0.1, 'pokusy': 1}
+
+    with _docasne_profily(), pytest.MonkeyPatch.context() as mp:
+        mp.setattr(fleet, 'PRODLEVA_OPAKOVANI', 0.01)
+        uloha = fleet.tiskni_vsude([tiskarna], b'Ahoj\n', lambda t: ZasekleSpojeni(prijato, prodleva))['zasekla']
+        assert isinstance(uloha.chyba, TimeoutError)
+        # Pracovník po přerušení skončí a úlohu už nezopakuje
+        assert uloha.hotovo.wait(2)
+
+    assert not uloha.ok
+    assert prijato == b''
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test výběru zpráv - duplicity napříč zdroji a už vytištěné titulky
+"""
+
+import os
+import tempfile
+
+import headlines
+
+
+def _zprava(titulek, zdroj):
+    return {'titulek': titulek, 'zdroj': zdroj}
+
+
+def test_podobne_titulky():
+    a = headlines.podpis(headlines.normalizuj("Vláda schválila rozpočet na příští rok"))
+    b = headlines.podpis(headlines.normalizuj("Rozpočet na příští rok vláda schválila"))
+    c = headlines.podpis(headlines.normalizuj("Sparta porazila Slavii v derby"))
+    assert headlines.podobnost(a, b) == 1.0
+    assert headlines.podobnost(a, c) < headlines.PRAH_PODOBNOSTI
+
+
+def test_vyber_bez_duplicit_a_vytistenych():
+    kandidati = [
+        _zprava("Vláda schválila rozpočet na příští rok", "Novinky"),
+        _zprava("Sparta porazila Slavii v derby", "Novinky"),
+        _zprava("Nové metro v Praze: stavba začne v březnu", "Novinky"),
+        _zprava("Rozpočet na příští rok vláda schválila", "ČT24"),
+        _zprava("Silnice D1 bude o víkendu uzavřena", "ČT24"),
+        _zprava("Vláda schválila rozpočet na příští rok", "Seznam"),
+        _zprava("Teploty v zimě klesnou pod nulu", "Seznam"),
+    ]
+
+    with tempfile.TemporaryDirectory() as adresar:
+        cesta = os.path.join(adresar, 'headlines.json')
+        headlines.zaznamenej(cesta, [_zprava("SPARTA porazila Slavii v derby!", "iDnes")])
+
+        vybrane = headlines.vyber(kandidati, 4, vytistene=headlines.Index(cesta))
+        assert [z['titulek'] for z in vybrane] == [
+            "Vláda schválila rozpočet na příští rok",
+            "Nové metro v Praze: stavba začne v březnu",
+            "Silnice D1 bude o víkendu uzavřena",
+            "Teploty v zimě klesnou pod nulu",
+        ]
+
+        # Když nových zpráv není dost, doplní se už vytištěné
+        vybrane = headlines.vyber(kandidati[:2], 4, vytistene=headlines.Index(cesta))
+        assert [z['titulek'] for z in vybrane] == [
+            "Vláda schválila rozpočet na příští rok",
+            "Sparta porazila Slavii v derby",
+        ]
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
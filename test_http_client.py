@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test sdíleného HTTP klienta - keep-alive, opakování, termín a DNS cache
+"""
+
+import http.server
+import threading
+
+import http_client
+
+
+class Obsluha(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.zamek:
+            server.spojeni.add(self.client_address)
+            server.dotazy.append((self.path, self.headers.get('User-Agent')))
+            chyb = server.chyb
+            server.chyb = max(0, chyb - 1)
+        telo = b'chyba' if chyb else b'ok'
+        self.send_response(503 if chyb else 200)
+        self.send_header('Content-Length', str(len(telo)))
+        self.end_headers()
+        self.wfile.write(telo)
+
+
+def _server(chyb=0):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Obsluha)
+    server.daemon_threads = True
+    server.zamek = threading.Lock()
+    server.spojeni = set()
+    server.dotazy = []
+    server.chyb = chyb
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def test_keep_alive_a_user_agent():
+    server, port = _server()
+    try:
+        for i in range(3):
+            response = http_client.get(f"http://localhost:{port}/kalendar{i}.ics")
+            assert response.text == 'ok'
+        # Tři dotazy jedním spojením, host přeložen jednou
+        assert len(server.spojeni) == 1
+        assert [ua for _, ua in server.dotazy] == [http_client.USER_AGENT] * 3
+        assert any(klic[:2] == ('localhost', port) for klic in http_client._dns)
+
+        # DNS cache platí jen pro sdílenou session, ne pro ostatní uživatele urllib3
+        import urllib3
+        from urllib3.util import connection
+        assert connection.create_connection.__module__ == 'urllib3.util.connection'
+        http_client._dns.clear()
+        assert urllib3.PoolManager().request('GET', f"http://localhost:{port}/jiny").status == 200
+        assert http_client._dns == {}
+    finally:
+        http_client.zavri()
+        server.shutdown()
+        server.server_close()
+
+
+def test_opakovani_po_chybe_serveru():
+    server, port = _server(chyb=1)
+    try:
+        response = http_client.get(f"http://127.0.0.1:{port}/feed")
+        assert response.status_code == 200
+        assert len(server.dotazy) == 2
+
+        # Po vyčerpání pokusů se vrátí chybový stav, ne výjimka
+        server.chyb = 10
+        server.dotazy.clear()
+        assert http_client.get(f"http://127.0.0.1:{port}/feed").status_code == 503
+        assert len(server.dotazy) == http_client.POKUSU + 1
+    finally:
+        http_client.zavri()
+        server.shutdown()
+        server.server_close()
+
+
+def test_opakovani_v_terminu():
+    import time
+
+    import requests
+
+    server, port = _server(chyb=10)
+    try:
+        url = f"http://127.0.0.1:{port}/feed"
+        # Do zbývajícího času se vejde jen jeden pokus s timeoutem 5 s
+        stahni = http_client.s_terminem(lambda: http_client.get(url, timeout=5), time.monotonic() + 8)
+        assert stahni().status_code == 503
+        assert len(server.dotazy) == 1
+
+        # Po termínu dotaz hned skončí, bez termínu platí běžná opakování
+        try:
+            http_client.s_terminem(lambda: http_client.get(url), time.monotonic() - 1)()
+            assert False, "očekáváno requests.Timeout"
+        except requests.Timeout:
+            pass
+        assert len(server.dotazy) == 1
+        http_client.get(url)
+        assert len(server.dotazy) == 1 + http_client.POKUSU + 1
+    finally:
+        http_client.zavri()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test proudového čtení iCal kalendářů (bez přístupu k internetu)
+"""
+
+import datetime
+import io
+import os
+import tempfile
+
+from dateutil import tz
+
+import ical_index
+import ical_stream
+
+PRAHA = tz.gettz('Europe/Prague')
+
+KALENDAR = """BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//PrintMaster//test//CS
+BEGIN:VEVENT
+UID:stara@test
+DTSTART:20150101T090000Z
+DTEND:20150101T100000Z
+SUMMARY:Dávno proběhlá schůzka
+END:VEVENT
+BEGIN:VEVENT
+UID:porada@test
+DTSTART;TZID=Europe/Prague:20250106T090000
+DTEND;TZID=Europe/Prague:20250106T093000
+RRULE:FREQ=WEEKLY;BYDAY=MO
+EXDATE;TZID=Europe/Prague:20250113T090000
+SUMMARY:Týdenní porada
+BEGIN:VALARM
+ACTION:DISPLAY
+TRIGGER:-PT10M
+END:VALARM
+END:VEVENT
+BEGIN:VEVENT
+UID:porada@test
+RECURRENCE-ID;TZID=Europe/Prague:20250120T090000
+DTSTART;TZID=Europe/Prague:20250120T140000
+DTEND;TZID=Europe/Prague:20250120T143000
+SUMMARY:Týdenní porada (přesunuto)
+END:VEVENT
+BEGIN:VEVENT
+UID:dovolena@test
+DTSTART;VALUE=DATE:20250112
+DTEND;VALUE=DATE:20250115
+SUMMARY:Dovolená
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def _okno(den, dni=1):
+    od = datetime.datetime.combine(den, datetime.time(), PRAHA)
+    return od, od + datetime.timedelta(days=dni)
+
+
+def _udalosti(den, dni=1):
+    od, do = _okno(den, dni)
+    soubor = io.BytesIO(KALENDAR.replace('\n', '\r\n').encode('utf-8'))
+    return ical_stream.udalosti_v_okne(soubor, od, do, PRAHA)
+
+
+def test_rozvinuti_opakovani():
+    udalosti = _udalosti(datetime.date(2025, 1, 27))
+    assert [u['nazev'] for u in udalosti] == ['Týdenní porada']
+    assert udalosti[0]['zacatek'] == datetime.datetime(2025, 1, 27, 9, 0, tzinfo=PRAHA)
+
+
+def test_exdate_vynecha_vyskyt():
+    udalosti = _udalosti(datetime.date(2025, 1, 13))
+    assert [u['nazev'] for u in udalosti] == ['Dovolená']
+
+
+def test_recurrence_id_nahradi_vyskyt():
+    udalosti = _udalosti(datetime.date(2025, 1, 20))
+    assert [u['nazev'] for u in udalosti] == ['Týdenní porada (přesunuto)']
+    assert udalosti[0]['zacatek'].hour == 14
+
+
+def test_vicedenni_udalost_zasahuje_do_okna():
+    udalosti = _udalosti(datetime.date(2025, 1, 14))
+    assert [u['nazev'] for u in udalosti] == ['Dovolená']
+    assert udalosti[0]['celodenni']
+
+
+def test_predfiltr_preskoci_starou_udalost():
+    blok = ['BEGIN:VEVENT', 'UID:stara@test', 'DTSTART:20150101T090000Z',
+            'DTEND:20150101T100000Z', 'END:VEVENT']
+    assert not ical_stream.muze_zasahnout(blok, *_okno(datetime.date(2025, 1, 6)))
+
+
+def test_zalomene_radky():
+    soubor = io.BytesIO(b"SUMMARY:Dlouh\r\n \xc3\xbd n\xc3\xa1zev\r\nEND:VEVENT\r\n")
+    assert list(ical_stream.rozvin_radky(soubor)) == ['SUMMARY:Dlouhý název', 'END:VEVENT']
+
+
+def test_index_rozvine_jen_zmenene_udalosti():
+    with tempfile.TemporaryDirectory() as adresar:
+        ical_index.ADRESAR = adresar
+        cesta = os.path.join(adresar, 'kalendar.ics')
+        with open(cesta, 'w', encoding='utf-8', newline='\r\n') as f:
+            f.write(KALENDAR)
+
+        od, do = _okno(datetime.date(2025, 1, 13))
+        index = ical_index.IndexKalendare('http://test/kalendar.ics', PRAHA)
+        assert index.aktualizuj(cesta, od, do) == 4
+
+        with open(cesta, 'w', encoding='utf-8', newline='\r\n') as f:
+            f.write(KALENDAR.replace('SUMMARY:Dovolená', 'SUMMARY:Lyže'))
+
+        index = ical_index.IndexKalendare('http://test/kalendar.ics', PRAHA)
+        assert index.aktualizuj(cesta, od, do) == 1
+        assert [u['nazev'] for u in index.v_okne(*_okno(datetime.date(2025, 1, 14)))] == ['Lyže']
+        assert index.dalsi_po(od + datetime.timedelta(days=1))['nazev'] == 'Týdenní porada (přesunuto)'
+        assert [u['nazev'] for u in index.zacinajici_v(od, od + datetime.timedelta(days=15))] == [
+            'Týdenní porada (přesunuto)', 'Týdenní porada'
+        ]
+
+
+def test_index_duplicitni_a_chybejici_uid():
+    kalendar = KALENDAR.replace('END:VCALENDAR\n', """BEGIN:VEVENT
+UID:export@test
+DTSTART;TZID=Europe/Prague:20250113T120000
+SUMMARY:Oběd
+END:VEVENT
+BEGIN:VEVENT
+UID:export@test
+DTSTART;TZID=Europe/Prague:20250113T150000
+SUMMARY:Káva
+END:VEVENT
+BEGIN:VEVENT
+DTSTART;TZID=Europe/Prague:20250113T170000
+SUMMARY:Bez UID 1
+END:VEVENT
+BEGIN:VEVENT
+DTSTART;TZID=Europe/Prague:20250113T180000
+SUMMARY:Bez UID 2
+END:VEVENT
+END:VCALENDAR
+""")
+    with tempfile.TemporaryDirectory() as adresar:
+        ical_index.ADRESAR = adresar
+        cesta = os.path.join(adresar, 'kalendar.ics')
+        with open(cesta, 'w', encoding='utf-8', newline='\r\n') as f:
+            f.write(kalendar)
+
+        od, do = _okno(datetime.date(2025, 1, 13))
+        index = ical_index.IndexKalendare('http://test/duplicity.ics', PRAHA)
+        index.aktualizuj(cesta, od, do)
+        nazvy = ['Dovolená', 'Oběd', 'Káva', 'Bez UID 1', 'Bez UID 2']
+        assert [u['nazev'] for u in index.v_okne(od, do)] == nazvy
+
+        # Nezměněný kalendář se znovu nerozvíjí a nic nezmizí
+        index = ical_index.IndexKalendare('http://test/duplicity.ics', PRAHA)
+        assert index.aktualizuj(cesta, od, do) == 0
+        assert [u['nazev'] for u in index.v_okne(od, do)] == nazvy
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
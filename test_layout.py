@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test zalamování textu podle šířky papíru, fontu a šířky písma
+"""
+
+import layout
+import receipt
+
+
+def test_sloupce_podle_papiru_a_fontu():
+    assert layout.sloupcu('a', 1, 58) == 32
+    assert layout.sloupcu('b', 1, 58) == 42
+    assert layout.sloupcu('a', 2, 80) == 24
+
+
+def test_zalomeni_a_dlouha_slova():
+    text = "Vláda dnes schválila státní rozpočet na příští rok"
+    radky = layout.zalom(text, 32)
+    assert radky == ('Vláda dnes schválila státní', 'rozpočet na příští rok')
+    assert all(layout.delka(radek) <= 32 for radek in layout.zalom("x" * 70 + " konec", 32))
+    assert layout.zalom("a\n\nb", 32) == ('a', '', 'b')
+    # Široké znaky (emoji) zabírají dva sloupce
+    assert layout.delka("🏠 ok") == 5
+
+
+def test_odstavec_s_predponou_a_dvojitou_sirkou():
+    dokument = receipt.Dokument()
+    dokument.odstavec("Porada vedení k rozpočtu na příští rok", predpona="[P]      09:00 ")
+    radky = dokument.bloky[-1][2].splitlines()
+    assert radky[0].startswith("[P]      09:00 Porada")
+    assert all(len(radek) <= 32 for radek in radky)
+    assert radky[1].startswith(" " * 15) and radky[1].strip()
+
+    dokument = receipt.Dokument()
+    dokument.set(width=2)
+    dokument.odstavec("DNESNI PREHLED A NECO NAVIC")
+    assert max(len(radek) for radek in dokument.bloky[-1][2].splitlines()) <= 16
+
+
+def test_odstavec_meri_text_po_prepisu():
+    # Náhrady '…' -> '...' a '€' -> 'EUR' jsou delší než původní znak
+    dokument = receipt.Dokument()
+    dokument.odstavec("Ministr řekl… že rozpočet stoupne… o 5 € za rok…")
+    radky = dokument.bloky[-1][2].splitlines()
+    assert all(len(radek) <= 32 for radek in radky)
+    assert radky[0] == "Ministr řekl... že rozpočet"
+    assert "5 EUR" in radky[1]
+
+    dokument = receipt.Dokument()
+    dokument.odstavec("Cena vstupenky je letos jen 12 €", predpona="🎫 ")
+    radky = dokument.bloky[-1][2].splitlines()
+    assert radky == [" Cena vstupenky je letos jen 12", " EUR"]
+    assert all(len(r) == len(receipt.koduj_text(r)) for r in radky)
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test předběžného načtení - data uložená s předstihem se při tisku vezmou
+ze snímků a nic se nestahuje znovu
+"""
+
+import configparser
+import json
+import os
+import tempfile
+
+import prefetch
+import print_daily
+import snapshots
+
+
+def test_predstih_ulozi_snimky_pro_tisk():
+    puvodni = print_daily.zdroje_dat
+    volano = []
+
+    def zdroj(nazev, hodnota):
+        def nacti():
+            volano.append(nazev)
+            return hodnota
+        return nacti
+
+    with tempfile.TemporaryDirectory() as adresar:
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'General': {'cache_dir': adresar, 'fetch_deadline': '5'},
+            'Weather': {'city': 'Brno'},
+            'Calendars': {},
+            'RSS': {},
+            'Telemetry': {'jsonl': os.path.join(adresar, 'telemetry.jsonl')},
+        })
+        print_daily.nacti_nastaveni(config)
+        print_daily.zdroje_dat = lambda: {
+            'pocasi': zdroj('pocasi', {'teplota': 18}),
+            'udalosti': zdroj('udalosti', [{'nazev': 'Porada'}]),
+            'zpravy': zdroj('zpravy', [{'titulek': 'Zpráva', 'zdroj': 'Test'}]),
+            'horoskop': zdroj('horoskop', None),
+        }
+        try:
+            prefetch.predstih()
+            assert sorted(volano) == ['horoskop', 'pocasi', 'udalosti', 'zpravy']
+
+            # Tisk vezme uložená data; stahuje se jen zdroj, který předem selhal
+            volano.clear()
+            uloziste = snapshots.otevri()
+            data = snapshots.data_pro_tisk(uloziste)
+            uloziste.zavri()
+        finally:
+            print_daily.zdroje_dat = puvodni
+
+        assert volano == ['horoskop']
+        assert data['pocasi'] == {'teplota': 18}
+        assert data['udalosti'] == [{'nazev': 'Porada'}]
+        assert data['zpravy'] == [{'titulek': 'Zpráva', 'zdroj': 'Test'}]
+        assert data['stari'] == {}
+
+        with open(config['Telemetry']['jsonl'], encoding='utf-8') as f:
+            beh, = [json.loads(radek) for radek in f]
+        assert beh['faze'] == 'prefetch' and beh['ok'] is False
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test profilů - společné zdroje se stahují jednou, účtenky se liší jen
+osobními částmi a vykreslují se v pooli procesů
+"""
+
+import configparser
+import datetime
+import threading
+
+from dateutil import tz
+
+import print_daily
+import profiles
+
+KONFIGURACE = """
+[DEFAULT]
+weather_icon = false
+
+[General]
+dry_run = true
+
+[Weather]
+api_key = klic
+city = Prague
+country_code = CZ
+location_brno = Brno|Brno,CZ
+
+[Personal]
+zodiac_sign = leo
+
+[Calendars]
+calendar_1 = Rodina|R|http://kalendar/rodina.ics
+
+[RSS]
+
+[Printer]
+
+[Profile.jana]
+zodiac_sign = virgo
+location = brno
+light_top = tílko
+
+[Profile.petr]
+calendar_1 = Práce|P|http://kalendar/prace.ics
+calendar_2 = Rodina|R|http://kalendar/rodina.ics
+
+[Profile.eva]
+zodiac_sign = virgo
+location = brno
+"""
+
+
+class _Pocasi:
+
+    def __init__(self, volani):
+        self.volani = volani
+
+    def ziskej(self, mista):
+        self.volani.append(('pocasi', sorted(misto.klic for misto in mista)))
+        return {misto.klic: {'teplota': 25, 'pocit': 25, 'popis': misto.nazev, 'vlhkost': 50,
+                             'vitr': 5, 'dest': False, 'snih': False, 'oblacnost': 100}
+                for misto in mista}
+
+
+def _priprav(volani):
+    config = configparser.ConfigParser()
+    config.read_string(KONFIGURACE)
+    print_daily.nacti_nastaveni(config)
+    zamek = threading.Lock()
+
+    def zaznamenej(*volani_zdroje):
+        with zamek:
+            volani.append(volani_zdroje)
+
+    def horoskop(zverokruh):
+        zaznamenej('horoskop', zverokruh)
+        return {'popis': f"Horoskop pro {zverokruh}", 'stesti': '7', 'barva': 'modrá', 'nalada': '?'}
+
+    def kalendar(kalendar, dnes):
+        zaznamenej('kalendar', kalendar['url'])
+        zacatek = datetime.datetime.combine(dnes, datetime.time(), tz.tzlocal())
+        return [{'zacatek': zacatek, 'konec': zacatek + datetime.timedelta(days=1), 'celodenni': True,
+                 'cas': None, 'nazev': f"Událost {kalendar['nazev']}",
+                 'kalendar': kalendar['nazev'], 'ikona': kalendar['ikona']}]
+
+    def zpravy(max_zprav):
+        zaznamenej('zpravy')
+        return [{'titulek': 'Společná zpráva', 'zdroj': 'Test'}]
+
+    return {'get_horoskop': horoskop, 'nacti_kalendar': kalendar, 'get_rss_news': zpravy,
+            'sluzba_pocasi': lambda: _Pocasi(volani)}
+
+
+def _s_nahradami(nahrady, funkce):
+    puvodni = {nazev: getattr(print_daily, nazev) for nazev in nahrady}
+    for nazev, hodnota in nahrady.items():
+        setattr(print_daily, nazev, hodnota)
+    try:
+        return funkce()
+    finally:
+        for nazev, hodnota in puvodni.items():
+            setattr(print_daily, nazev, hodnota)
+
+
+def test_spolecne_zdroje_jednou():
+    volani = []
+    nahrady = _priprav(volani)
+    profily = profiles.nacti_profily(print_daily.CONFIG)
+    spolecna = _s_nahradami(nahrady, lambda: profiles.ziskej_spolecna(profily))
+
+    assert [p['nazev'] for p in profily] == ['jana', 'petr', 'eva']
+    assert sorted(map(str, volani)) == sorted(map(str, [
+        ('pocasi', ['brno,cz', 'prague,cz']),
+        ('zpravy',),
+        ('horoskop', 'leo'), ('horoskop', 'virgo'),
+        ('kalendar', 'http://kalendar/prace.ics'), ('kalendar', 'http://kalendar/rodina.ics'),
+    ]))
+
+    jana = profiles.data_profilu(profily[0], spolecna)
+    petr = profiles.data_profilu(profily[1], spolecna)
+    assert jana['pocasi']['popis'] == 'Brno'
+    assert petr['pocasi']['popis'] == 'vychozi'
+    assert [u['nazev'] for u in jana['udalosti']] == ['Událost Rodina']
+    assert [u['nazev'] for u in petr['udalosti']] == ['Událost Práce', 'Událost Rodina']
+    assert profily[0]['satnik']['vrchní']['lehké'] == ['tílko']
+    assert profily[1]['satnik']['vrchní']['lehké'] == ['tričko']
+
+
+def test_vykresleni_v_pooli_procesu():
+    volani = []
+    nahrady = _priprav(volani)
+    profily = profiles.nacti_profily(print_daily.CONFIG)
+    spolecna = _s_nahradami(nahrady, lambda: profiles.ziskej_spolecna(profily))
+
+    texty = profiles.vykresli_vse(profily, spolecna, procesu=2)
+    assert len(texty) == 3
+    # Procesy poolu vidí i sekci DEFAULT (ikona počasí je vypnutá)
+    assert not any('[ikona' in text.lower() for text in texty)
+    # Fork by zdědil zámky držené vlákny stahování, která ještě běží
+    assert profiles._kontext_procesu().get_start_method() != 'fork'
+    assert 'HOROSKOP (PANNA)' in texty[0] and 'Horoskop pro virgo' in texty[0]
+    assert 'HOROSKOP (LEV)' in texty[1] and 'Událost Práce' in texty[1]
+    assert 'tílko' in texty[0] and 'tílko' not in texty[1]
+
+    # V jednom procesu se znamení a šatník po vykreslení profilů vrátí
+    satnik = print_daily.SATNIK
+    assert profiles.vykresli_vse(profily, spolecna, procesu=1) != []
+    assert print_daily.ZVEROKRUH == 'leo'
+    assert print_daily.SATNIK is satnik
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
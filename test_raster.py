@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test rastrových obrázků - kódování GS v 0, shoda NumPy a záložní cesty,
+cache zakódovaných obrázků a obrázek v dokumentu účtenky
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+
+from PIL import Image
+
+import raster
+import receipt
+
+
+@contextlib.contextmanager
+def _docasna_cache():
+    puvodni = raster.ADRESAR
+    with tempfile.TemporaryDirectory() as adresar:
+        raster.ADRESAR = adresar
+        raster._pamet.clear()
+        try:
+            yield adresar
+        finally:
+            raster.ADRESAR = puvodni
+            raster._pamet.clear()
+
+
+@contextlib.contextmanager
+def _bez_numpy():
+    puvodni = raster._numpy
+    raster._numpy = lambda: None
+    try:
+        yield
+    finally:
+        raster._numpy = puvodni
+
+
+def test_gs_v0_a_bity():
+    # Černý čtverec 4x2 vlevo nahoře v bílém obrázku 10x3
+    obraz = Image.new('L', (10, 3), 255)
+    obraz.paste(0, (0, 0, 4, 2))
+    data = raster.zakoduj(obraz, rezim='threshold')
+    assert data == raster.GS_V0 + bytes([0, 2, 0, 3, 0]) + bytes([0xF0, 0, 0xF0, 0, 0, 0])
+
+    # Vysoký obrázek se dělí na pásy, široký se zmenší na šířku hlavy
+    vysoky = raster.zakoduj(Image.new('L', (8, raster.VYSKA_PASU + 1), 0), rezim='threshold')
+    assert vysoky.count(raster.GS_V0) == 2
+    siroky = raster.zakoduj(Image.new('RGB', (1000, 100), 'white'))
+    assert siroky[4:6] == bytes([raster.bodu() // 8, 0])
+
+
+def test_numpy_a_zalozni_cesta_davaji_stejny_rastr():
+    obraz = Image.linear_gradient('L').resize((300, 120)).rotate(20, fillcolor=255)
+    pruhledny = Image.new('RGBA', (50, 20), (0, 0, 0, 0))
+    for rezim in raster.REZIMY:
+        s_numpy = raster.zakoduj(obraz, rezim=rezim)
+        with _bez_numpy():
+            assert raster.zakoduj(obraz, rezim=rezim) == s_numpy, rezim
+        # Průhlednost je bílé pozadí - nic se netiskne
+        assert set(raster.zakoduj(pruhledny, rezim=rezim)[8:]) == {0}
+
+    try:
+        raster.zakoduj(obraz, rezim='halftone')
+        assert False, "očekávána ValueError"
+    except ValueError:
+        pass
+
+
+def test_cache_zakodovanych_obrazku():
+    with _docasna_cache() as adresar:
+        soubor = io.BytesIO()
+        Image.new('L', (64, 64), 100).save(soubor, 'PNG')
+        logo = os.path.join(adresar, 'logo.png')
+        with open(logo, 'wb') as f:
+            f.write(soubor.getvalue())
+
+        data = raster.rastr(logo, rezim='bayer')
+        assert raster.rastr(soubor.getvalue(), rezim='bayer') is data
+        assert len([n for n in os.listdir(adresar) if n.endswith('.bin')]) == 1
+
+        # Po restartu (prázdná paměť) se obrázek načte z disku, nic se nekreslí
+        raster._pamet.clear()
+        kresleno = []
+        puvodni = raster.nakresli_ikonu
+        raster.nakresli_ikonu = lambda *a: kresleno.append(a) or puvodni(*a)
+        try:
+            pocasi = {'ikona': '10d', 'dest': True, 'snih': False, 'oblacnost': 90}
+            prvni = raster.ikona_pocasi(pocasi)
+            raster._pamet.clear()
+            assert raster.ikona_pocasi(pocasi) == prvni
+        finally:
+            raster.nakresli_ikonu = puvodni
+        assert kresleno == [('dest', raster.IKONA)]
+
+        # Jiná šířka nebo režim je jiný obrázek
+        assert raster.rastr(logo, sirka=32, rezim='bayer') != data
+        assert raster.rastr(logo, rezim='threshold') != data
+
+        odkaz = 'https://calendar.google.com/calendar/u/0/r'
+        assert raster.qr(odkaz, sirka=96) != raster.qr(odkaz, sirka=192)
+        assert raster.qr(odkaz, sirka=96) == raster.qr(odkaz, sirka=96)
+
+
+def test_pamet_obrazku_je_omezena():
+    with _docasna_cache():
+        nejstarsi = raster.ikona_pocasi({'ikona': '01d'})
+        for sirka in range(8, 8 + raster.MAX_PAMET + 4):
+            raster.ikona_pocasi({'ikona': '02d'}, sirka=sirka)
+            # Často používaný obrázek v paměti zůstane
+            assert raster.ikona_pocasi({'ikona': '01d'}) is nejstarsi
+        assert len(raster._pamet) == raster.MAX_PAMET
+
+
+def test_druh_ikony():
+    assert raster.druh_ikony({'ikona': '13n'}) == 'snih'
+    assert raster.druh_ikony({'dest': True, 'oblacnost': 100}) == 'dest'
+    assert raster.druh_ikony({'dest': False, 'snih': False, 'oblacnost': 40}) == 'polojasno'
+    assert raster.druh_ikony({'oblacnost': 0}) == 'jasno'
+
+
+def test_obrazek_v_dokumentu():
+    with _docasna_cache():
+        ikona = raster.ikona_pocasi({'oblacnost': 0})
+
+        dokument = receipt.Dokument()
+        dokument.text("Pocasi\n")
+        dokument.set(align='center')
+        dokument.obrazek(ikona, "ikona: jasno")
+        dokument.set(align='left')
+        dokument.text("Teplota 20\n")
+
+        data = bytes(receipt.serializuj(dokument))
+        zacatek = data.index(ikona)
+        # Obrázek je vycentrovaný a nekóduje se jako text
+        assert data[zacatek - 3:zacatek] == b'\x1ba\x01'
+        assert data.endswith(b'\x1ba\x00Teplota 20\n')
+
+        class Zaznam:
+            def __init__(self):
+                self.texty = []
+
+            def set(self, **kwargs):
+                pass
+
+            def text(self, text):
+                self.texty.append(text)
+
+            def cut(self):
+                pass
+
+        zaznam = Zaznam()
+        dokument.prehraj(zaznam)
+        assert zaznam.texty == ["Pocasi\n", "[ikona: jasno]\n", "Teplota 20\n"]
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
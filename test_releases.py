@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test verzovaných instalací - rozbalení s předkompilací, atomické
+přepnutí odkazu current, spouštěče, návrat a úklid starých verzí
+"""
+
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+import releases
+
+
+@contextlib.contextmanager
+def _instalace():
+    """Dočasná instalace bez verzí s moduly v kořeni"""
+    puvodni = os.getcwd()
+    with tempfile.TemporaryDirectory() as adresar:
+        os.chdir(adresar)
+        try:
+            for nazev in releases.SPOUSTECE:
+                with open(nazev, 'w', encoding='utf-8') as f:
+                    f.write('import verze\nprint("puvodni", verze.VERZE)\n')
+            with open('verze.py', 'w', encoding='utf-8') as f:
+                f.write('VERZE = "1.0.0"\n')
+            os.makedirs('backup_20250101_070000')
+            yield adresar
+        finally:
+            os.chdir(puvodni)
+
+
+def _archiv(verze):
+    """ZIP vydání jako z GitHubu - vše v jednom adresáři"""
+    cesta = f"printmaster-{verze}.zip"
+    with zipfile.ZipFile(cesta, 'w') as archiv:
+        for nazev in releases.SPOUSTECE:
+            archiv.writestr(f"Quertz-printmaster-abc/{nazev}", 'import verze\nprint("verze", verze.VERZE)\n')
+        archiv.writestr("Quertz-printmaster-abc/verze.py", f'VERZE = "{verze}"\n')
+    return cesta
+
+
+def _spust():
+    vystup = subprocess.run([sys.executable, 'runme.py'], capture_output=True, text=True, check=True)
+    return vystup.stdout.strip()
+
+
+def test_aktualizace_navrat_a_uklid():
+    with _instalace():
+        assert releases.prevezmi_puvodni('1.0.0')
+        assert releases.aktivni() == '1.0.0'
+        assert not releases.prevezmi_puvodni('1.0.0')
+
+        cesta = releases.rozbal(_archiv('1.1.0'), '1.1.0')
+        # Předkompilováno - první spuštění nic nekompiluje
+        assert any(n.startswith('verze.') and n.endswith('.pyc')
+                   for n in os.listdir(os.path.join(cesta, '__pycache__')))
+        assert releases.aktivni() == '1.0.0'
+
+        releases.aktivuj('1.1.0')
+        assert (releases.aktivni(), releases.predchozi()) == ('1.1.0', '1.0.0')
+        assert os.readlink(releases.AKTIVNI) == os.path.join(releases.ADRESAR_VERZI, '1.1.0')
+        with open('runme.py', encoding='utf-8') as f:
+            assert f.read() == releases.SPOUSTEC
+        assert _spust() == 'verze 1.1.0'
+
+        # Návrat je jediné přejmenování previous -> current
+        assert releases.vrat_zpet() == '1.0.0'
+        assert not os.path.lexists(releases.PREDCHOZI)
+        assert _spust() == 'puvodni 1.0.0'
+        assert releases.vrat_zpet() is None
+
+        for verze in ('1.2.0', '1.3.0', '1.4.0'):
+            releases.rozbal(_archiv(verze), verze)
+            releases.aktivuj(verze)
+        assert _spust() == 'verze 1.4.0'
+
+        assert sorted(releases.ukliz(ponechat=2)) == ['1.0.0', '1.1.0', '1.2.0']
+        assert sorted(os.listdir(releases.ADRESAR_VERZI)) == ['1.3.0', '1.4.0']
+        assert not os.path.exists('backup_20250101_070000')
+
+
+def test_vadne_vydani_nezmeni_aktivni_verzi():
+    with _instalace():
+        releases.prevezmi_puvodni('1.0.0')
+        with zipfile.ZipFile('vadne.zip', 'w') as archiv:
+            archiv.writestr("repo/runme.py", 'print("nedokonceno"\n')
+        try:
+            releases.rozbal('vadne.zip', '2.0.0')
+            assert False, "očekávána ValueError"
+        except ValueError:
+            pass
+        assert releases.aktivni() == '1.0.0'
+        assert os.listdir(releases.ADRESAR_VERZI) == ['1.0.0']
+
+        # Aktivní verzi nelze přepsat stejnojmenným vydáním
+        try:
+            releases.rozbal(_archiv('1.0.0'), '1.0.0')
+            assert False, "očekávána ValueError"
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -4,9 +4,10 @@
 Test RSS čtečky - s vylepšenou podporou hlaviček a redirectů
 """
 
-import requests
 import feedparser
 
+import http_client
+
 # Testovací RSS zdroje - výchozí zdroje v aplikaci
 RSS_ZDROJE = [
     {'nazev': 'Novinky.cz', 'url': 'https://www.novinky.cz/rss'},
@@ -16,22 +17,17 @@ RSS_ZDROJE = [
 ]
 
 def test_rss_reader():
-    """Otestuje RSS čtečku s použitím requests a hlaviček"""
+    """Otestuje RSS čtečku přes sdílený HTTP klient (jeho User-Agent)"""
     print("="*60)
     print("TEST RSS ČTEČKY - OPRAVENÁ VERZE")
     print("="*60)
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-
     for zdroj in RSS_ZDROJE:
         print(f"\nTestuji: {zdroj['nazev']}")
         print(f"URL: {zdroj['url']}")
 
         try:
-            # Použití requests s hlavičkami
-            response = requests.get(zdroj['url'], headers=headers, timeout=10, allow_redirects=True)
+            response = http_client.get(zdroj['url'], timeout=10, allow_redirects=True)
 
             print(f"  HTTP Status: {response.status_code}")
 
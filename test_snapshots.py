@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test úložiště snímků - čerstvá data se nestahují, zastaralá se tisknou hned
+a obnovují na pozadí, chybějící se stahují s běžným limitem
+"""
+
+import configparser
+import os
+import tempfile
+import threading
+import time
+
+import print_daily
+import snapshots
+
+
+def test_stale_while_revalidate():
+    puvodni = print_daily.zdroje_dat
+    pomale_pocasi = threading.Event()
+    volano = []
+
+    def pocasi():
+        volano.append('pocasi')
+        pomale_pocasi.wait(5)
+        return {'teplota': 20}
+
+    def zpravy():
+        volano.append('zpravy')
+        return ['nové zprávy']
+
+    def horoskop():
+        volano.append('horoskop')
+        return {'popis': 'nový'}
+
+    with tempfile.TemporaryDirectory() as adresar:
+        print_daily.CACHE_DIR = adresar
+        print_daily.LIMIT_NACITANI = 5
+        print_daily.CONFIG = configparser.ConfigParser()
+        print_daily.CONFIG.read_string("[Snapshots]\nrefresh_deadline = 0.2\n"
+                                       "weather_ttl = 1\nnews_ttl = 5\n")
+        print_daily.zdroje_dat = lambda: {'pocasi': pocasi, 'udalosti': lambda: [],
+                                          'zpravy': zpravy, 'horoskop': horoskop}
+        try:
+            uloziste = snapshots.Uloziste(os.path.join(adresar, 'snimky.sqlite3'))
+            ted = time.time()
+            uloziste.uloz('pocasi', {'teplota': 15}, ted - 120)
+            uloziste.uloz('udalosti', ['události'], ted - 60)
+            uloziste.uloz('zpravy', ['staré zprávy'], ted - 400)
+
+            start = time.monotonic()
+            data = snapshots.data_pro_tisk(uloziste)
+            trvani = time.monotonic() - start
+
+            # Čerstvé události se nestahují, chybějící horoskop ano
+            assert sorted(volano) == ['horoskop', 'pocasi', 'zpravy']
+            assert data['udalosti'] == ['události']
+            assert data['zpravy'] == ['nové zprávy']
+            assert data['horoskop'] == {'popis': 'nový'}
+
+            # Pomalé počasí se vytiskne ze snímku i se stářím
+            assert trvani < 2
+            assert data['pocasi'] == {'teplota': 15}
+            assert list(data['stari']) == ['pocasi']
+            assert 110 < data['stari']['pocasi'] < 130
+
+            # Obnova na pozadí doběhne a uloží nový snímek
+            pomale_pocasi.set()
+            konec = time.monotonic() + 5
+            while uloziste.nacti('pocasi')[1] != {'teplota': 20} and time.monotonic() < konec:
+                time.sleep(0.02)
+            assert uloziste.nacti('pocasi')[1] == {'teplota': 20}
+            uloziste.zavri()
+        finally:
+            print_daily.zdroje_dat = puvodni
+            pomale_pocasi.set()
+
+
+def test_denni_zdroje_neplati_druhy_den():
+    print_daily.CONFIG = configparser.ConfigParser()
+    ted = time.time()
+    vcera = ted - 24 * 3600
+    assert snapshots.stav('udalosti', vcera, ted) == 'nepouzitelny'
+    assert snapshots.stav('pocasi', ted - 3600, ted) == 'zastaraly'
+    assert snapshots.stav('pocasi', ted - 60, ted) == 'cerstvy'
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
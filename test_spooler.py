@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test spooleru - perzistentní fronta, opakování, úloha po limitu, zařazení
+úlohy přes socket a telemetrie za každou úlohu
+"""
+
+import configparser
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+import spooler
+
+
+class PametovaTiskarna:
+    """Zachytává data; prvních chyb[0] zápisů selže"""
+
+    otevreni = 0
+
+    def __init__(self, tiskarna, prijato, chyb):
+        PametovaTiskarna.otevreni += 1
+        self.prijato = prijato
+        self.chyb = chyb
+
+    def _raw(self, data):
+        if self.chyb[0] > 0:
+            self.chyb[0] -= 1
+            raise OSError("papír došel")
+        self.prijato.extend(data)
+
+    def close(self):
+        pass
+
+
+class ZasekleTiskarna:
+    """První zápis visí prodleva[0] sekund; zavření spojení jej přeruší (je-li prerusitelna)"""
+
+    def __init__(self, prijato, prodleva, prerusitelna):
+        self.prijato = prijato
+        self.prodleva = prodleva
+        self.prerusitelna = prerusitelna
+        self.zavreno = threading.Event()
+
+    def _raw(self, data):
+        prodleva, self.prodleva[0] = self.prodleva[0], 0
+        if prodleva and self.zavreno.wait(prodleva) and self.prerusitelna:
+            raise OSError("spojení zavřeno")
+        self.prijato.extend(data)
+
+    def close(self):
+        self.zavreno.set()
+
+
+class ViseciTiskarna:
+    """Zápis visí, dokud test nenastaví uvolni - zavření spojení nepomůže"""
+
+    def __init__(self, uvolni):
+        self.uvolni = uvolni
+
+    def _raw(self, data):
+        self.uvolni.wait(5)
+
+    def close(self):
+        pass
+
+
+def test_fronta_prezije_restart_a_odklada_pokusy():
+    with tempfile.TemporaryDirectory() as adresar:
+        fronta = spooler.Fronta(adresar)
+        id_ulohy = fronta.pridej('text', text='Ahoj')
+
+        # Nová instance (restart démona) vidí stejnou úlohu
+        uloha = spooler.Fronta(adresar).cekajici()[0]
+        assert uloha['id'] == id_ulohy
+
+        fronta.odloz(uloha, "chyba")
+        uloha = fronta.cekajici()[0]
+        assert uloha['pokusy'] == 1
+        assert uloha['dalsi_pokus'] > time.time()
+
+        for _ in range(spooler.MAX_POKUSU):
+            fronta.odloz(uloha, "chyba")
+        assert fronta.cekajici() == []
+        assert os.listdir(os.path.join(adresar, 'failed')) == [id_ulohy + '.json']
+
+
+def test_uloha_pres_socket_s_opakovanim():
+    with tempfile.TemporaryDirectory() as adresar:
+        prijato = bytearray()
+        chyb = [1]
+        PametovaTiskarna.otevreni = 0
+
+        spooler.ZAKLADNI_PRODLEVA = 0.05
+        fronta = spooler.Fronta(adresar)
+        tiskarny = [{'nazev': 'test', 'timeout': 1, 'pokusy': 0}]
+        sp = spooler.Spooler(fronta, tiskarny,
+                             otevri_tiskarnu=lambda t: PametovaTiskarna(t, prijato, chyb))
+        cesta = os.path.join(adresar, 'test.sock')
+        server = spooler.spust_server(cesta, fronta)
+        vlakno = threading.Thread(target=sp.bez, daemon=True)
+        vlakno.start()
+
+        try:
+            odpoved = spooler.odesli_ulohu({'typ': 'text', 'text': 'Prvni'}, cesta)
+            assert odpoved['ok'] and odpoved['id']
+
+            konec = time.monotonic() + 5
+            while b'Prvni' not in prijato and time.monotonic() < konec:
+                time.sleep(0.02)
+            assert b'Prvni' in prijato
+
+            spooler.odesli_ulohu({'typ': 'text', 'text': 'Druha'}, cesta)
+            while b'Druha' not in prijato and time.monotonic() < konec:
+                time.sleep(0.02)
+            assert b'Druha' in prijato
+
+            # Po chybě se spojení otevřelo znovu, pak zůstalo otevřené
+            assert PametovaTiskarna.otevreni == 2
+            while fronta.cekajici() and time.monotonic() < konec:
+                time.sleep(0.02)
+            assert spooler.odesli_ulohu({'typ': 'stav'}, cesta) == {'ok': True, 'cekajici': 0, 'odhad_ms': 0}
+        finally:
+            sp.zastav()
+            server.shutdown()
+            vlakno.join(5)
+
+
+def test_uloha_po_limitu_se_nevytiskne_dvakrat():
+    for prerusitelna in (True, False):
+        with tempfile.TemporaryDirectory() as adresar:
+            prijato = bytearray()
+            prodleva = [1.5]
+            fronta = spooler.Fronta(adresar)
+            tiskarny = [{'nazev': 'test', 'timeout': 0.2, 'pokusy': 0}]
+            sp = spooler.Spooler(fronta, tiskarny,
+                                 otevri_tiskarnu=lambda t: ZasekleTiskarna(prijato, prodleva, prerusitelna))
+            try:
+                fronta.pridej('text', text='Ahoj')
+                sp.zpracuj(fronta.cekajici()[0])
+                if prerusitelna:
+                    # Přerušený pokus skončil dřív, než se úloha odložila - opakování ji vytiskne jednou
+                    uloha, = fronta.cekajici()
+                    assert uloha['zbyva'] == ['test'] and prijato == b''
+                    sp.zpracuj(uloha)
+                # Pokus, který po limitu ještě doběhl, se počítá jako vytištěný
+                assert fronta.cekajici() == []
+                assert prijato.count(b'Ahoj') == 1
+            finally:
+                sp.zastav()
+
+
+def test_nedobehle_pokusy_vyrazene_ulohy_se_zahodi():
+    with tempfile.TemporaryDirectory() as adresar, pytest.MonkeyPatch.context() as mp:
+        mp.setattr(spooler, 'MAX_POKUSU', 1)
+        mp.setattr(spooler, 'DOBEH_PO_PRERUSENI', 0)
+        uvolni = threading.Event()
+        fronta = spooler.Fronta(adresar)
+        tiskarny = [{'nazev': 'test', 'timeout': 0.1, 'pokusy': 0}]
+        sp = spooler.Spooler(fronta, tiskarny, otevri_tiskarnu=lambda t: ViseciTiskarna(uvolni))
+        try:
+            id_ulohy = fronta.pridej('text', text='Ahoj')
+            # Pokus po limitu ještě běží, úloha ale skončila mezi chybnými
+            assert sp.zpracuj(fronta.cekajici()[0]) is False
+            assert fronta.cekajici() == []
+            assert os.path.exists(os.path.join(adresar, 'failed', id_ulohy + '.json'))
+            assert sp.nedobehle == {}
+        finally:
+            uvolni.set()
+            sp.zastav()
+
+
+def test_kazda_uloha_je_beh_telemetrie():
+    with tempfile.TemporaryDirectory() as adresar, pytest.MonkeyPatch.context() as mp:
+        mp.setattr(spooler, 'ZAKLADNI_PRODLEVA', 0.05)
+        config = configparser.ConfigParser()
+        config['Telemetry'] = {'jsonl': os.path.join(adresar, 'telemetry.jsonl')}
+        prijato = bytearray()
+        chyb = [1]
+        fronta = spooler.Fronta(adresar)
+        tiskarny = [{'nazev': 'test', 'timeout': 1, 'pokusy': 0}]
+        sp = spooler.Spooler(fronta, tiskarny, config=config,
+                             otevri_tiskarnu=lambda t: PametovaTiskarna(t, prijato, chyb))
+        prvni = fronta.pridej('text', text='Prvni')
+        druha = fronta.pridej('text', text='Druha')
+        vlakno = threading.Thread(target=sp.bez, daemon=True)
+        vlakno.start()
+        try:
+            konec = time.monotonic() + 5
+            while fronta.cekajici() and time.monotonic() < konec:
+                time.sleep(0.02)
+        finally:
+            sp.zastav()
+            vlakno.join(5)
+
+        with open(config['Telemetry']['jsonl'], encoding='utf-8') as f:
+            behy = [json.loads(radek) for radek in f]
+        # První zápis selže - první úloha má dva běhy (neúspěšný a úspěšný)
+        assert sorted((b['uloha'], b['pokus'], b['ok']) for b in behy) == [
+            (prvni, 1, False), (prvni, 2, True), (druha, 1, True)]
+        assert all(b['faze'] == 'spooler' and b['sekce']['printer']['pocet'] == 1 for b in behy)
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
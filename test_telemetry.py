@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test měření sekcí a exportu telemetrie (JSON lines, Prometheus textfile)
+"""
+
+import configparser
+import json
+import os
+import tempfile
+
+import telemetry
+
+
+def test_spany_a_souhrn():
+    telemetry.zacni_beh()
+    with telemetry.span('rss', zdroj='Novinky') as s:
+        s['bajty'] = 1200
+    try:
+        with telemetry.span('rss', zdroj='ČT24'):
+            raise OSError("timeout")
+    except OSError:
+        pass
+
+    @telemetry.mereno('weather')
+    def bez_dat():
+        return None
+
+    bez_dat()
+    souhrn = telemetry.souhrn()
+    assert souhrn['rss']['pocet'] == 2
+    assert souhrn['rss']['bajty'] == 1200
+    assert souhrn['rss']['chyby'] == 1
+    assert souhrn['weather']['chyby'] == 1
+    assert [s['sekce'] for s in telemetry.spany()] == ['rss', 'rss', 'weather']
+
+
+def test_tajna_adresa_se_nezapise():
+    import socket
+
+    import http_cache
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    tajna = f"http://127.0.0.1:{port}/calendar/ical/private-abc123/basic.ics"
+
+    telemetry.zacni_beh()
+    try:
+        http_cache.stahni(tajna, timeout=1)
+    except Exception:
+        pass
+    span, = telemetry.spany()
+    assert span['url'] == telemetry.adresa(tajna)
+    assert span['url'].startswith('http://127.0.0.1#')
+    assert 'private-abc123' not in json.dumps(span)
+    assert telemetry.adresa(tajna) != telemetry.adresa(tajna.replace('abc', 'xyz'))
+
+
+def test_span_vlakna_po_konci_behu_se_zahodi():
+    import threading
+
+    uvolni = threading.Event()
+
+    def obnova():
+        uvolni.wait(5)
+        telemetry.zaznamenej('rss', 0.5, zdroj='pozde')
+
+    telemetry.zacni_beh()
+    vlakno = threading.Thread(target=telemetry.v_behu(obnova))
+    vlakno.start()
+    telemetry.zaznamenej('render', 0.01)
+    zaznam = telemetry.dokonci_beh(None, True)
+    assert [s['sekce'] for s in zaznam['spany']] == ['render']
+
+    telemetry.zacni_beh()
+    uvolni.set()
+    vlakno.join(5)
+    assert telemetry.spany() == []
+
+
+def test_prometheus_format():
+    text = telemetry.prometheus({'rss': {'sekundy': 0.25, 'bajty': 1200, 'chyby': 0, 'pocet': 2}},
+                                True, 1.5, 1700000000)
+    assert '# TYPE printmaster_section_seconds gauge' in text
+    assert 'printmaster_section_seconds{section="rss"} 0.25\n' in text
+    assert 'printmaster_section_bytes{section="rss"} 1200\n' in text
+    assert 'printmaster_run_success 1\n' in text
+    assert text.endswith('printmaster_run_timestamp_seconds 1700000000\n')
+
+
+def test_zapis_behu():
+    with tempfile.TemporaryDirectory() as adresar:
+        config = configparser.ConfigParser()
+        config['Telemetry'] = {
+            'jsonl': os.path.join(adresar, 'telemetry.jsonl'),
+            'textfile': os.path.join(adresar, 'prom', 'printmaster.prom'),
+        }
+        for ok in (True, False):
+            telemetry.zacni_beh()
+            telemetry.zaznamenej('render', 0.01, bajty=900)
+            telemetry.dokonci_beh(config, ok, verze='test')
+
+        with open(config['Telemetry']['jsonl'], encoding='utf-8') as f:
+            behy = [json.loads(radek) for radek in f]
+        assert [beh['ok'] for beh in behy] == [True, False]
+        assert behy[0]['sekce']['render']['bajty'] == 900
+        assert behy[0]['verze'] == 'test'
+
+        with open(config['Telemetry']['textfile'], encoding='utf-8') as f:
+            assert 'printmaster_run_success 0' in f.read()
+        assert os.listdir(os.path.join(adresar, 'prom')) == ['printmaster.prom']
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test kompilovaných šablon - cache podle levných vstupů, šablona se při
+zásahu cache nesestavuje
+"""
+
+import os
+import tempfile
+
+import receipt
+import templates
+
+
+def test_cache_podle_vstupu():
+    vyrobeno = []
+
+    def vyrob():
+        vyrobeno.append(1)
+        sablona = templates.Sablona('test')
+        sablona.staticka().text("HLAVICKA\n")
+        sablona.slot('obsah', "OBSAH")
+        sablona.staticka().cut()
+        return sablona
+
+    puvodni = templates.ADRESAR
+    with tempfile.TemporaryDirectory() as adresar:
+        templates.ADRESAR = adresar
+        try:
+            logo = os.path.join(adresar, 'logo.png')
+            with open(logo, 'wb') as f:
+                f.write(b'logo')
+
+            prvni = templates.nacti_nebo_kompiluj('test', vyrob, '1.0.0', b'[Printer]\n',
+                                                  templates.popis_souboru(logo))
+            druha = templates.nacti_nebo_kompiluj('test', vyrob, '1.0.0', b'[Printer]\n',
+                                                  templates.popis_souboru(logo))
+            assert druha == prvni
+            assert len(vyrobeno) == 1
+
+            # Jiná konfigurace nebo změněné logo šablonu znovu sestaví
+            templates.nacti_nebo_kompiluj('test', vyrob, '1.0.0', b'[Printer]\nlogo = x\n',
+                                          templates.popis_souboru(logo))
+            with open(logo, 'wb') as f:
+                f.write(b'nove logo')
+            templates.nacti_nebo_kompiluj('test', vyrob, '1.0.0', b'[Printer]\nlogo = x\n',
+                                          templates.popis_souboru(logo))
+            assert len(vyrobeno) == 3
+        finally:
+            templates.ADRESAR = puvodni
+
+    obsah = receipt.Dokument()
+    obsah.text("radek\n")
+    data = bytes(templates.vykresli(prvni, {'obsah': obsah}))
+    assert data.startswith(receipt.hlavicka())
+    assert data.index(b'HLAVICKA') < data.index(b'OBSAH') < data.index(b'radek')
+    assert b'OBSAH' not in bytes(templates.vykresli(prvni, {}))
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test přenosu do tiskárny - simulovaná tiskárna s malým bufferem hlásí
+stav přes DLE EOT, dochází jí papír a měří se propustnost
+"""
+
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+import transport
+
+
+class SimulovanaTiskarna:
+    """Tiskárna s bufferem, který se vyprazdňuje rychlostí tisku
+
+    Data, která se do plného bufferu nevejdou, se ztratí (jako u levné
+    tiskárny bez řízení toku). Na DLE EOT odpovídá stavem.
+    """
+
+    def __init__(self, buffer=2048, rychlost=40000):
+        self.buffer = buffer
+        self.rychlost = rychlost
+        self.obsazeno = 0.0
+        self.cas = time.monotonic()
+        self.vytisknuto = bytearray()
+        self.ztraceno = 0
+        self.bez_papiru = False
+        self.odpovedi = []
+        # Kolik bajtů dat bylo přijato v okamžiku každého dotazu na stav
+        self.dotazy = []
+
+    def _vyprazdni(self):
+        ted = time.monotonic()
+        if not self.bez_papiru:
+            self.obsazeno = max(0.0, self.obsazeno - (ted - self.cas) * self.rychlost)
+        self.cas = ted
+
+    def _raw(self, data):
+        self._vyprazdni()
+        if data[:2] == transport.DLE_EOT and len(data) == 3:
+            self.dotazy.append(len(self.vytisknuto))
+            self.odpovedi.append(self._stav(data[2]))
+            return
+        volno = int(self.buffer - self.obsazeno)
+        self.vytisknuto.extend(data[:volno])
+        self.ztraceno += max(0, len(data) - volno)
+        self.obsazeno += min(len(data), volno)
+
+    def _stav(self, n):
+        stav = 0x12
+        if n == transport.STAV_TISKARNY and (self.bez_papiru or self.obsazeno > self.buffer * 0.75):
+            stav |= 0x08
+        if n == transport.STAV_OFFLINE and self.bez_papiru:
+            stav |= 0x20
+        if n == transport.STAV_PAPIRU and self.bez_papiru:
+            stav |= 0x60
+        return bytes([stav])
+
+    def _read(self):
+        return self.odpovedi.pop(0) if self.odpovedi else b''
+
+
+@contextlib.contextmanager
+def _docasne_profily():
+    puvodni = transport.SOUBOR
+    with tempfile.TemporaryDirectory() as adresar:
+        transport.SOUBOR = os.path.join(adresar, 'transport.json')
+        try:
+            yield
+        finally:
+            transport.SOUBOR = puvodni
+
+
+def test_zpomaleni_pri_plnem_bufferu():
+    with _docasne_profily():
+        tiskarna = SimulovanaTiskarna()
+        data = b'\x1b@' + b'Radek uctenky s textem\n' * 1000
+
+        prenos = transport.Prenos(tiskarna, 'sim', blok=1024)
+        prenos.odesli(data)
+
+        assert tiskarna.ztraceno == 0
+        assert bytes(tiskarna.vytisknuto) == data
+        assert prenos.blok < transport.MAX_BLOK
+        # Propustnost odpovídá rychlosti tisku, ne rychlosti linky
+        assert 20000 < transport.profil('sim')['rychlost_b_s'] < 60000
+
+        # Bez kontroly stavu se malý buffer přeplní
+        plna = SimulovanaTiskarna()
+        transport.Prenos(plna, 'bez-stavu', blok=4096, kontrolovat_stav=False).odesli(data)
+        assert plna.ztraceno > 0
+
+
+def test_pauza_kdyz_dojde_papir():
+    with _docasne_profily():
+        transport.INTERVAL_PAUZY = 0.02
+        tiskarna = SimulovanaTiskarna()
+        tiskarna.bez_papiru = True
+        data = b'Ahoj\n' * 100
+
+        # Obsluha doplní papír za chvíli - tisk pak pokračuje
+        threading.Timer(0.2, lambda: setattr(tiskarna, 'bez_papiru', False)).start()
+        transport.Prenos(tiskarna, 'sim', max_pauza=5).odesli(data)
+        assert bytes(tiskarna.vytisknuto) == data
+
+        # Papír nikdo nedoplní - chyba s popisem místo obecné výjimky
+        tiskarna = SimulovanaTiskarna()
+        tiskarna.bez_papiru = True
+        try:
+            transport.Prenos(tiskarna, 'sim', max_pauza=0.1).odesli(data)
+            assert False, "očekávána TiskarnaNepripravena"
+        except transport.TiskarnaNepripravena as e:
+            assert e.stav.bez_papiru
+            assert "došel papír" in str(e)
+        assert tiskarna.vytisknuto == b''
+
+
+def test_bloky_nedeli_prikazy_ani_rastr():
+    with _docasne_profily():
+        # Data rastru obsahují bajty, které vypadají jako konec řádku i DLE EOT
+        rastr = bytes([0x10, 0x04, 0x01, 0x0a, 0xff]) * 400
+        pas = transport.GS_V0 + bytes([0, 10, 0, 200, 0]) + rastr
+        data = b'\x1b@' + b'Radek\n' * 300 + b'\x1ba\x01' + pas + b'\x1ba\x00' + b'Dalsi radek\n' * 300
+        zacatek_rastru = data.index(pas)
+
+        tiskarna = SimulovanaTiskarna(buffer=10 ** 6)
+        transport.Prenos(tiskarna, 'sim', blok=256).odesli(data)
+        assert bytes(tiskarna.vytisknuto) == data
+        assert len(tiskarna.dotazy) > 10
+        # Žádný dotaz uvnitř pásu rastru ani uprostřed příkazu nebo řádku
+        hranice = {do for _, _, do in transport.casti(data)}
+        for pozice in tiskarna.dotazy:
+            assert not zacatek_rastru < pozice < zacatek_rastru + len(pas)
+            assert pozice in hranice or pozice == 0
+
+
+def test_prikazy_s_promennou_delkou():
+    # Parametry příkazů obsahují bajty konce řádku i DLE EOT
+    vypln = bytes([0x0a, 0x10, 0x04, 0x1b, 0x1d]) * 60
+    qr = b'\x1d(k' + (len(vypln) + 3).to_bytes(2, 'little') + b'1P0' + vypln
+    obraz = b'\x1b*\x21' + (100).to_bytes(2, 'little') + vypln
+    neznamy = b'\x1bX' + bytes([0x10, 0x04, 0x01]) * 50 + b'\n'
+    prikazy = {
+        qr: len(qr),
+        obraz: 5 + 300,
+        b'\x1bD\x08\x10\x00': 5,
+        b'\x1dkE\x05ABCDE': 9,
+        b'\x1dk\x04ABC\x00': 7,
+        b'\x1d8L' + (4).to_bytes(4, 'little') + b'0p\x0a\x0a': 11,
+        b'\x1dVA\x03': 4,
+        neznamy: len(neznamy),
+    }
+    for prikaz, delka in prikazy.items():
+        assert transport._delka_prikazu(prikaz + b'Text\n', 0) == delka, prikaz[:3]
+
+    with _docasne_profily():
+        data = b'\x1b@' + b''.join(b'Radek\n' * 40 + prikaz for prikaz in prikazy) + b'Konec\n' * 40
+        tiskarna = SimulovanaTiskarna(buffer=10 ** 6)
+        transport.Prenos(tiskarna, 'sim', blok=256).odesli(data)
+        assert bytes(tiskarna.vytisknuto) == data
+        assert len(tiskarna.dotazy) > 5
+        for prikaz in prikazy:
+            zacatek = data.index(prikaz)
+            assert not any(zacatek < pozice < zacatek + len(prikaz) for pozice in tiskarna.dotazy)
+
+
+def test_tiskarna_bez_stavu_a_odhad():
+    class Nema(SimulovanaTiskarna):
+        def _read(self):
+            return b''
+
+    class Pomala(SimulovanaTiskarna):
+        # Na každý třetí dotaz neodpoví včas
+        def _read(self):
+            odpoved = super()._read()
+            return b'' if len(self.dotazy) % 3 == 0 else odpoved
+
+    with _docasne_profily():
+        tiskarna = Nema(buffer=10 ** 6)
+        prenos = transport.Prenos(tiskarna, 'nema', blok=256)
+        prenos.odesli(b'Ahoj\n' * 1000)
+        assert not prenos.kontrolovat_stav
+        assert len(tiskarna.dotazy) == transport.MAX_NEODPOVEDI
+        assert bytes(tiskarna.vytisknuto) == b'Ahoj\n' * 1000
+
+        # Občas chybějící odpověď je neznámý stav, kontrola zůstane zapnutá
+        tiskarna = Pomala(buffer=10 ** 6)
+        prenos = transport.Prenos(tiskarna, 'pomala', blok=256)
+        prenos.odesli(b'Ahoj\n' * 1000)
+        assert prenos.kontrolovat_stav
+        assert len(tiskarna.dotazy) > transport.MAX_NEODPOVEDI
+
+        data = b'x\n' * 100 + transport.GS_V + b'\x00'
+        assert transport.odhad_ms(data) == round(100 * transport.VYSKA_RADKU_MM / 70 * 1000 + transport.MS_NA_REZ)
+        assert transport.odhad_ms(data, rychlost_tisku=140) < transport.odhad_ms(data)
+
+        # Obrázek se počítá podle výšky pásu, ne podle bajtů v datech rastru
+        pas = transport.GS_V0 + bytes([0, 48, 0, 0, 1]) + b'\n' * (48 * 256)
+        assert transport.odhad_ms(pas) == round(256 / transport.BODU_NA_MM / 70 * 1000)
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
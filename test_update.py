@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test kontroly aktualizací - podmíněný dotaz s ETagem, interval kontrol,
+odklad při vyčerpaném limitu, stahování archivu s ověřením SHA-256
+a vrácená verze, která se automaticky znovu neinstaluje
+"""
+
+import configparser
+import hashlib
+import http.server
+import json
+import os
+import tempfile
+import threading
+
+import http_client
+import update
+
+ARCHIV = b'PK' + bytes(range(256)) * 1000
+
+
+class Obsluha(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _odpovez(self, stav, telo=b'', hlavicky=None):
+        self.send_response(stav)
+        for nazev, hodnota in (hlavicky or {}).items():
+            self.send_header(nazev, hodnota)
+        self.send_header('Content-Length', str(len(telo)))
+        self.end_headers()
+        self.wfile.write(telo)
+
+    def do_GET(self):
+        server = self.server
+        server.dotazy.append((self.path, self.headers.get('If-None-Match')))
+        if self.path == '/archiv.zip':
+            self._odpovez(200, ARCHIV)
+        elif server.limit_vycerpan:
+            self._odpovez(403, b'{}', {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '4102444800'})
+        elif self.headers.get('If-None-Match') == '"v2"':
+            self._odpovez(304)
+        else:
+            vydani = {
+                'tag_name': 'v2.0.0',
+                'zipball_url': f"http://127.0.0.1:{server.server_address[1]}/zipball",
+                'body': 'Novinky',
+                'published_at': '2026-10-01T00:00:00Z',
+                'assets': [{
+                    'name': 'printmaster-2.0.0.zip',
+                    'browser_download_url': f"http://127.0.0.1:{server.server_address[1]}/archiv.zip",
+                    'digest': 'sha256:' + hashlib.sha256(ARCHIV).hexdigest(),
+                }],
+            }
+            self._odpovez(200, json.dumps(vydani).encode('utf-8'), {'ETag': '"v2"'})
+
+
+def _server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Obsluha)
+    server.daemon_threads = True
+    server.dotazy = []
+    server.limit_vycerpan = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def _s_api(funkce):
+    server, port = _server()
+    puvodni = update.API_URL
+    update.API_URL = f"http://127.0.0.1:{port}"
+    try:
+        return funkce(server)
+    finally:
+        update.API_URL = puvodni
+        http_client.zavri()
+        server.shutdown()
+        server.server_close()
+
+
+def test_podmineny_dotaz_a_interval():
+    def prubeh(server):
+        stav = {}
+        info = update.check_github_version('Quertz/printmaster', stav)
+        assert info['version'] == '2.0.0'
+        assert info['url'].endswith('/archiv.zip')
+        assert stav['etag'] == '"v2"'
+        assert not update.check_due(stav, 24)
+
+        # Druhá kontrola pošle ETag a dostane 304 - vrátí uložené vydání
+        assert update.check_github_version('Quertz/printmaster', stav) == info
+        assert server.dotazy[-1][1] == '"v2"'
+
+        # Vyčerpaný limit - kontrola se odloží do obnovení limitu
+        server.limit_vycerpan = True
+        stav['checked'] = 0
+        assert update.check_github_version('Quertz/printmaster', stav) is None
+        assert stav['paused_until'] == 4102444800
+        assert not update.check_due(stav, 24)
+
+    _s_api(prubeh)
+
+
+def test_vracena_verze_se_znovu_neinstaluje():
+    def prubeh(server):
+        puvodni_adresar = os.getcwd()
+        instalovano = []
+        puvodni_instalace = update.download_and_install_update
+        update.download_and_install_update = lambda url, verze, *args: instalovano.append(verze) or True
+        update.input = lambda *args: 'ne'
+        try:
+            with tempfile.TemporaryDirectory() as adresar:
+                os.chdir(adresar)
+                for verze in ('1.0.0', '2.0.0'):
+                    os.makedirs(os.path.join('versions', verze))
+                os.symlink(os.path.join('versions', '2.0.0'), 'current')
+                os.symlink(os.path.join('versions', '1.0.0'), 'previous')
+                config = configparser.ConfigParser()
+                config.read_string("[General]\ncache_dir = cache\n[Updates]\nauto_update = true\n")
+
+                assert update.rollback(config)
+                assert update.get_current_version() == '1.0.0'
+                cesta = update.state_path(config)
+                assert update.load_state(cesta)['skipped'] == '2.0.0'
+
+                # I odpověď 304 z cache hlásí 2.0.0 - ta se automaticky neinstaluje
+                update.check_for_update(config, force=True)
+                update.check_for_update(config, force=True)
+                assert server.dotazy[-1][1] == '"v2"'
+                assert instalovano == []
+
+                # Novější vydání, než ze kterého se uživatel vrátil, se nainstaluje
+                stav = update.load_state(cesta)
+                stav['skipped'] = '1.5.0'
+                update.save_state(cesta, stav)
+                update.check_for_update(config, force=True)
+                assert instalovano == ['2.0.0']
+                assert 'skipped' not in update.load_state(cesta)
+        finally:
+            os.chdir(puvodni_adresar)
+            update.download_and_install_update = puvodni_instalace
+            del update.input
+
+    _s_api(prubeh)
+
+
+def test_stav_se_uklada_atomicky():
+    with tempfile.TemporaryDirectory() as adresar:
+        cesta = os.path.join(adresar, 'cache', update.STATE_FILE)
+        assert update.load_state(cesta) == {}
+        update.save_state(cesta, {'checked': 1, 'etag': '"x"'})
+        assert update.load_state(cesta) == {'checked': 1, 'etag': '"x"'}
+        assert os.listdir(os.path.dirname(cesta)) == [update.STATE_FILE]
+
+
+def test_stazeni_archivu_s_overenim():
+    def prubeh(server):
+        url = f"{update.API_URL}/archiv.zip"
+        with tempfile.TemporaryDirectory() as adresar:
+            cesta, otisk = update.download_archive(url, hashlib.sha256(ARCHIV).hexdigest(), adresar)
+            with open(cesta, 'rb') as f:
+                assert f.read() == ARCHIV
+            assert otisk == hashlib.sha256(ARCHIV).hexdigest()
+            os.remove(cesta)
+
+            # Nesouhlasící otisk - chyba a po staženém souboru nezůstane nic
+            try:
+                update.download_archive(url, '0' * 64, adresar)
+                assert False, "očekávána ValueError"
+            except ValueError as e:
+                assert 'SHA-256' in str(e)
+            assert os.listdir(adresar) == []
+
+    _s_api(prubeh)
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test počasí pro více míst - dávky přes /group, společná cache a kvóta
+"""
+
+import http.server
+import json
+import tempfile
+import threading
+import urllib.parse
+
+import weather
+
+MESTA = {'praha,cz': 3067696, 'brno,cz': 3078610, 'ostrava,cz': 3068799}
+
+
+def _odpoved(cislo):
+    return {
+        "id": cislo,
+        "weather": [{"main": "Rain", "description": "déšť"}],
+        "main": {"temp": 8.6, "feels_like": 6.2, "humidity": 90},
+        "wind": {"speed": 5.0},
+        "clouds": {"all": 100},
+        "rain": {"1h": 0.8},
+    }
+
+
+class Obsluha(http.server.BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cesta, _, dotaz = self.path.partition('?')
+        parametry = dict(urllib.parse.parse_qsl(dotaz))
+        self.server.dotazy.append(cesta)
+        if cesta == '/group':
+            telo = {"cnt": 0, "list": [_odpoved(int(c)) for c in parametry['id'].split(',')]}
+        else:
+            telo = _odpoved(MESTA[parametry['q'].lower().replace(' ', '')])
+        data = json.dumps(telo).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Obsluha)
+    server.dotazy = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_davky_a_sdilena_cache():
+    server, url = _server()
+    mista = [weather.Misto('Praha', 'Praha,CZ'), weather.Misto('Brno', 'Brno, CZ'),
+             weather.Misto('Ostrava', 'Ostrava,CZ'), weather.Misto('Domov', 'praha,cz')]
+    try:
+        with tempfile.TemporaryDirectory() as adresar:
+            pocasi = weather.Pocasi('klic', adresar, url=url)
+            vysledek = pocasi.ziskej(mista)
+            assert vysledek['praha,cz']['teplota'] == 9 and vysledek['praha,cz']['dest']
+            # Stejné místo zapsané jinak se stáhne jen jednou
+            assert server.dotazy == ['/weather'] * 3
+
+            # Jiný "proces" se stejnou cache už nic nestahuje
+            server.dotazy.clear()
+            jiny = weather.Pocasi('klic', adresar, url=url)
+            vlakna = [threading.Thread(target=jiny.ziskej, args=([mista[1]],)) for _ in range(5)]
+            for vlakno in vlakna:
+                vlakno.start()
+            for vlakno in vlakna:
+                vlakno.join()
+            assert server.dotazy == []
+
+            # Po vypršení jdou města se známým číslem jedním dotazem
+            pocasi.platnost = 0
+            assert all(pocasi.ziskej(mista).values())
+            assert server.dotazy == ['/group']
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_kvota_sdilena_pres_soubor():
+    with tempfile.TemporaryDirectory() as adresar:
+        cesta = f"{adresar}/kvota.json"
+        kvota = weather.Kvota(cesta, za_minutu=1, zasobnik=2)
+        assert kvota.vezmi()
+        assert kvota.vezmi()
+        assert not kvota.vezmi()
+        # Stav je na disku - druhý proces s týmž souborem také nemá žetony
+        assert not weather.Kvota(cesta, za_minutu=1, zasobnik=2).vezmi()
+
+        server, url = _server()
+        try:
+            pocasi = weather.Pocasi('klic', adresar, url=url, kvota=kvota)
+            assert pocasi.ziskej([weather.Misto('Praha', 'Praha,CZ')]) == {'praha,cz': None}
+            assert server.dotazy == []
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    for nazev, funkce in list(globals().items()):
+        if nazev.startswith('test_'):
+            funkce()
+            print(f"✓ {nazev}")
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Přenos dat do tiskárny s kontrolou stavu a odhadem doby tisku
+PrintMaster - https://github.com/Quertz/printmaster
+
+Levné 58mm tiskárny mají malý vstupní buffer. Data se proto posílají po
+blocích a mezi bloky se tiskárna ptá na stav v reálném čase (DLE EOT).
+Hlásí-li tiskárna, že nestíhá, přenos zpomalí a zmenší blok; došlý papír
+nebo otevřený kryt přenos pozastaví, dokud se stav nevyřeší (nejvýše
+pause_timeout sekund), a chyba tiskárny se ohlásí jako
+TiskarnaNepripravena s popisem místo obecné výjimky z řezu papíru.
+
+Bloky se dělí jen na hranicích příkazů a řádků (casti) - dotaz na stav
+nikdy nepadne doprostřed vícebajtového příkazu ani do dat rastru GS v 0,
+který by tiskárna vytiskla jako obrázek. Délky příkazů s proměnnou délkou
+se čtou z jejich parametrů, neznámý příkaz se nedělí až do konce řádku.
+
+Pro každou tiskárnu se pamatuje dosažená propustnost a velikost bloku
+(CACHE_DIR/transport.json). Z nich, z počtu řádků textu a z výšky
+obrázků se odhaduje doba tisku (odhad_ms) pro plánování ve spooleru.
+
+Jedna chybějící odpověď na DLE EOT znamená neznámý stav a dotaz se
+zopakuje u dalšího bloku. Teprve tiskárna, která neodpoví
+MAX_NEODPOVEDI krát za sebou, se tiskne bez kontroly stavu.
+"""
+
+import contextlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+DLE = 0x10
+ESC = 0x1b
+FS = 0x1c
+GS = 0x1d
+DLE_EOT = b'\x10\x04'
+GS_V = b'\x1dV'
+GS_V0 = b'\x1dv0'
+
+# Dotazy DLE EOT n
+STAV_TISKARNY = 1
+STAV_OFFLINE = 2
+STAV_PAPIRU = 4
+
+VYCHOZI_BLOK = 1024
+MIN_BLOK = 256
+MAX_BLOK = 16384
+# Po kolika blocích bez zahlcení se blok zvětší
+KLIDNYCH_PRO_ZVETSENI = 4
+
+CEKANI_NA_STAV = 0.5
+MAX_NEODPOVEDI = 3
+MAX_PAUZA = 60
+INTERVAL_PAUZY = 0.5
+MIN_ZPOMALENI = 0.02
+MAX_ZPOMALENI = 0.5
+
+# Model doby tisku: řádek 1/6 palce, tisk 70 mm/s, řez papíru
+VYSKA_RADKU_MM = 4.23
+RYCHLOST_TISKU_MM_S = 70
+MS_NA_REZ = 250
+# Rozlišení tiskové hlavy 203 dpi
+BODU_NA_MM = 8
+
+SOUBOR = os.path.join('cache', 'transport.json')
+
+_zamek = threading.Lock()
+
+
+class TiskarnaNepripravena(Exception):
+    """Tiskárna hlásí stav, ve kterém nemůže tisknout"""
+
+    def __init__(self, stav):
+        super().__init__(stav.popis())
+        self.stav = stav
+
+
+class Stav:
+    """Stav tiskárny z odpovědí na DLE EOT 1, 2 a 4"""
+
+    def __init__(self, tiskarna, offline=0, papir=0):
+        self.offline = bool(tiskarna & 0x08)
+        self.kryt_otevren = bool(offline & 0x04)
+        self.bez_papiru = bool(offline & 0x20) or bool(papir & 0x60)
+        self.papir_dochazi = bool(papir & 0x0C)
+        self.chyba = bool(offline & 0x40)
+
+    @property
+    def pripravena(self):
+        return not (self.offline or self.kryt_otevren or self.bez_papiru or self.chyba)
+
+    @property
+    def pozastavit(self):
+        """Stav, který vyřeší obsluha (papír, kryt) - stojí za to počkat"""
+        return self.kryt_otevren or self.bez_papiru
+
+    def popis(self):
+        casti = []
+        if self.bez_papiru:
+            casti.append("došel papír")
+        if self.kryt_otevren:
+            casti.append("otevřený kryt")
+        if self.chyba:
+            casti.append("chyba tiskárny")
+        if self.offline and not casti:
+            casti.append("tiskárna je offline")
+        if self.papir_dochazi:
+            casti.append("papír dochází")
+        return ", ".join(casti) or "připravena"
+
+
+def _nacti_profily():
+    try:
+        with open(SOUBOR, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def profil(nazev):
+    """Naměřené hodnoty tiskárny: {'blok', 'rychlost_b_s'} (nebo prázdný slovník)"""
+    with _zamek:
+        return _nacti_profily().get(nazev, {})
+
+
+def _uloz_profil(nazev, hodnoty):
+    with _zamek:
+        profily = _nacti_profily()
+        profily[nazev] = dict(profily.get(nazev, {}), **hodnoty)
+        adresar = os.path.dirname(SOUBOR) or '.'
+        try:
+            os.makedirs(adresar, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=adresar, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(profily, f)
+            os.replace(tmp, SOUBOR)
+        except OSError as e:
+            print(f"Varování: nelze uložit profil tiskárny: {e}")
+
+
+# Začátek příkazu nebo konec řádku v textu
+_RIDICI = re.compile(rb'[\x10\x1b\x1c\x1d\n]')
+
+# Příkazy ESC/POS s pevnou délkou (předpona, příkaz) -> počet bajtů
+_PEVNE = {
+    **{(DLE, n): 3 for n in (0x04, 0x05)},
+    (DLE, 0x14): 5,
+    **{(ESC, ord(c)): 2 for c in '@2<im'},
+    **{(ESC, ord(c)): 3 for c in ' !-3=EGJMRUVadert{'},
+    **{(ESC, ord(c)): 4 for c in '$\\c'},
+    (ESC, ord('p')): 5,
+    **{(FS, ord(c)): 2 for c in '&.'},
+    **{(FS, ord(c)): 3 for c in '!-'},
+    (FS, ord('p')): 4,
+    (GS, ord(':')): 2,
+    **{(GS, ord(c)): 3 for c in '!/BHIabfhrw'},
+    **{(GS, ord(c)): 4 for c in '$LPW\\'},
+}
+
+
+def _do_nuly(data, i, od):
+    """Délka příkazu ukončeného bajtem NUL (hledá se od pozice od)"""
+    konec = data.find(b'\0', od)
+    return (konec + 1 if konec >= 0 else len(data)) - i
+
+
+def _delka_prikazu(data, i):
+    """Délka příkazu ESC/POS začínajícího na pozici i (včetně dat rastru)
+
+    Příkazy s proměnnou délkou (GS ( x, ESC *, GS k, GS 8 L, ...) se
+    počítají podle svých parametrů. Neznámý příkaz se nedělí až do
+    konce řádku - dotaz na stav nesmí padnout do jeho parametrů.
+    """
+    delka = len(data)
+    if i + 1 >= delka:
+        return 1
+    predpona, prikaz = data[i], data[i + 1]
+    pevna = _PEVNE.get((predpona, prikaz))
+    if pevna:
+        return pevna
+    if predpona == GS and prikaz == ord('V'):
+        # GS V m - s posunem papíru (m = 65, 66, 97, 98) má ještě parametr n
+        return 4 if i + 2 < delka and data[i + 2] in (65, 66, 97, 98) else 3
+    if data[i:i + 3] == GS_V0 and i + 8 <= delka:
+        sirka = data[i + 4] | data[i + 5] << 8
+        vyska = data[i + 6] | data[i + 7] << 8
+        return 8 + sirka * vyska
+    if predpona == GS and prikaz == ord('(') and i + 5 <= delka:
+        # GS ( x pL pH a pL + 256 * pH bajtů parametrů (QR kód, grafika)
+        return 5 + (data[i + 3] | data[i + 4] << 8)
+    if predpona == GS and data[i + 1:i + 3] == b'8L' and i + 7 <= delka:
+        return 7 + int.from_bytes(data[i + 3:i + 7], 'little')
+    if predpona == ESC and prikaz == ord('*') and i + 5 <= delka:
+        # ESC * m nL nH - bitový obrázek, ve 24bodových režimech 3 bajty na sloupec
+        sloupcu = data[i + 3] | data[i + 4] << 8
+        return 5 + sloupcu * (1 if data[i + 2] in (0, 1) else 3)
+    if predpona == GS and prikaz == ord('*') and i + 4 <= delka:
+        return 4 + data[i + 2] * data[i + 3] * 8
+    if predpona == ESC and prikaz == ord('D'):
+        return _do_nuly(data, i, i + 2)
+    if predpona == GS and prikaz == ord('k') and i + 3 <= delka:
+        # GS k m: m 0-6 data ukončená NUL, m 65-79 s délkou n
+        if data[i + 2] <= 6:
+            return _do_nuly(data, i, i + 3)
+        return 4 + (data[i + 3] if i + 4 <= delka else 0)
+    konec = data.find(b'\n', i + 2)
+    return (konec + 1 if konec >= 0 else delka) - i
+
+
+def casti(data):
+    """Rozdělí data ESC/POS na nedělitelné části (druh, začátek, konec)
+
+    Druh je 'text' (nejvýše do konce řádku), 'prikaz', nebo 'obraz'
+    (jeden pás GS v 0 i s daty). Mezi částmi lze přenos přerušit.
+    """
+    i = 0
+    delka = len(data)
+    while i < delka:
+        if data[i] in (DLE, ESC, FS, GS):
+            konec = min(delka, i + _delka_prikazu(data, i))
+            yield ('obraz' if data[i:i + 3] == GS_V0 else 'prikaz'), i, konec
+        else:
+            nalez = _RIDICI.search(data, i)
+            if nalez is None:
+                konec = delka
+            elif data[nalez.start()] == ord('\n'):
+                konec = nalez.end()
+            else:
+                konec = nalez.start()
+            yield 'text', i, konec
+        i = konec
+
+
+def odhad_ms(data, nazev=None, rychlost_tisku=RYCHLOST_TISKU_MM_S):
+    """Odhad doby tisku dat v milisekundách
+
+    Tisk trvá podle počtu řádků textu, výšky obrázků a řezů; přenos
+    podle naměřené propustnosti tiskárny. Obojí běží souběžně (tiskárna
+    tiskne z bufferu), rozhoduje pomalejší.
+    """
+    mm = 0.0
+    rezu = 0
+    for druh, od, do in casti(data):
+        if druh == 'text':
+            if data[do - 1] == ord('\n'):
+                mm += VYSKA_RADKU_MM
+        elif druh == 'obraz':
+            mm += (data[od + 6] | data[od + 7] << 8) / BODU_NA_MM
+        elif data[od:od + 2] == GS_V:
+            rezu += 1
+    tisk = mm / rychlost_tisku * 1000 + rezu * MS_NA_REZ
+    rychlost = profil(nazev).get('rychlost_b_s') if nazev else None
+    prenos = len(data) / rychlost * 1000 if rychlost else 0
+    return round(max(tisk, prenos))
+
+
+@contextlib.contextmanager
+def _kratky_timeout(zarizeni):
+    """U síťové tiskárny se na odpověď stavu čeká jen krátce"""
+    sock = getattr(zarizeni, 'device', None)
+    if not hasattr(sock, 'settimeout'):
+        yield
+        return
+    puvodni = sock.gettimeout()
+    sock.settimeout(CEKANI_NA_STAV)
+    try:
+        yield
+    finally:
+        sock.settimeout(puvodni)
+
+
+class Prenos:
+    """Posílá data do jednoho otevřeného zařízení python-escpos"""
+
+    def __init__(self, zarizeni, nazev='tiskarna', blok=None, kontrolovat_stav=True, max_pauza=MAX_PAUZA):
+        self.zarizeni = zarizeni
+        self.nazev = nazev
+        self.blok = blok or profil(nazev).get('blok', VYCHOZI_BLOK)
+        self.kontrolovat_stav = kontrolovat_stav and hasattr(zarizeni, '_read')
+        self.max_pauza = max_pauza
+        self.rychlost_b_s = None
+        self.neodpovedi = 0
+
+    def _dotaz(self, n):
+        """Jeden dotaz DLE EOT n; vrátí bajt stavu, nebo None (stav neznámý)
+
+        Kontrola stavu se vypne až po MAX_NEODPOVEDI chybějících
+        odpovědích za sebou - jeden krátký timeout ji nevypne.
+        """
+        try:
+            self.zarizeni._raw(DLE_EOT + bytes([n]))
+            with _kratky_timeout(self.zarizeni):
+                odpoved = self.zarizeni._read()
+        except Exception:
+            odpoved = None
+        # Platná odpověď má pevné bity 1 a 4 nastavené, bity 0 a 7 nulové
+        if not odpoved or (odpoved[-1] & 0x93) != 0x12:
+            self.neodpovedi += 1
+            if self.neodpovedi >= MAX_NEODPOVEDI:
+                self.kontrolovat_stav = False
+            return None
+        self.neodpovedi = 0
+        return odpoved[-1]
+
+    def stav(self):
+        """Úplný stav tiskárny, nebo None, pokud stav nehlásí"""
+        if not self.kontrolovat_stav:
+            return None
+        odpovedi = []
+        for n in (STAV_TISKARNY, STAV_OFFLINE, STAV_PAPIRU):
+            odpoved = self._dotaz(n)
+            if odpoved is None:
+                return None
+            odpovedi.append(odpoved)
+        return Stav(*odpovedi)
+
+    def _zahlcena(self):
+        """Rychlý dotaz mezi bloky - hlásí tiskárna, že je offline (nestíhá)?"""
+        odpoved = self._dotaz(STAV_TISKARNY) if self.kontrolovat_stav else None
+        return odpoved is not None and bool(odpoved & 0x08)
+
+    def _pockej(self):
+        """Počká, až bude tiskárna připravená; jinak vyvolá TiskarnaNepripravena"""
+        konec = time.monotonic() + self.max_pauza
+        zpomaleni = MIN_ZPOMALENI
+        ohlaseno = None
+        while True:
+            stav = self.stav()
+            if stav is None or stav.pripravena:
+                if stav is not None and stav.papir_dochazi and ohlaseno is None:
+                    print(f"Varování: tiskárna {self.nazev}: papír dochází")
+                return
+            if stav.chyba or time.monotonic() >= konec:
+                raise TiskarnaNepripravena(stav)
+            if stav.pozastavit:
+                if ohlaseno != stav.popis():
+                    ohlaseno = stav.popis()
+                    print(f"Varování: tiskárna {self.nazev}: {ohlaseno}, tisk pozastaven")
+                time.sleep(INTERVAL_PAUZY)
+            else:
+                # Tiskárna nestíhá - zpomalit
+                time.sleep(zpomaleni)
+                zpomaleni = min(MAX_ZPOMALENI, zpomaleni * 2)
+
+    def odesli(self, data):
+        """Pošle data po blocích, mezi bloky hlídá stav tiskárny
+
+        Blok končí vždy na hranici části (casti) - příkaz ani pás rastru
+        se nerozdělí, pás delší než blok se pošle celý.
+        """
+        start = time.monotonic()
+        self._pockej()
+        pohled = memoryview(data)
+        zacatek = 0
+        klidnych = 0
+        for _, od, do in casti(data):
+            if do - zacatek <= self.blok or od == zacatek:
+                continue
+            self.zarizeni._raw(bytes(pohled[zacatek:od]))
+            zacatek = od
+            if not self.kontrolovat_stav:
+                continue
+            if self._zahlcena():
+                self.blok = max(MIN_BLOK, self.blok // 2)
+                klidnych = 0
+                self._pockej()
+            else:
+                klidnych += 1
+                if klidnych >= KLIDNYCH_PRO_ZVETSENI:
+                    self.blok = min(MAX_BLOK, self.blok * 2)
+                    klidnych = 0
+        if zacatek < len(data):
+            self.zarizeni._raw(bytes(pohled[zacatek:]))
+
+        trvani = time.monotonic() - start
+        if len(data) >= MIN_BLOK and trvani > 0:
+            self.rychlost_b_s = len(data) / trvani
+            predchozi = profil(self.nazev).get('rychlost_b_s')
+            # Klouzavý průměr, jeden pomalý tisk odhad nerozbije
+            rychlost = self.rychlost_b_s if not predchozi else 0.7 * predchozi + 0.3 * self.rychlost_b_s
+            _uloz_profil(self.nazev, {'blok': self.blok, 'rychlost_b_s': round(rychlost, 1)})
@@ -3,19 +3,51 @@
 """
 Automatická kontrola a instalace aktualizací z GitHubu
 PrintMaster - https://github.com/Quertz/printmaster
+
+Ranní přehled se tiskne jako první, aktualizace se kontrolují až po
+tisku - pomalé api.github.com tak tisk nezdrží. Kontrola proběhne
+nejvýše jednou za check_interval_hours; dotaz na /releases/latest je
+podmíněný (If-None-Match s uloženým ETagem), takže nezměněné vydání
+vrátí jen 304 a nečerpá limit dotazů. Při vyčerpaném limitu se další
+kontrola odloží do jeho obnovení. Stav kontroly se ukládá do
+CACHE_DIR/update.json.
+
+Archiv vydání se stahuje po blocích přímo na disk a SHA-256 se počítá
+během stahování. Má-li vydání přiložený ZIP s otiskem (digest), stáhne
+se ten a otisk se ověří; jinak se použije zipball zdrojového kódu.
+
+    [Updates]
+    check_updates = true
+    auto_update = false
+    check_interval_hours = 24
+    github_token =
+    keep_versions = 3
+
+Ruční kontrola bez ohledu na interval: python3 update.py --now
+
+Vydání se instaluje do vlastního adresáře verze a aktivuje se atomickým
+přepnutím odkazu (viz releases.py). Návrat k předchozí verzi:
+python3 update.py --rollback
+
+Verze, ze které se uživatel vrátil, se zapíše do stavu kontroly
+a automaticky se znovu neinstaluje - až novější vydání.
 """
 
 import os
 import sys
 import json
-import requests
-import subprocess
+import time
+import hashlib
+import tempfile
 import configparser
 from datetime import datetime
 
 VERSION_FILE = '.version'
 CURRENT_VERSION = '1.0.0'
 GITHUB_REPO = 'Quertz/printmaster'
+API_URL = 'https://api.github.com'
+STATE_FILE = 'update.json'
+CHUNK_SIZE = 64 * 1024
 
 def load_config():
     """Načte konfiguraci"""
@@ -27,7 +59,11 @@ def load_config():
     return config
 
 def get_current_version():
-    """Vrátí aktuální verzi"""
+    """Vrátí aktuální verzi (u verzované instalace cíl odkazu current)"""
+    import releases
+    
+    if releases.aktivni():
+        return releases.aktivni()
     if os.path.exists(VERSION_FILE):
         with open(VERSION_FILE, 'r') as f:
             return f.read().strip()
@@ -38,31 +74,101 @@ def save_version(version):
     with open(VERSION_FILE, 'w') as f:
         f.write(version)
 
-def check_github_version(repo):
-    """Zkontroluje nejnovější verzi na GitHubu"""
+def state_path(config):
+    """Cesta k uloženému stavu kontroly aktualizací"""
+    return os.path.join(config.get('General', 'cache_dir', fallback='cache'), STATE_FILE)
+
+def load_state(path):
+    """Načte stav kontroly (čas, ETag, poslední vydání); při chybě prázdný"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(path, state):
+    """Atomicky uloží stav kontroly"""
+    directory = os.path.dirname(path) or '.'
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Varování: nelze uložit stav kontroly aktualizací: {e}")
+
+def check_due(state, interval_hours, now=None):
+    """Zda je čas na další kontrolu (interval uplynul a limit GitHubu neplatí)"""
+    now = now or time.time()
+    if now < state.get('paused_until', 0):
+        return False
+    return now - state.get('checked', 0) >= interval_hours * 3600
+
+def release_info(data):
+    """Údaje o vydání z odpovědi GitHub API
+
+    Přednost má přiložený ZIP s otiskem SHA-256, jinak zipball zdrojů.
+    """
+    url = data['zipball_url']
+    sha256 = None
+    for asset in data.get('assets') or []:
+        digest = asset.get('digest') or ''
+        if asset.get('name', '').endswith('.zip') and digest.startswith('sha256:'):
+            url = asset['browser_download_url']
+            sha256 = digest[len('sha256:'):]
+            break
+    return {
+        'version': data['tag_name'].lstrip('v'),
+        'url': url,
+        'sha256': sha256,
+        'notes': data.get('body', ''),
+        'published': data['published_at']
+    }
+
+def check_github_version(repo, state=None, token=None):
+    """Zkontroluje nejnovější verzi na GitHubu
+
+    S uloženým stavem se ptá podmíněně (ETag); odpověď 304 vrátí uložené
+    vydání. Stav se aktualizuje na místě (čas, ETag, vydání, odklad).
+    """
+    import http_client
+    
     if not repo:
         repo = GITHUB_REPO
+    if state is None:
+        state = {}
+    
+    headers = {'Accept': 'application/vnd.github+json'}
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    if state.get('etag') and state.get('repo') == repo and state.get('release'):
+        headers['If-None-Match'] = state['etag']
     
     try:
         # Získání nejnovějšího release
-        url = f"https://api.github.com/repos/{repo}/releases/latest"
-        response = requests.get(url, timeout=10)
+        url = f"{API_URL}/repos/{repo}/releases/latest"
+        response = http_client.get(url, headers=headers, timeout=10)
+        
+        if response.status_code == 304:
+            state['checked'] = time.time()
+            return state['release']
         
         if response.status_code == 200:
-            data = response.json()
-            latest_version = data['tag_name'].lstrip('v')
-            download_url = data['zipball_url']
-            release_notes = data.get('body', '')
-            
-            return {
-                'version': latest_version,
-                'url': download_url,
-                'notes': release_notes,
-                'published': data['published_at']
-            }
-        else:
-            print(f"GitHub API odpovědělo stavem: {response.status_code}")
+            info = release_info(response.json())
+            state.update(checked=time.time(), repo=repo, release=info,
+                         etag=response.headers.get('ETag'))
+            return info
+        
+        if response.status_code in (403, 429) and response.headers.get('X-RateLimit-Remaining') == '0':
+            # Vyčerpaný limit - další pokus až po jeho obnovení
+            state['paused_until'] = int(response.headers.get('X-RateLimit-Reset', 0)) or time.time() + 3600
+            print("GitHub API: vyčerpán limit dotazů, další kontrola po "
+                  f"{datetime.fromtimestamp(state['paused_until']).strftime('%H:%M')}")
             return None
+        
+        print(f"GitHub API odpovědělo stavem: {response.status_code}")
+        return None
             
     except Exception as e:
         print(f"Chyba při kontrole aktualizací: {e}")
@@ -78,82 +184,105 @@ def compare_versions(v1, v2):
     except:
         return False
 
-def download_and_install_update(download_url):
-    """Stáhne a nainstaluje aktualizaci"""
-    import tempfile
-    import zipfile
-    import shutil
+def download_archive(url, sha256=None, directory=None):
+    """Stáhne archiv po blocích na disk a během stahování počítá SHA-256
     
-    print("Stahuji aktualizaci...")
+    Vrátí (cesta k souboru, otisk). Nesouhlasí-li otisk s očekávaným,
+    soubor se smaže a vyvolá se ValueError.
+    """
+    import http_client
     
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.zip')
     try:
-        # Stažení ZIP souboru
-        response = requests.get(download_url, timeout=30)
+        with os.fdopen(fd, 'wb') as f, http_client.get(url, stream=True, timeout=30) as response:
+            if response.status_code != 200:
+                raise ValueError(f"server vrátil stav {response.status_code}")
+            for chunk in response.iter_content(CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
-            tmp_file.write(response.content)
-            zip_path = tmp_file.name
-        
-        # Vytvoření záložní kopie
-        backup_dir = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        os.makedirs(backup_dir, exist_ok=True)
+        if sha256 and digest.hexdigest() != sha256.lower():
+            raise ValueError(f"otisk SHA-256 nesouhlasí (očekáván {sha256}, stažen {digest.hexdigest()})")
+    except BaseException:
+        os.remove(path)
+        raise
+    
+    return path, digest.hexdigest()
+
+def download_and_install_update(download_url, version, sha256=None, keep=3):
+    """Stáhne vydání, rozbalí je do vlastního adresáře verze a aktivuje je
+    
+    Běžící instalace se nepřepisuje - nová verze se připraví vedle
+    (versions/<verze>, předkompilovaná) a přepne se atomicky odkazem
+    current. Nepovedená instalace nechá aktivní verzi beze změny.
+    """
+    import releases
+    
+    print("Stahuji aktualizaci...")
+    
+    zip_path = None
+    try:
+        # Stažení ZIP souboru rovnou na disk (do stejného svazku jako verze)
+        os.makedirs(releases.ADRESAR_VERZI, exist_ok=True)
+        zip_path, digest = download_archive(download_url, sha256, releases.ADRESAR_VERZI)
+        if sha256:
+            print(f"✓ Otisk SHA-256 ověřen: {digest}")
+        else:
+            print(f"SHA-256 archivu: {digest} (vydání otisk neuvádí)")
         
-        files_to_backup = ['print_daily.py', 'runme.py', 'update.py']
-        for file in files_to_backup:
-            if os.path.exists(file):
-                shutil.copy2(file, os.path.join(backup_dir, file))
+        # Dosavadní instalace s moduly v kořeni se převezme jako verze pro návrat
+        if releases.prevezmi_puvodni(get_current_version()):
+            print(f"✓ Dosavadní instalace převzata jako verze {releases.aktivni()}")
         
-        print(f"Záloha vytvořena v: {backup_dir}")
+        path = releases.rozbal(zip_path, version)
+        print(f"✓ Rozbaleno a předkompilováno: {path}")
         
-        # Rozbalení aktualizace
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(tmp_dir)
-            
-            # Najít kořenový adresář (GitHub vytváří složku s názvem repo)
-            extracted_dirs = os.listdir(tmp_dir)
-            if extracted_dirs:
-                source_dir = os.path.join(tmp_dir, extracted_dirs[0])
-                
-                # Kopírování souborů
-                for file in files_to_backup:
-                    src = os.path.join(source_dir, file)
-                    if os.path.exists(src):
-                        shutil.copy2(src, file)
-                        print(f"✓ Aktualizován: {file}")
+        releases.aktivuj(version)
+        print(f"✓ Aktivní verze: {version} (návrat: python3 update.py --rollback)")
         
-        # Smazání dočasného ZIP
-        os.remove(zip_path)
+        removed = releases.ukliz(keep)
+        if removed:
+            print(f"Smazány staré verze: {', '.join(removed)}")
         
         print("✓ Aktualizace úspěšně nainstalována!")
         return True
         
     except Exception as e:
         print(f"Chyba při instalaci aktualizace: {e}")
-        print(f"Obnovuji ze zálohy...")
-        
-        # Obnovení ze zálohy
-        if os.path.exists(backup_dir):
-            for file in files_to_backup:
-                backup_file = os.path.join(backup_dir, file)
-                if os.path.exists(backup_file):
-                    shutil.copy2(backup_file, file)
-        
+        print(f"Aktivní zůstává verze {get_current_version()}")
         return False
+    
+    finally:
+        if zip_path and os.path.exists(zip_path):
+            os.remove(zip_path)
 
-def main():
-    """Hlavní funkce"""
-    print("="*60)
-    print("PRINTMASTER - KONTROLA AKTUALIZACÍ")
-    print(f"https://github.com/{GITHUB_REPO}")
-    print("="*60)
+def rollback(config=None):
+    """Vrátí předchozí verzi (přejmenování odkazu previous na current)
     
-    # Načtení konfigurace
-    config = load_config()
+    Opuštěná verze se uloží do stavu kontroly, aby ji auto_update
+    při příští kontrole nenainstaloval znovu.
+    """
+    import releases
     
+    current = get_current_version()
+    restored = releases.vrat_zpet()
+    if restored is None:
+        print("Není k dispozici předchozí verze pro návrat")
+        return False
+    save_version(restored)
+    path = state_path(config or load_config())
+    state = load_state(path)
+    state['skipped'] = current
+    save_state(path, state)
+    print(f"✓ Vráceno z verze {current} na verzi {restored}")
+    print(f"Verze {current} se automaticky nenainstaluje, dokud nevyjde novější")
+    return True
+
+def check_for_update(config, force=False):
+    """Zkontroluje a případně nainstaluje aktualizaci (volá se po tisku)"""
     if not config.has_section('Updates'):
         print("Sekce Updates v konfiguraci nenalezena.")
-        print("Spouštím bez kontroly aktualizací...\n")
         repo = GITHUB_REPO
         check_updates = True
         auto_update = False
@@ -161,57 +290,95 @@ def main():
         check_updates = config.getboolean('Updates', 'check_updates', fallback=True)
         auto_update = config.getboolean('Updates', 'auto_update', fallback=False)
         repo = config.get('Updates', 'github_repo', fallback=GITHUB_REPO)
+    interval = config.getfloat('Updates', 'check_interval_hours', fallback=24)
+    token = config.get('Updates', 'github_token', fallback='') or None
+    keep = config.getint('Updates', 'keep_versions', fallback=3)
     
-    if check_updates:
-        print(f"Repozitář: https://github.com/{repo}")
-        current = get_current_version()
-        print(f"Aktuální verze: {current}")
-        
-        latest_info = check_github_version(repo)
-        
-        if latest_info:
-            latest = latest_info['version']
-            print(f"Nejnovější verze: {latest}")
-            
-            if compare_versions(current, latest):
-                print("\n🎉 Dostupná nová verze!")
-                print(f"\nPoznámky k vydání:\n{latest_info['notes']}\n")
-                
-                if auto_update:
-                    print("Automatická aktualizace je povolena...")
-                    if download_and_install_update(latest_info['url']):
-                        save_version(latest)
-                        print("\n✓ Aktualizace dokončena!")
-                    else:
-                        print("\n✗ Aktualizace selhala")
-                else:
-                    response = input("Chcete aktualizovat? (ano/ne): ").strip().lower()
-                    if response in ['ano', 'a', 'yes', 'y']:
-                        if download_and_install_update(latest_info['url']):
-                            save_version(latest)
-                            print("\n✓ Aktualizace dokončena!")
-                        else:
-                            print("\n✗ Aktualizace selhala")
-            else:
-                print("✓ Máte nejnovější verzi")
-        else:
-            print("Nelze zkontrolovat aktualizace")
-    else:
+    if not check_updates:
         print("Kontrola aktualizací je vypnuta")
+        return
+    
+    path = state_path(config)
+    state = load_state(path)
+    if not force and not check_due(state, interval):
+        checked = state.get('checked')
+        when = datetime.fromtimestamp(checked).strftime('%d.%m. %H:%M') if checked else '-'
+        print(f"Aktualizace zkontrolovány {when}, další kontrola za {interval:g} h")
+        return
+    
+    print(f"Repozitář: https://github.com/{repo}")
+    current = get_current_version()
+    print(f"Aktuální verze: {current}")
     
-    print("\n" + "="*60)
+    latest_info = check_github_version(repo, state, token)
+    save_state(path, state)
+    
+    if not latest_info:
+        print("Nelze zkontrolovat aktualizace")
+        return
+    
+    latest = latest_info['version']
+    print(f"Nejnovější verze: {latest}")
+    
+    if not compare_versions(current, latest):
+        print("✓ Máte nejnovější verzi")
+        return
+    
+    print("\n🎉 Dostupná nová verze!")
+    print(f"\nPoznámky k vydání:\n{latest_info['notes']}\n")
+    
+    # Verze, ze které se uživatel vrátil (--rollback), se sama neinstaluje
+    skipped = state.get('skipped')
+    rolled_back = bool(skipped) and not compare_versions(skipped, latest)
+    if rolled_back:
+        print(f"Z verze {skipped} jste se vrátili, automaticky se neinstaluje")
+    
+    if auto_update and not rolled_back:
+        print("Automatická aktualizace je povolena...")
+    elif sys.stdin.isatty():
+        response = input("Chcete aktualizovat? (ano/ne): ").strip().lower()
+        if response not in ['ano', 'a', 'yes', 'y']:
+            return
+    else:
+        # Z cronu se nikdo nezeptá
+        print("Pro instalaci spusťte update-now.sh nebo povolte auto_update")
+        return
+    
+    if download_and_install_update(latest_info['url'], latest, latest_info.get('sha256'), keep):
+        save_version(latest)
+        if state.pop('skipped', None):
+            save_state(path, state)
+        print("\n✓ Aktualizace dokončena!")
+    else:
+        print("\n✗ Aktualizace selhala")
+
+def main():
+    """Hlavní funkce - nejdřív tisk, potom kontrola aktualizací"""
+    # Návrat k předchozí verzi bez tisku: python3 update.py --rollback
+    if '--rollback' in sys.argv:
+        sys.exit(0 if rollback() else 1)
+    
+    print("="*60)
     print("SPOUŠTĚNÍ RANNÍHO PŘEHLEDU")
     print("="*60 + "\n")
     
-    # Spuštění hlavního programu
+    # Spuštění hlavního programu ve stejném procesu (bez druhého interpretu)
     try:
-        subprocess.run([sys.executable, 'runme.py'], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Chyba při spouštění: {e}")
-        sys.exit(1)
-    except FileNotFoundError:
+        import runme
+    except ImportError:
         print("CHYBA: Soubor runme.py nebyl nalezen!")
         sys.exit(1)
+    
+    try:
+        runme.main()
+    finally:
+        # Kontrola až po tisku - ani pomalé GitHub API tisk nezdrží
+        print("\n" + "="*60)
+        print("PRINTMASTER - KONTROLA AKTUALIZACÍ")
+        print(f"https://github.com/{GITHUB_REPO}")
+        print("="*60)
+        
+        check_for_update(load_config(), force='--now' in sys.argv)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
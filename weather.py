@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Počasí pro více míst s dávkovým stahováním a sdílenou kvótou API klíče
+PrintMaster - https://github.com/Quertz/printmaster
+
+Místa se definují v sekci [Weather] - výchozí město a libovolný počet
+dalších míst (název|dotaz, dotaz je "město,země", "šířka,délka" nebo
+číslo města OpenWeatherMap):
+
+    [Weather]
+    city = Prague
+    country_code = CZ
+    location_brno = Brno|Brno,CZ
+    location_chata = Chata|49.60,15.58
+    rate_per_minute = 50
+    cache_minutes = 10
+    quota_file = /mnt/sdilene/printmaster/weather_quota.json
+
+Každé místo se stáhne nejvýše jednou za cache_minutes a výsledek slouží
+všem účtenkám (procesům) pro totéž místo. Stahování drží zámek, takže
+souběžné požadavky na stejné místo počkají na první a převezmou jeho
+výsledek. Města se známým číslem se stahují po dávkách přes /group.
+Každý dotaz na API spotřebuje žeton z kvóty uložené na disku; kvótu
+může sdílet více tiskových stanic se stejným klíčem (quota_file na
+sdíleném disku).
+"""
+
+import contextlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+VYCHOZI_URL = 'http://api.openweathermap.org/data/2.5'
+VYCHOZI_ZA_MINUTU = 50
+VYCHOZI_PLATNOST_MIN = 10
+# Endpoint /group přijme nejvýše 20 čísel měst
+MAX_V_DAVCE = 20
+# Jak dlouho se nejvýše čeká na volný žeton kvóty
+CEKANI_NA_KVOTU = 5
+
+_SOURADNICE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+# Náhradní zámek tam, kde není fcntl (Windows) - zamyká jen v rámci procesu
+_ZAMEK_PROCESU = threading.Lock()
+
+
+class Misto:
+    """Jedno místo pro počasí - název pro účtenku a dotaz pro API"""
+
+    def __init__(self, nazev, dotaz):
+        self.nazev = nazev
+        self.dotaz = dotaz.strip()
+        souradnice = _SOURADNICE.match(self.dotaz)
+        if souradnice:
+            self.parametry = {'lat': souradnice.group(1), 'lon': souradnice.group(2)}
+        elif self.dotaz.isdigit():
+            self.parametry = {'id': self.dotaz}
+        else:
+            self.parametry = {'q': self.dotaz}
+
+    @property
+    def klic(self):
+        """Stejný dotaz zapsaný jinak (mezery, velikost písmen) je stejné místo"""
+        return re.sub(r"\s*,\s*", ",", self.dotaz.lower())
+
+    def __repr__(self):
+        return f"Misto({self.nazev!r}, {self.dotaz!r})"
+
+
+def nacti_mista(config):
+    """Vrátí seznam míst z konfigurace - výchozí město a location_*"""
+    sekce = config['Weather'] if config.has_section('Weather') else {}
+    mista = [Misto('vychozi', f"{sekce.get('city', 'Prague')},{sekce.get('country_code', 'CZ')}")]
+    for key in sekce:
+        if key.startswith('location_'):
+            parts = sekce[key].split('|')
+            if len(parts) == 2:
+                mista.append(Misto(parts[0], parts[1]))
+    return mista
+
+
+@contextlib.contextmanager
+def _zamceno(cesta):
+    """Výhradní zámek souboru platný mezi procesy i vlákny"""
+    os.makedirs(os.path.dirname(cesta) or '.', exist_ok=True)
+    try:
+        import fcntl
+    except ImportError:
+        with _ZAMEK_PROCESU:
+            yield
+        return
+    # Každé volání otevírá soubor znovu - flock pak zamyká i mezi vlákny
+    with open(cesta, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _nacti_json(cesta, vychozi):
+    try:
+        with open(cesta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return vychozi
+
+
+def _zapis_json(cesta, hodnota):
+    adresar = os.path.dirname(cesta) or '.'
+    os.makedirs(adresar, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=adresar, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(hodnota, f, ensure_ascii=False)
+        os.replace(tmp, cesta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class Kvota:
+    """Token bucket uložený na disku - sdílený všemi procesy s týmž souborem
+
+    Zásobník se doplňuje rychlostí za_minutu žetonů za minutu až do
+    velikosti zasobnik. Stav se čte a zapisuje pod zámkem souboru.
+    """
+
+    def __init__(self, cesta, za_minutu=VYCHOZI_ZA_MINUTU, zasobnik=None):
+        self.cesta = cesta
+        self.za_sekundu = za_minutu / 60.0
+        self.zasobnik = zasobnik or za_minutu
+
+    def _vezmi_ted(self, pocet):
+        """Zkusí odebrat žetony; vrátí 0 nebo počet sekund do jejich doplnění"""
+        with _zamceno(self.cesta + '.lock'):
+            stav = _nacti_json(self.cesta, {})
+            ted = time.time()
+            tokeny = stav.get('tokeny', self.zasobnik)
+            tokeny = min(self.zasobnik, tokeny + max(0.0, ted - stav.get('cas', ted)) * self.za_sekundu)
+            if tokeny >= pocet:
+                _zapis_json(self.cesta, {'tokeny': tokeny - pocet, 'cas': ted})
+                return 0
+            return (pocet - tokeny) / self.za_sekundu if self.za_sekundu > 0 else float('inf')
+
+    def vezmi(self, pocet=1, cekat=0):
+        """Odebere žetony, případně na ně počká nejvýše `cekat` sekund"""
+        konec = time.monotonic() + cekat
+        while True:
+            chybi = self._vezmi_ted(pocet)
+            if not chybi:
+                return True
+            zbyva = konec - time.monotonic()
+            if chybi > zbyva:
+                return False
+            time.sleep(chybi)
+
+
+def prevod(data):
+    """Převede odpověď OpenWeatherMap na slovník pro účtenku"""
+    return {
+        "teplota": round(data["main"]["temp"]),
+        "pocit": round(data["main"]["feels_like"]),
+        "popis": data["weather"][0]["description"],
+        "vlhkost": data["main"]["humidity"],
+        "vitr": round(data["wind"]["speed"] * 3.6),
+        "dest": "rain" in data or "drizzle" in data["weather"][0]["main"].lower(),
+        "snih": "snow" in data["weather"][0]["main"].lower(),
+        "oblacnost": data["clouds"]["all"],
+        "ikona": data["weather"][0].get("icon", "")
+    }
+
+
+class Pocasi:
+    """Stahování počasí pro více míst se sdílenou cache a kvótou"""
+
+    def __init__(self, api_key, adresar, url=VYCHOZI_URL, kvota=None,
+                 platnost=VYCHOZI_PLATNOST_MIN * 60, timeout=10):
+        self.api_key = api_key
+        self.url = url.rstrip('/')
+        self.cesta = os.path.join(adresar, 'pocasi.json')
+        self.kvota = kvota or Kvota(os.path.join(adresar, 'weather_quota.json'))
+        self.platnost = platnost
+        self.timeout = timeout
+
+    def _get(self, koncovka, parametry, pocet_mist):
+        """Jeden dotaz na API (spotřebuje žeton kvóty); vrátí JSON nebo None"""
+        import http_client
+        import telemetry
+
+        if not self.kvota.vezmi(1, cekat=CEKANI_NA_KVOTU):
+            print("Varování: vyčerpaná kvóta OpenWeatherMap, počasí se nestáhne")
+            return None
+        parametry = dict(parametry, appid=self.api_key, units='metric', lang='cz')
+        # Do telemetrie jen adresa bez parametrů - obsahují API klíč
+        with telemetry.span('http', url=f"{self.url}/{koncovka}", mist=pocet_mist) as s:
+            response = http_client.get(f"{self.url}/{koncovka}", params=parametry, timeout=self.timeout)
+            s['status'] = response.status_code
+            s['bajty'] = len(response.content)
+        if response.status_code != 200:
+            print(f"Chyba při získávání počasí: HTTP {response.status_code}")
+            return None
+        return response.json()
+
+    def _stahni_davku(self, mista, cisla):
+        """Stáhne města se známým číslem přes /group; vrátí {klic: odpověď}"""
+        vysledky = {}
+        for zacatek in range(0, len(mista), MAX_V_DAVCE):
+            davka = mista[zacatek:zacatek + MAX_V_DAVCE]
+            data = self._get('group', {'id': ','.join(str(cisla[m.klic]) for m in davka)}, len(davka))
+            if not data:
+                continue
+            podle_cisla = {polozka.get('id'): polozka for polozka in data.get('list', [])}
+            for misto in davka:
+                if cisla[misto.klic] in podle_cisla:
+                    vysledky[misto.klic] = podle_cisla[cisla[misto.klic]]
+        return vysledky
+
+    def _stahni(self, mista, ulozene):
+        """Stáhne chybějící místa - dávkově, kde je to možné; vrátí {klic: odpověď}"""
+        cisla = ulozene.setdefault('cisla', {})
+        for misto in mista:
+            if 'id' in misto.parametry:
+                cisla[misto.klic] = int(misto.parametry['id'])
+        v_davce = [m for m in mista if m.klic in cisla]
+        vysledky = self._stahni_davku(v_davce, cisla) if len(v_davce) > 1 else {}
+
+        # Zbytek (a to, co dávka nevrátila) po jednom
+        for misto in mista:
+            if misto.klic in vysledky:
+                continue
+            data = self._get('weather', misto.parametry, 1)
+            if not data:
+                continue
+            vysledky[misto.klic] = data
+            # Číslo města se zapamatuje, příště půjde místo do dávky
+            # (u souřadnic ne - číslo nejbližšího města není totéž místo)
+            if 'q' in misto.parametry and data.get('id'):
+                cisla[misto.klic] = data['id']
+        return vysledky
+
+    def ziskej(self, mista):
+        """Vrátí {klic: počasí nebo None} pro zadaná místa
+
+        Místo stažené před méně než `platnost` sekundami se vezme z cache
+        (i když ho stáhl jiný proces). Stahuje se pod zámkem - kdo čeká,
+        po jeho získání najde v cache výsledek předchůdce.
+        """
+        jedinecna = list({misto.klic: misto for misto in mista}.values())
+        if not self.api_key:
+            print("Varování: OpenWeatherMap API klíč není nastaven")
+            return {misto.klic: None for misto in jedinecna}
+
+        vysledek = {}
+        with _zamceno(self.cesta + '.lock'):
+            ulozene = _nacti_json(self.cesta, {})
+            mista_v_cache = ulozene.setdefault('mista', {})
+            ted = time.time()
+            chybi = []
+            for misto in jedinecna:
+                zaznam = mista_v_cache.get(misto.klic)
+                if zaznam and ted - zaznam['cas'] < self.platnost:
+                    vysledek[misto.klic] = zaznam['data']
+                else:
+                    chybi.append(misto)
+
+            if chybi:
+                try:
+                    stazeno = self._stahni(chybi, ulozene)
+                except Exception as e:
+                    print(f"Chyba při získávání počasí: {e}")
+                    stazeno = {}
+                for misto in chybi:
+                    try:
+                        data = prevod(stazeno[misto.klic]) if misto.klic in stazeno else None
+                    except (KeyError, IndexError, TypeError) as e:
+                        print(f"Chyba při získávání počasí pro {misto.nazev}: {e}")
+                        data = None
+                    vysledek[misto.klic] = data
+                    if data is not None:
+                        mista_v_cache[misto.klic] = {'cas': ted, 'data': data}
+                try:
+                    _zapis_json(self.cesta, ulozene)
+                except OSError as e:
+                    print(f"Varování: nelze uložit cache počasí: {e}")
+        return vysledek
+
+
+def sluzba(config, adresar):
+    """Vytvoří Pocasi podle sekce [Weather]"""
+    sekce = config['Weather'] if config.has_section('Weather') else {}
+    za_minutu = float(sekce.get('rate_per_minute', VYCHOZI_ZA_MINUTU))
+    cesta_kvoty = sekce.get('quota_file', '') or os.path.join(adresar, 'weather_quota.json')
+    return Pocasi(
+        sekce.get('api_key', ''),
+        adresar,
+        url=sekce.get('api_url', VYCHOZI_URL),
+        kvota=Kvota(cesta_kvoty, za_minutu),
+        platnost=float(sekce.get('cache_minutes', VYCHOZI_PLATNOST_MIN)) * 60,
+    )